@@ -8,15 +8,20 @@ subset of that functionality:
 * an A* path‑finder that avoids impassable terrain and simple danger tiles.
 
 These routines are deterministic and operate on light‑weight data classes so
-that they can be tested without a running database.
+that they can be tested without a running database. Every routine accepts the
+map either as a ``{(x, y): TerrainTile}`` dict or as a :class:`TerrainGrid`,
+which packs the same tiles into flat arrays for large battlefields.
 """
 
 from __future__ import annotations
 
+from array import array
 from dataclasses import dataclass
-from typing import Iterable, List, Sequence, Tuple
+from functools import lru_cache
+from typing import Dict, Iterable, Iterator, List, Mapping, Sequence, Tuple, Union
 import heapq
 import math
+import weakref
 
 
 @dataclass
@@ -44,6 +49,172 @@ class WarUnit:
     facing: str = "N"  # Not heavily used but kept for completeness
 
 
+# Terrain classes that block line of sight regardless of elevation.
+LOS_BLOCKING_TERRAIN = frozenset({"mountain", "forest"})
+
+# Well known terrain classes get stable codes; unknown types are appended per
+# grid. Code 0 marks a coordinate inside the grid bounds with no tile.
+TERRAIN_CLASSES: Tuple[str, ...] = (
+    "",
+    "plain",
+    "forest",
+    "mountain",
+    "hill",
+    "water",
+    "river",
+    "swamp",
+    "road",
+    "bridge",
+)
+
+
+class TerrainGrid:
+    """Dense, row-major array representation of a battlefield.
+
+    Each attribute array holds one entry per cell, addressed by
+    ``(y - origin_y) * width + (x - origin_x)``. Cells without a tile have a
+    terrain code of ``0`` and are treated exactly like a missing dict key:
+    impassable and not blocking sight.
+    """
+
+    __slots__ = (
+        "width",
+        "height",
+        "origin_x",
+        "origin_y",
+        "passable",
+        "move_cost",
+        "elevation",
+        "cover",
+        "terrain_code",
+        "terrain_classes",
+        "los_blocking",
+        "tiles",
+        "version",
+        "__weakref__",
+    )
+
+    def __init__(self, width: int, height: int, origin_x: int = 0, origin_y: int = 0) -> None:
+        if width < 0 or height < 0:
+            raise ValueError("Grid dimensions must be non-negative")
+        size = width * height
+        self.width = width
+        self.height = height
+        self.origin_x = origin_x
+        self.origin_y = origin_y
+        self.passable = bytearray(size)
+        self.move_cost = array("i", [0]) * size
+        self.elevation = array("i", [0]) * size
+        self.cover = array("d", [0.0]) * size
+        self.terrain_code = bytearray(size)
+        self.terrain_classes: List[str] = list(TERRAIN_CLASSES)
+        self.los_blocking = bytearray(size)
+        self.tiles: List[TerrainTile | None] = [None] * size
+        # Bumped on every mutation so derived structures know to rebuild.
+        self.version = 0
+
+    @classmethod
+    def from_tiles(
+        cls,
+        tiles: Iterable[TerrainTile] | Mapping[Tuple[int, int], TerrainTile],
+        width: int | None = None,
+        height: int | None = None,
+    ) -> "TerrainGrid":
+        """Build a grid from ``TerrainTile`` objects or an existing tile dict.
+
+        Bounds are inferred from the tile coordinates unless ``width`` and
+        ``height`` are given, in which case the grid starts at ``(0, 0)``.
+        """
+
+        if isinstance(tiles, Mapping):
+            tiles = tiles.values()
+        tile_list = list(tiles)
+        if width is not None and height is not None:
+            grid = cls(width, height)
+        elif tile_list:
+            min_x = min(t.x for t in tile_list)
+            min_y = min(t.y for t in tile_list)
+            max_x = max(t.x for t in tile_list)
+            max_y = max(t.y for t in tile_list)
+            grid = cls(max_x - min_x + 1, max_y - min_y + 1, min_x, min_y)
+        else:
+            grid = cls(0, 0)
+        for tile in tile_list:
+            grid.set_tile(tile)
+        return grid
+
+    def index(self, x: int, y: int) -> int:
+        """Return the flat index of ``(x, y)`` or ``-1`` when out of bounds."""
+
+        cx = x - self.origin_x
+        cy = y - self.origin_y
+        if 0 <= cx < self.width and 0 <= cy < self.height:
+            return cy * self.width + cx
+        return -1
+
+    def terrain_class_code(self, terrain_type: str) -> int:
+        """Return the code for ``terrain_type``, registering it if unseen."""
+
+        try:
+            return self.terrain_classes.index(terrain_type)
+        except ValueError:
+            if len(self.terrain_classes) >= 256:
+                raise ValueError("Too many terrain classes for a single grid")
+            self.terrain_classes.append(terrain_type)
+            return len(self.terrain_classes) - 1
+
+    def set_tile(self, tile: TerrainTile) -> None:
+        """Store ``tile`` in the grid, replacing any existing cell."""
+
+        idx = self.index(tile.x, tile.y)
+        if idx < 0:
+            raise ValueError(f"Tile ({tile.x}, {tile.y}) is outside the grid")
+        self.passable[idx] = 1 if tile.passable else 0
+        self.move_cost[idx] = tile.move_cost
+        self.elevation[idx] = tile.elevation
+        self.cover[idx] = tile.cover
+        self.terrain_code[idx] = self.terrain_class_code(tile.terrain_type)
+        self.los_blocking[idx] = (
+            1 if tile.terrain_type in LOS_BLOCKING_TERRAIN or tile.elevation > 0 else 0
+        )
+        self.tiles[idx] = tile
+        self.version += 1
+
+    def walkable_mask(self, danger: Iterable[Tuple[int, int]] = ()) -> bytearray:
+        """Return a copy of ``passable`` with ``danger`` coordinates cleared."""
+
+        mask = bytearray(self.passable)
+        for coord in danger:
+            idx = self.index(*coord)
+            if idx >= 0:
+                mask[idx] = 0
+        return mask
+
+    def get(self, coord: Tuple[int, int], default: TerrainTile | None = None) -> TerrainTile | None:
+        """Dict-style lookup returning the ``TerrainTile`` at ``coord``."""
+
+        idx = self.index(*coord)
+        if idx < 0:
+            return default
+        tile = self.tiles[idx]
+        return default if tile is None else tile
+
+    def __getitem__(self, coord: Tuple[int, int]) -> TerrainTile:
+        tile = self.get(coord)
+        if tile is None:
+            raise KeyError(coord)
+        return tile
+
+    def __contains__(self, coord: object) -> bool:
+        return isinstance(coord, tuple) and self.get(coord) is not None  # type: ignore[arg-type]
+
+    def __len__(self) -> int:
+        return sum(1 for t in self.tiles if t is not None)
+
+
+TileMap = Union[dict[Tuple[int, int], TerrainTile], TerrainGrid]
+
+
 def bresenham_line(x0: int, y0: int, x1: int, y1: int) -> List[Tuple[int, int]]:
     """Return the grid cells intersected by a line from ``(x0, y0)`` to ``(x1, y1)``.
 
@@ -78,17 +249,97 @@ def bresenham_line(x0: int, y0: int, x1: int, y1: int) -> List[Tuple[int, int]]:
     return tiles
 
 
-def line_of_sight_clear(start: Tuple[int, int], end: Tuple[int, int], tiles: dict[Tuple[int, int], TerrainTile]) -> bool:
+def iter_bresenham(x0: int, y0: int, x1: int, y1: int) -> Iterator[Tuple[int, int]]:
+    """Yield the cells of :func:`bresenham_line` lazily, without building a list."""
+
+    dx = abs(x1 - x0)
+    dy = abs(y1 - y0)
+    x, y = x0, y0
+    x_inc = 1 if x1 > x0 else -1
+    y_inc = 1 if y1 > y0 else -1
+    error = dx - dy
+    dx *= 2
+    dy *= 2
+
+    for _ in range(1 + abs(x1 - x0) + abs(y1 - y0)):
+        yield x, y
+        if error > 0:
+            x += x_inc
+            error -= dy
+        elif error < 0:
+            y += y_inc
+            error += dx
+        else:
+            x += x_inc
+            y += y_inc
+            error -= dy
+            error += dx
+
+
+@lru_cache(maxsize=16384)
+def ray_offsets(dx: int, dy: int) -> Tuple[Tuple[int, int], ...]:
+    """Return the interior cells of a ray from ``(0, 0)`` to ``(dx, dy)``.
+
+    Bresenham lines are translation invariant, so the relative shape of every
+    observer/target ray is computed once and shared across units and ticks.
+    End points are excluded because they never block line of sight.
+    """
+
+    return tuple(bresenham_line(0, 0, dx, dy)[1:-1])
+
+
+def _tile_blocks_sight(tile: TerrainTile | None) -> bool:
+    return bool(tile) and (tile.terrain_type in LOS_BLOCKING_TERRAIN or tile.elevation > 0)
+
+
+def first_blocking_tile(start: Tuple[int, int], end: Tuple[int, int], tiles: TileMap) -> Tuple[int, int] | None:
+    """Return the first cell blocking sight from ``start`` to ``end``.
+
+    Walks the ray lazily and stops at the first obstruction, so long rays that
+    are blocked early cost only the cells actually visited. Returns ``None``
+    when the line of sight is clear.
+    """
+
+    cells = iter_bresenham(*start, *end)
+    next(cells)  # the observer's own tile never blocks
+    if isinstance(tiles, TerrainGrid):
+        blocking = tiles.los_blocking
+        for x, y in cells:
+            if (x, y) == end:
+                break
+            idx = tiles.index(x, y)
+            if idx >= 0 and blocking[idx]:
+                return x, y
+        return None
+
+    for x, y in cells:
+        if (x, y) == end:
+            break
+        if _tile_blocks_sight(tiles.get((x, y))):
+            return x, y
+    return None
+
+
+def line_of_sight_clear(start: Tuple[int, int], end: Tuple[int, int], tiles: TileMap) -> bool:
     """Return ``True`` if LOS between ``start`` and ``end`` is unobstructed."""
 
-    for x, y in bresenham_line(*start, *end)[1:-1]:
-        tile = tiles.get((x, y))
-        if tile and (tile.terrain_type in {"mountain", "forest"} or tile.elevation > 0):
+    sx, sy = start
+    offsets = ray_offsets(end[0] - sx, end[1] - sy)
+    if isinstance(tiles, TerrainGrid):
+        blocking = tiles.los_blocking
+        for ox, oy in offsets:
+            idx = tiles.index(sx + ox, sy + oy)
+            if idx >= 0 and blocking[idx]:
+                return False
+        return True
+
+    for ox, oy in offsets:
+        if _tile_blocks_sight(tiles.get((sx + ox, sy + oy))):
             return False
     return True
 
 
-def compute_visibility(observer: WarUnit, units: Sequence[WarUnit], tiles: dict[Tuple[int, int], TerrainTile], max_range: int) -> List[WarUnit]:
+def compute_visibility(observer: WarUnit, units: Sequence[WarUnit], tiles: TileMap, max_range: int) -> List[WarUnit]:
     """Return enemy units visible to ``observer``.
 
     Visibility is blocked by mountains/forests and limited by ``max_range``.
@@ -108,6 +359,56 @@ def compute_visibility(observer: WarUnit, units: Sequence[WarUnit], tiles: dict[
     return visible
 
 
+def compute_visibility_matrix(units: Sequence[WarUnit], tiles: TileMap, max_range: int) -> dict[str, List[WarUnit]]:
+    """Return the enemies visible to every unit in ``units`` for one tick.
+
+    The result maps each observer's ``unit_id`` to the same list
+    :func:`compute_visibility` would return for it. Units are bucketed into
+    ``max_range`` sized cells so only neighbouring buckets are range checked,
+    and each distinct ray is traced at most once per call.
+    """
+
+    result: dict[str, List[WarUnit]] = {u.unit_id: [] for u in units}
+    if max_range < 0 or not units:
+        return result
+
+    cell = max(1, math.ceil(max_range))
+    buckets: dict[Tuple[int, int], List[int]] = {}
+    for i, unit in enumerate(units):
+        buckets.setdefault((unit.x // cell, unit.y // cell), []).append(i)
+
+    range_sq = max_range * max_range
+    ray_cache: dict[Tuple[int, int, int, int], bool] = {}
+    for observer in units:
+        ox, oy = observer.x, observer.y
+        bx, by = ox // cell, oy // cell
+        candidates: List[int] = []
+        for cx in (bx - 1, bx, bx + 1):
+            for cy in (by - 1, by, by + 1):
+                bucket = buckets.get((cx, cy))
+                if bucket:
+                    candidates.extend(bucket)
+        # Keep the caller's unit order so results match compute_visibility.
+        candidates.sort()
+
+        visible = result[observer.unit_id]
+        for i in candidates:
+            target = units[i]
+            if target.side == observer.side:
+                continue
+            dx = target.x - ox
+            dy = target.y - oy
+            if dx * dx + dy * dy > range_sq:
+                continue
+            key = (ox, oy, target.x, target.y)
+            clear = ray_cache.get(key)
+            if clear is None:
+                clear = ray_cache[key] = line_of_sight_clear((ox, oy), (target.x, target.y), tiles)
+            if clear:
+                visible.append(target)
+    return result
+
+
 def heuristic(a: Tuple[int, int], b: Tuple[int, int]) -> float:
     return abs(a[0] - b[0]) + abs(a[1] - b[1])
 
@@ -118,17 +419,42 @@ def get_neighbors(node: Tuple[int, int]) -> Iterable[Tuple[int, int]]:
         yield x + dx, y + dy
 
 
-def compute_path(start: Tuple[int, int], goal: Tuple[int, int], tiles: dict[Tuple[int, int], TerrainTile], danger: Iterable[Tuple[int, int]] = ()) -> List[TerrainTile] | None:
-    """Compute a path using A* search avoiding impassable or dangerous tiles."""
+PATH_ENGINES = ("astar", "hpa")
+
+
+def compute_path(
+    start: Tuple[int, int],
+    goal: Tuple[int, int],
+    tiles: TileMap,
+    danger: Iterable[Tuple[int, int]] = (),
+    engine: str = "astar",
+) -> List[TerrainTile] | None:
+    """Compute a path avoiding impassable or dangerous tiles.
+
+    ``engine`` selects the search: ``"astar"`` (default) is an exact A* over
+    single tiles; ``"hpa"`` runs hierarchical A* over a cluster graph that is
+    built once per :class:`TerrainGrid` version (see :class:`PathHierarchy`)
+    and returns near-optimal paths much faster on large maps. Pass a
+    ``TerrainGrid`` to reuse the hierarchy between calls.
+    """
+
+    if engine not in PATH_ENGINES:
+        raise ValueError(f"Unknown path engine: {engine}")
+    if engine == "hpa":
+        grid = tiles if isinstance(tiles, TerrainGrid) else TerrainGrid.from_tiles(tiles)
+        return get_path_hierarchy(grid).find_path(start, goal, danger)
+    if isinstance(tiles, TerrainGrid):
+        return _compute_path_grid(start, goal, tiles, danger)
 
     danger_set = set(danger)
     open_set: list[tuple[float, Tuple[int, int]]] = [(0, start)]
     came_from: dict[Tuple[int, int], Tuple[int, int]] = {}
     g_score = {start: 0}
-    f_score = {start: heuristic(start, goal)}
 
     while open_set:
-        _, current = heapq.heappop(open_set)
+        f, current = heapq.heappop(open_set)
+        if f - heuristic(current, goal) > g_score[current]:
+            continue  # stale entry superseded by a cheaper push
         if current == goal:
             path = [current]
             while current in came_from:
@@ -144,6 +470,627 @@ def compute_path(start: Tuple[int, int], goal: Tuple[int, int], tiles: dict[Tupl
             if tentative_g < g_score.get(neighbor, math.inf):
                 came_from[neighbor] = current
                 g_score[neighbor] = tentative_g
-                f_score[neighbor] = tentative_g + heuristic(neighbor, goal)
-                heapq.heappush(open_set, (f_score[neighbor], neighbor))
+                heapq.heappush(open_set, (tentative_g + heuristic(neighbor, goal), neighbor))
+    return None
+
+
+def _compute_path_grid(start: Tuple[int, int], goal: Tuple[int, int], grid: TerrainGrid, danger: Iterable[Tuple[int, int]]) -> List[TerrainTile] | None:
+    """A* over flat grid indices; same semantics as :func:`compute_path`."""
+
+    width = grid.width
+    height = grid.height
+    ox = grid.origin_x
+    oy = grid.origin_y
+    move_cost = grid.move_cost
+
+    start_idx = grid.index(*start)
+    goal_idx = grid.index(*goal)
+    if start_idx < 0:
+        raise KeyError(start)
+    if goal_idx < 0:
+        return None
+
+    danger = list(danger)
+    walkable = grid.walkable_mask(danger) if danger else grid.passable
+
+    gx = goal[0] - ox
+    gy = goal[1] - oy
+    inf = math.inf
+    # Dicts rather than full-size arrays keep short queries independent of
+    # the map size.
+    g_score = {start_idx: 0}
+    came_from: dict[int, int] = {}
+    # Entries are (f, -g, index): among equal f, the deepest node is expanded
+    # first, which keeps open-terrain searches from flooding every tie.
+    open_set: list[tuple[float, int, int]] = [(0, 0, start_idx)]
+
+    while open_set:
+        _, neg_g, current = heapq.heappop(open_set)
+        g = -neg_g
+        if g > g_score[current]:
+            continue  # stale entry superseded by a cheaper push
+        if current == goal_idx:
+            path = [current]
+            while current in came_from:
+                current = came_from[current]
+                path.append(current)
+            path.reverse()
+            return [grid.tiles[i] for i in path]  # type: ignore[misc]
+        cy, cx = divmod(current, width)
+        for nx, ny in ((cx + 1, cy), (cx - 1, cy), (cx, cy + 1), (cx, cy - 1)):
+            if nx < 0 or ny < 0 or nx >= width or ny >= height:
+                continue
+            n_idx = ny * width + nx
+            if not walkable[n_idx]:
+                continue
+            tentative_g = g + move_cost[n_idx]
+            if tentative_g < g_score.get(n_idx, inf):
+                came_from[n_idx] = current
+                g_score[n_idx] = tentative_g
+                heapq.heappush(open_set, (tentative_g + abs(nx - gx) + abs(ny - gy), -tentative_g, n_idx))
     return None
+
+
+# ---------------------------------------------------------------------------
+# Hierarchical path-finding (HPA*)
+# ---------------------------------------------------------------------------
+
+DEFAULT_CLUSTER_SIZE = 16
+
+# Border runs at least this long get a transition at each end instead of one
+# in the middle, which keeps abstract paths close to optimal along walls.
+_LONG_ENTRANCE = 6
+
+
+class PathHierarchy:
+    """Abstract cluster graph for hierarchical A* on a :class:`TerrainGrid`.
+
+    The grid is split into ``cluster_size`` square clusters. Passable cells on
+    either side of a shared cluster border become abstract nodes, joined to
+    their counterpart across the border and, within each cluster, to every
+    other node they can reach. Queries then search this small graph and only
+    refine the chosen route tile by tile inside the clusters it crosses.
+
+    The graph is tied to the grid ``version`` it was built from; use
+    :func:`get_path_hierarchy` to obtain an up-to-date instance.
+    """
+
+    def __init__(self, grid: TerrainGrid, cluster_size: int = DEFAULT_CLUSTER_SIZE) -> None:
+        if cluster_size < 2:
+            raise ValueError("cluster_size must be at least 2")
+        self.grid = grid
+        self.version = grid.version
+        self.cluster_size = cluster_size
+        self.cols = -(-grid.width // cluster_size)
+        self.rows = -(-grid.height // cluster_size)
+        self.cluster_nodes: Dict[int, List[int]] = {}
+        self.edges: Dict[int, Dict[int, int]] = {}
+        self._build()
+
+    # -- construction -----------------------------------------------------
+
+    def cluster_of(self, idx: int) -> int:
+        y, x = divmod(idx, self.grid.width)
+        return (y // self.cluster_size) * self.cols + x // self.cluster_size
+
+    def cluster_bounds(self, cluster: int) -> Tuple[int, int, int, int]:
+        """Return ``(x0, y0, x1, y1)`` in grid-local cells, end exclusive."""
+
+        cy, cx = divmod(cluster, self.cols)
+        size = self.cluster_size
+        return (
+            cx * size,
+            cy * size,
+            min((cx + 1) * size, self.grid.width),
+            min((cy + 1) * size, self.grid.height),
+        )
+
+    def _add_node(self, idx: int) -> None:
+        if idx not in self.edges:
+            self.edges[idx] = {}
+            self.cluster_nodes.setdefault(self.cluster_of(idx), []).append(idx)
+
+    def _add_transition(self, a: int, b: int) -> None:
+        self._add_node(a)
+        self._add_node(b)
+        move_cost = self.grid.move_cost
+        self.edges[a][b] = move_cost[b]
+        self.edges[b][a] = move_cost[a]
+
+    def _add_entrances(self, pairs: List[Tuple[int, int]]) -> None:
+        """Place transitions on every passable run along one border."""
+
+        passable = self.grid.passable
+        run: List[Tuple[int, int]] = []
+        for a, b in pairs + [(-1, -1)]:
+            if a >= 0 and passable[a] and passable[b]:
+                run.append((a, b))
+                continue
+            if run:
+                if len(run) >= _LONG_ENTRANCE:
+                    self._add_transition(*run[0])
+                    self._add_transition(*run[-1])
+                else:
+                    self._add_transition(*run[len(run) // 2])
+                run = []
+
+    def _build(self) -> None:
+        width = self.grid.width
+        height = self.grid.height
+        size = self.cluster_size
+        for bx in range(size, width, size):
+            for y0 in range(0, height, size):
+                self._add_entrances(
+                    [(y * width + bx - 1, y * width + bx) for y in range(y0, min(y0 + size, height))]
+                )
+        for by in range(size, height, size):
+            for x0 in range(0, width, size):
+                self._add_entrances(
+                    [((by - 1) * width + x, by * width + x) for x in range(x0, min(x0 + size, width))]
+                )
+        for cluster, nodes in self.cluster_nodes.items():
+            self._link_cluster(cluster, nodes)
+
+    def _link_cluster(self, cluster: int, nodes: List[int]) -> None:
+        bounds = self.cluster_bounds(cluster)
+        walkable = self.grid.passable
+        for node in nodes:
+            if not walkable[node]:
+                continue
+            dist, _ = self._search(node, bounds, walkable)
+            node_edges = self.edges[node]
+            for other in nodes:
+                if other != node and other in dist:
+                    node_edges[other] = dist[other]
+
+    def _relink(self, node: int, walkable: bytearray) -> Dict[int, int]:
+        """Return ``node``'s edges recomputed against a per-query mask."""
+
+        cluster = self.cluster_of(node)
+        dist, _ = self._search(node, self.cluster_bounds(cluster), walkable)
+        edges = {
+            other: cost
+            for other, cost in self.edges[node].items()
+            if self.cluster_of(other) != cluster
+        }
+        for other in self.cluster_nodes[cluster]:
+            if other != node and other in dist:
+                edges[other] = dist[other]
+        return edges
+
+    # -- low level search -------------------------------------------------
+
+    def _search(
+        self,
+        source: int,
+        bounds: Tuple[int, int, int, int],
+        walkable: bytearray,
+        target: int = -1,
+        reverse: bool = False,
+    ) -> Tuple[Dict[int, int], Dict[int, int]]:
+        """Dijkstra restricted to ``bounds``.
+
+        Forward searches return the cost from ``source``; ``reverse`` searches
+        return the cost *to* ``source``. Entering a cell costs its
+        ``move_cost`` exactly like :func:`compute_path`.
+        """
+
+        width = self.grid.width
+        move_cost = self.grid.move_cost
+        x0, y0, x1, y1 = bounds
+        dist = {source: 0}
+        came_from: Dict[int, int] = {}
+        heap = [(0, source)]
+        while heap:
+            d, current = heapq.heappop(heap)
+            if d > dist[current]:
+                continue
+            if current == target:
+                break
+            cy, cx = divmod(current, width)
+            for nx, ny in ((cx + 1, cy), (cx - 1, cy), (cx, cy + 1), (cx, cy - 1)):
+                if nx < x0 or ny < y0 or nx >= x1 or ny >= y1:
+                    continue
+                n_idx = ny * width + nx
+                if not walkable[n_idx]:
+                    continue
+                nd = d + (move_cost[current] if reverse else move_cost[n_idx])
+                if nd < dist.get(n_idx, math.inf):
+                    dist[n_idx] = nd
+                    came_from[n_idx] = current
+                    heapq.heappush(heap, (nd, n_idx))
+        return dist, came_from
+
+    def _refine(self, a: int, b: int, walkable: bytearray) -> List[int]:
+        """Return the cells after ``a`` up to and including ``b``."""
+
+        if self.cluster_of(a) != self.cluster_of(b):
+            return [b]  # transition across a cluster border
+        bounds = self.cluster_bounds(self.cluster_of(a))
+        _, came_from = self._search(a, bounds, walkable, target=b)
+        segment = [b]
+        while segment[-1] != a:
+            segment.append(came_from[segment[-1]])
+        segment.pop()
+        segment.reverse()
+        return segment
+
+    # -- queries ----------------------------------------------------------
+
+    def find_path(
+        self,
+        start: Tuple[int, int],
+        goal: Tuple[int, int],
+        danger: Iterable[Tuple[int, int]] = (),
+    ) -> List[TerrainTile] | None:
+        """Return a near-optimal path from ``start`` to ``goal`` or ``None``."""
+
+        grid = self.grid
+        start_idx = grid.index(*start)
+        goal_idx = grid.index(*goal)
+        if start_idx < 0:
+            raise KeyError(start)
+        if start_idx == goal_idx:
+            return [grid[start]]
+        danger = list(danger)
+        walkable = grid.walkable_mask(danger) if danger else grid.passable
+        if goal_idx < 0 or not walkable[goal_idx]:
+            return None
+
+        # Clusters containing danger tiles may have stale internal links; nodes
+        # in them are relinked lazily, only if the abstract search reaches them.
+        dirty = {self.cluster_of(i) for i in (grid.index(*c) for c in danger) if i >= 0}
+        relinked: Dict[int, Dict[int, int]] = {}
+
+        start_cluster = self.cluster_of(start_idx)
+        goal_cluster = self.cluster_of(goal_idx)
+        from_start, _ = self._search(start_idx, self.cluster_bounds(start_cluster), walkable)
+        to_goal, _ = self._search(goal_idx, self.cluster_bounds(goal_cluster), walkable, reverse=True)
+
+        start_node, goal_node = -1, -2
+        start_edges = {n: from_start[n] for n in self.cluster_nodes.get(start_cluster, []) if n in from_start}
+        if goal_idx in from_start:
+            start_edges[goal_node] = from_start[goal_idx]
+        goal_edges = {n: to_goal[n] for n in self.cluster_nodes.get(goal_cluster, []) if n in to_goal}
+
+        width = grid.width
+        gy, gx = divmod(goal_idx, width)
+
+        def estimate(node: int) -> int:
+            if node < 0:
+                node = start_idx if node == start_node else goal_idx
+            y, x = divmod(node, width)
+            return abs(x - gx) + abs(y - gy)
+
+        g_score = {start_node: 0}
+        came_from: Dict[int, int] = {}
+        open_set = [(estimate(start_node), 0, start_node)]
+        while open_set:
+            _, neg_g, current = heapq.heappop(open_set)
+            g = -neg_g
+            if g > g_score[current]:
+                continue
+            if current == goal_node:
+                break
+            if current == start_node:
+                neighbours = start_edges.items()
+            else:
+                if dirty and self.cluster_of(current) in dirty:
+                    if current not in relinked:
+                        relinked[current] = self._relink(current, walkable)
+                    neighbours = list(relinked[current].items())
+                else:
+                    neighbours = list(self.edges[current].items())
+                # ``goal_edges`` was searched on the danger-masked grid, so it
+                # holds for relinked nodes as well.
+                if current in goal_edges:
+                    neighbours.append((goal_node, goal_edges[current]))
+            for neighbour, cost in neighbours:
+                if neighbour >= 0 and not walkable[neighbour]:
+                    continue
+                tentative_g = g + cost
+                if tentative_g < g_score.get(neighbour, math.inf):
+                    g_score[neighbour] = tentative_g
+                    came_from[neighbour] = current
+                    heapq.heappush(open_set, (tentative_g + estimate(neighbour), -tentative_g, neighbour))
+        if goal_node not in g_score:
+            # Danger on a transition tile closes its whole entrance in the
+            # abstract graph even when the rest of the border run is open, so
+            # only a search over the tiles themselves can rule a path out.
+            return _compute_path_grid(start, goal, grid, danger) if danger else None
+
+        abstract = [goal_node]
+        while abstract[-1] != start_node:
+            abstract.append(came_from[abstract[-1]])
+        abstract.reverse()
+        abstract[0] = start_idx
+        abstract[-1] = goal_idx
+
+        cells = [start_idx]
+        for a, b in zip(abstract, abstract[1:]):
+            if a != b:
+                cells.extend(self._refine(a, b, walkable))
+        return [grid.tiles[i] for i in cells]  # type: ignore[misc]
+
+
+_hierarchies: "weakref.WeakKeyDictionary[TerrainGrid, PathHierarchy]" = weakref.WeakKeyDictionary()
+
+
+def get_path_hierarchy(grid: TerrainGrid, cluster_size: int = DEFAULT_CLUSTER_SIZE) -> PathHierarchy:
+    """Return the cached :class:`PathHierarchy` for ``grid``, rebuilding stale ones."""
+
+    hierarchy = _hierarchies.get(grid)
+    if hierarchy is None or hierarchy.version != grid.version or hierarchy.cluster_size != cluster_size:
+        hierarchy = PathHierarchy(grid, cluster_size)
+        _hierarchies[grid] = hierarchy
+    return hierarchy
+
+
+# ---------------------------------------------------------------------------
+# Flow fields for mass movement
+# ---------------------------------------------------------------------------
+
+_MAX_FLOW_FIELDS_PER_GRID = 64
+
+
+class FlowField:
+    """Distance map towards a single goal built with one reverse Dijkstra.
+
+    Every cell records its cost to reach ``goal`` and the next cell on a
+    cheapest route, so any number of units ordered to the same objective can
+    read their next step in constant time instead of each running A*.
+    Costs match :func:`compute_path`: entering a tile costs its ``move_cost``
+    and impassable or dangerous tiles are never entered. A unit already
+    standing on such a tile can still step off it.
+    """
+
+    __slots__ = ("grid", "goal", "version", "distance", "next_index")
+
+    def __init__(self, grid: TerrainGrid, goal: Tuple[int, int], danger: Iterable[Tuple[int, int]] = ()) -> None:
+        self.grid = grid
+        self.goal = goal
+        self.version = grid.version
+        size = grid.width * grid.height
+        self.distance = array("d", [math.inf]) * size
+        self.next_index = array("i", [-1]) * size
+        danger = list(danger)
+        walkable = grid.walkable_mask(danger) if danger else grid.passable
+        goal_idx = grid.index(*goal)
+        if goal_idx >= 0 and walkable[goal_idx]:
+            self._build(goal_idx, walkable)
+
+    def _build(self, goal_idx: int, walkable: bytearray) -> None:
+        width = self.grid.width
+        height = self.grid.height
+        move_cost = self.grid.move_cost
+        distance = self.distance
+        next_index = self.next_index
+        distance[goal_idx] = 0
+        heap = [(0, goal_idx)]
+        while heap:
+            d, current = heapq.heappop(heap)
+            if d > distance[current]:
+                continue
+            step = d + move_cost[current]
+            cy, cx = divmod(current, width)
+            for nx, ny in ((cx + 1, cy), (cx - 1, cy), (cx, cy + 1), (cx, cy - 1)):
+                if nx < 0 or ny < 0 or nx >= width or ny >= height:
+                    continue
+                n_idx = ny * width + nx
+                if step < distance[n_idx]:
+                    distance[n_idx] = step
+                    next_index[n_idx] = current
+                    if walkable[n_idx]:
+                        heapq.heappush(heap, (step, n_idx))
+
+    def cost_from(self, x: int, y: int) -> float:
+        """Return the path cost from ``(x, y)`` to the goal (``inf`` if unreachable)."""
+
+        idx = self.grid.index(x, y)
+        return math.inf if idx < 0 else self.distance[idx]
+
+    def next_step(self, x: int, y: int) -> Tuple[int, int] | None:
+        """Return the next cell towards the goal, or ``None`` at the goal or when unreachable."""
+
+        grid = self.grid
+        idx = grid.index(x, y)
+        if idx < 0:
+            return None
+        nxt = self.next_index[idx]
+        if nxt < 0:
+            return None
+        ny, nx = divmod(nxt, grid.width)
+        return nx + grid.origin_x, ny + grid.origin_y
+
+    def path_from(self, x: int, y: int) -> List[TerrainTile] | None:
+        """Return the full tile path from ``(x, y)``, like :func:`compute_path`."""
+
+        grid = self.grid
+        idx = grid.index(x, y)
+        if idx < 0:
+            raise KeyError((x, y))
+        if (x, y) != self.goal and self.next_index[idx] < 0:
+            return None
+        path = [idx]
+        while self.next_index[path[-1]] >= 0:
+            path.append(self.next_index[path[-1]])
+        return [grid.tiles[i] for i in path]  # type: ignore[misc]
+
+
+_flow_fields: "weakref.WeakKeyDictionary[TerrainGrid, Dict[tuple, FlowField]]" = weakref.WeakKeyDictionary()
+
+
+def get_flow_field(grid: TerrainGrid, goal: Tuple[int, int], danger: Iterable[Tuple[int, int]] = ()) -> FlowField:
+    """Return a cached :class:`FlowField` for ``goal`` on the current grid version.
+
+    Fields are keyed by ``(goal, danger set)`` and discarded whenever the grid
+    changes, so callers can request one per unit without recomputing it.
+    """
+
+    danger_key = frozenset(danger)
+    fields = _flow_fields.get(grid)
+    if fields is None:
+        fields = _flow_fields[grid] = {}
+    key = (goal, danger_key)
+    field = fields.get(key)
+    if field is not None and field.version == grid.version:
+        return field
+    if field is None and len(fields) >= _MAX_FLOW_FIELDS_PER_GRID:
+        fields.pop(next(iter(fields)))
+    field = FlowField(grid, goal, danger_key)
+    fields[key] = field
+    return field
+
+
+# ---------------------------------------------------------------------------
+# Spatial index for combat queries
+# ---------------------------------------------------------------------------
+
+
+class SpatialHash:
+    """Uniform-grid index of unit positions for tile and range queries.
+
+    Units are bucketed into ``cell_size`` square cells and updated in place
+    as they move, so "who is on this tile", "which enemies are within ``r``"
+    and "nearest enemy" only touch the buckets around the query point
+    instead of scanning every pair. Distances are Euclidean, matching
+    :func:`compute_visibility`. Buckets are insertion ordered so results are
+    deterministic.
+    """
+
+    def __init__(self, cell_size: int = 8) -> None:
+        if cell_size < 1:
+            raise ValueError("cell_size must be positive")
+        self.cell_size = cell_size
+        self._cells: Dict[Tuple[int, int], Dict[object, None]] = {}
+        self._tiles: Dict[Tuple[int, int], Dict[object, None]] = {}
+        self._units: Dict[object, Tuple[int, int, object]] = {}
+        # Occupied cells per cell column and row, giving the extent of the
+        # occupied cells without scanning them.
+        self._columns: Dict[int, int] = {}
+        self._rows: Dict[int, int] = {}
+
+    @classmethod
+    def from_units(cls, units: Iterable[WarUnit], cell_size: int = 8) -> "SpatialHash":
+        index = cls(cell_size)
+        for unit in units:
+            index.insert(unit.unit_id, unit.x, unit.y, unit.side)
+        return index
+
+    def __len__(self) -> int:
+        return len(self._units)
+
+    def __contains__(self, unit_id: object) -> bool:
+        return unit_id in self._units
+
+    def _cell(self, x: int, y: int) -> Tuple[int, int]:
+        return x // self.cell_size, y // self.cell_size
+
+    def insert(self, unit_id: object, x: int, y: int, side: object) -> None:
+        if unit_id in self._units:
+            self.remove(unit_id)
+        self._units[unit_id] = (x, y, side)
+        cell = self._cell(x, y)
+        bucket = self._cells.get(cell)
+        if bucket is None:
+            bucket = self._cells[cell] = {}
+            self._columns[cell[0]] = self._columns.get(cell[0], 0) + 1
+            self._rows[cell[1]] = self._rows.get(cell[1], 0) + 1
+        bucket[unit_id] = None
+        self._tiles.setdefault((x, y), {})[unit_id] = None
+
+    def remove(self, unit_id: object) -> None:
+        x, y, _ = self._units.pop(unit_id)
+        tile = self._tiles[(x, y)]
+        del tile[unit_id]
+        if not tile:
+            del self._tiles[(x, y)]
+        cell = self._cell(x, y)
+        bucket = self._cells[cell]
+        del bucket[unit_id]
+        if not bucket:
+            del self._cells[cell]
+            for counts, key in ((self._columns, cell[0]), (self._rows, cell[1])):
+                counts[key] -= 1
+                if not counts[key]:
+                    del counts[key]
+
+    def move(self, unit_id: object, x: int, y: int) -> None:
+        """Update ``unit_id``'s position, touching only the affected buckets."""
+
+        old_x, old_y, side = self._units[unit_id]
+        if (old_x, old_y) != (x, y):
+            self.remove(unit_id)
+            self.insert(unit_id, x, y, side)
+
+    def position(self, unit_id: object) -> Tuple[int, int]:
+        x, y, _ = self._units[unit_id]
+        return x, y
+
+    def side(self, unit_id: object) -> object:
+        return self._units[unit_id][2]
+
+    def units_on_tile(self, x: int, y: int) -> List[object]:
+        return list(self._tiles.get((x, y), ()))
+
+    def enemies_on_tile(self, x: int, y: int, side: object) -> List[object]:
+        units = self._units
+        return [uid for uid in self._tiles.get((x, y), ()) if units[uid][2] != side]
+
+    def enemies_within(self, x: int, y: int, radius: float, side: object) -> List[object]:
+        """Return ids of units not on ``side`` within ``radius`` of ``(x, y)``.
+
+        Results are ordered by distance, ties keeping insertion order.
+        """
+
+        if radius < 0:
+            return []
+        reach = int(math.floor(radius))
+        cx0, cy0 = self._cell(x - reach, y - reach)
+        cx1, cy1 = self._cell(x + reach, y + reach)
+        radius_sq = radius * radius
+        units = self._units
+        found: List[Tuple[int, object]] = []
+        for cx in range(cx0, cx1 + 1):
+            for cy in range(cy0, cy1 + 1):
+                for uid in self._cells.get((cx, cy), ()):
+                    ux, uy, uside = units[uid]
+                    if uside == side:
+                        continue
+                    d_sq = (ux - x) ** 2 + (uy - y) ** 2
+                    if d_sq <= radius_sq:
+                        found.append((d_sq, uid))
+        found.sort(key=lambda item: item[0])
+        return [uid for _, uid in found]
+
+    def nearest_enemy(self, x: int, y: int, side: object, max_radius: float = math.inf) -> object | None:
+        """Return the id of the closest unit not on ``side``, or ``None``.
+
+        Searches outward ring by ring and stops once no unsearched cell can
+        hold anything closer than the best match found.
+        """
+
+        if not self._cells:
+            return None
+        ocx, ocy = self._cell(x, y)
+        columns, rows = self._columns, self._rows
+        limit = max(ocx - min(columns), max(columns) - ocx, ocy - min(rows), max(rows) - ocy)
+        units = self._units
+        best: object | None = None
+        best_sq = max_radius * max_radius
+        for ring in range(limit + 1):
+            if best is not None and best_sq <= ((ring - 1) * self.cell_size) ** 2:
+                break
+            if (ring - 1) * self.cell_size > max_radius:
+                break
+            for cx in range(ocx - ring, ocx + ring + 1):
+                on_edge = cx in (ocx - ring, ocx + ring)
+                for cy in range(ocy - ring, ocy + ring + 1) if on_edge else (ocy - ring, ocy + ring):
+                    for uid in self._cells.get((cx, cy), ()):
+                        ux, uy, uside = units[uid]
+                        if uside == side:
+                            continue
+                        d_sq = (ux - x) ** 2 + (uy - y) ** 2
+                        if d_sq < best_sq or (best is None and d_sq <= best_sq):
+                            best, best_sq = uid, d_sq
+        return best
@@ -0,0 +1,237 @@
+#!/usr/bin/env python3
+"""Benchmark suite for the battle engine hot paths.
+
+Runs ``bresenham_line``, ``line_of_sight_clear``, ``compute_visibility``,
+``compute_visibility_matrix`` and ``compute_path`` against seeded maps
+(open plain, maze, mixed forest/mountain) at several sizes and unit
+densities. Throughput (ops/sec) and peak traced memory per case are written
+to a JSON baseline with ``--record``; without it the run is compared to the
+baseline and exits non-zero when any case regresses beyond ``--tolerance``.
+
+Baselines are machine specific: record them on the hardware that runs the
+comparison.
+"""
+from __future__ import annotations
+
+import argparse
+import json
+import random
+import sys
+import time
+import tracemalloc
+from pathlib import Path
+from typing import Callable, Dict, List, Tuple
+
+sys.path.append(str(Path(__file__).resolve().parent.parent))
+
+import backend.battle_engine as be  # noqa: E402
+
+DEFAULT_BASELINE = Path(__file__).with_name("battle_engine_baseline.json")
+MAP_KINDS = ("plain", "maze", "mixed")
+MAP_SIZES = (50, 200, 500)
+UNIT_DENSITIES = (10, 100, 500, 2000)
+VISIBILITY_RANGE = 12
+# Memory growth below this many bytes is never reported as a regression.
+MEMORY_SLACK = 64 * 1024
+
+Tiles = Dict[Tuple[int, int], be.TerrainTile]
+
+
+# ---------------------------------------------------------------------------
+# Seeded map and unit generators
+# ---------------------------------------------------------------------------
+
+
+def open_plain(size: int, seed: int = 0) -> Tiles:
+    return {(x, y): be.TerrainTile(x, y) for x in range(size) for y in range(size)}
+
+
+def maze(size: int, seed: int = 0) -> Tiles:
+    """Recursive-backtracker maze with mountain walls on a ``size`` square."""
+    rng = random.Random(seed)
+    open_cells = set()
+    start = (1, 1)
+    open_cells.add(start)
+    stack = [start]
+    while stack:
+        x, y = stack[-1]
+        options = [
+            (x + dx, y + dy, x + dx // 2, y + dy // 2)
+            for dx, dy in ((2, 0), (-2, 0), (0, 2), (0, -2))
+            if 0 < x + dx < size - 1 and 0 < y + dy < size - 1 and (x + dx, y + dy) not in open_cells
+        ]
+        if not options:
+            stack.pop()
+            continue
+        nx, ny, wx, wy = rng.choice(options)
+        open_cells.update({(nx, ny), (wx, wy)})
+        stack.append((nx, ny))
+    return {
+        (x, y): be.TerrainTile(x, y)
+        if (x, y) in open_cells
+        else be.TerrainTile(x, y, terrain_type="mountain", passable=False, elevation=2)
+        for x in range(size)
+        for y in range(size)
+    }
+
+
+def mixed(size: int, seed: int = 0) -> Tiles:
+    """Plains with seeded forest groves and mountain ridges."""
+    rng = random.Random(seed)
+    kinds = {}
+    for _ in range(max(1, size * size // 150)):
+        cx, cy = rng.randrange(size), rng.randrange(size)
+        kind = "forest" if rng.random() < 0.7 else "mountain"
+        radius = rng.randint(1, 4)
+        for x in range(cx - radius, cx + radius + 1):
+            for y in range(cy - radius, cy + radius + 1):
+                if 0 <= x < size and 0 <= y < size and rng.random() < 0.75:
+                    kinds[(x, y)] = kind
+    tiles = {}
+    for x in range(size):
+        for y in range(size):
+            kind = kinds.get((x, y), "plain")
+            if kind == "forest":
+                tiles[(x, y)] = be.TerrainTile(x, y, "forest", move_cost=2, cover=0.3)
+            elif kind == "mountain":
+                tiles[(x, y)] = be.TerrainTile(x, y, "mountain", passable=False, elevation=2)
+            else:
+                tiles[(x, y)] = be.TerrainTile(x, y)
+    return tiles
+
+
+GENERATORS: Dict[str, Callable[[int, int], Tiles]] = {
+    "plain": open_plain,
+    "maze": maze,
+    "mixed": mixed,
+}
+
+
+def place_units(tiles: Tiles, count: int, seed: int = 0) -> List[be.WarUnit]:
+    rng = random.Random(seed)
+    cells = sorted(c for c, t in tiles.items() if t.passable)
+    return [
+        be.WarUnit(unit_id=str(i), side="red" if i % 2 else "blue", x=x, y=y, range=VISIBILITY_RANGE)
+        for i, (x, y) in enumerate(rng.choice(cells) for _ in range(count))
+    ]
+
+
+# ---------------------------------------------------------------------------
+# Measurement
+# ---------------------------------------------------------------------------
+
+
+def measure(op: Callable[[int], object], budget: float, memory_ops: int = 3) -> dict:
+    """Return ops/sec over ``budget`` seconds and peak memory of a few ops."""
+    done = 0
+    start = time.perf_counter()
+    while True:
+        op(done)
+        done += 1
+        elapsed = time.perf_counter() - start
+        if elapsed >= budget:
+            break
+    tracemalloc.start()
+    for i in range(memory_ops):
+        op(i)
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return {"ops_per_sec": done / elapsed, "peak_bytes": peak}
+
+
+def build_cases(sizes, kinds, densities, seed: int) -> Dict[str, Callable[[int], object]]:
+    cases: Dict[str, Callable[[int], object]] = {}
+    for kind in kinds:
+        for size in sizes:
+            tiles = GENERATORS[kind](size, seed)
+            grid = be.TerrainGrid.from_tiles(tiles)
+            rng = random.Random(seed)
+            passable = sorted(c for c, t in tiles.items() if t.passable)
+            rays = []
+            for _ in range(256):
+                x0, y0 = rng.randrange(size), rng.randrange(size)
+                x1 = min(size - 1, max(0, x0 + rng.randint(-20, 20)))
+                y1 = min(size - 1, max(0, y0 + rng.randint(-20, 20)))
+                rays.append(((x0, y0), (x1, y1)))
+            routes = [(rng.choice(passable), rng.choice(passable)) for _ in range(16)]
+            prefix = f"{kind}/{size}"
+
+            cases[f"{prefix}/bresenham_line"] = lambda i, r=rays: be.bresenham_line(*r[i % 256][0], *r[i % 256][1])
+            for label, tile_map in (("dict", tiles), ("grid", grid)):
+                cases[f"{prefix}/line_of_sight_clear/{label}"] = (
+                    lambda i, r=rays, m=tile_map: be.line_of_sight_clear(r[i % 256][0], r[i % 256][1], m)
+                )
+                cases[f"{prefix}/compute_path/{label}"] = (
+                    lambda i, r=routes, m=tile_map: be.compute_path(r[i % 16][0], r[i % 16][1], m)
+                )
+            for density in densities:
+                units = place_units(tiles, density, seed)
+                cases[f"{prefix}/compute_visibility/{density}"] = (
+                    lambda i, u=units, m=grid: be.compute_visibility(u[i % len(u)], u, m, VISIBILITY_RANGE)
+                )
+                cases[f"{prefix}/compute_visibility_matrix/{density}"] = (
+                    lambda i, u=units, m=grid: be.compute_visibility_matrix(u, m, VISIBILITY_RANGE)
+                )
+    return cases
+
+
+def run_suite(sizes=MAP_SIZES, kinds=MAP_KINDS, densities=UNIT_DENSITIES, seed: int = 1, budget: float = 0.2) -> Dict[str, dict]:
+    return {name: measure(op, budget) for name, op in build_cases(sizes, kinds, densities, seed).items()}
+
+
+def compare(results: Dict[str, dict], baseline: Dict[str, dict], tolerance: float) -> List[str]:
+    """Return a description of every case that regressed beyond ``tolerance``."""
+    regressions = []
+    for name, current in sorted(results.items()):
+        base = baseline.get(name)
+        if not base:
+            continue
+        floor = base["ops_per_sec"] * (1 - tolerance)
+        if current["ops_per_sec"] < floor:
+            regressions.append(
+                f"{name}: {current['ops_per_sec']:.1f} ops/s < {floor:.1f} "
+                f"(baseline {base['ops_per_sec']:.1f})"
+            )
+        ceiling = base["peak_bytes"] * (1 + tolerance) + MEMORY_SLACK
+        if current["peak_bytes"] > ceiling:
+            regressions.append(
+                f"{name}: peak {current['peak_bytes']} B > {ceiling:.0f} B "
+                f"(baseline {base['peak_bytes']} B)"
+            )
+    return regressions
+
+
+def main(argv: List[str] | None = None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--baseline", type=Path, default=DEFAULT_BASELINE)
+    parser.add_argument("--record", action="store_true", help="write results as the new baseline")
+    parser.add_argument("--tolerance", type=float, default=0.25)
+    parser.add_argument("--budget", type=float, default=0.2, help="seconds per case")
+    parser.add_argument("--sizes", type=int, nargs="+", default=list(MAP_SIZES))
+    parser.add_argument("--kinds", nargs="+", default=list(MAP_KINDS), choices=MAP_KINDS)
+    parser.add_argument("--densities", type=int, nargs="+", default=list(UNIT_DENSITIES))
+    parser.add_argument("--seed", type=int, default=1)
+    args = parser.parse_args(argv)
+
+    results = run_suite(args.sizes, args.kinds, args.densities, args.seed, args.budget)
+    for name, r in sorted(results.items()):
+        print(f"{name:<48} {r['ops_per_sec']:>12,.1f} ops/s {r['peak_bytes'] / 1024:>10,.1f} KiB")
+
+    if args.record:
+        existing = json.loads(args.baseline.read_text()) if args.baseline.exists() else {}
+        existing.update(results)
+        args.baseline.write_text(json.dumps(existing, indent=2, sort_keys=True) + "\n")
+        print(f"Baseline written to {args.baseline}")
+        return 0
+
+    if not args.baseline.exists():
+        print(f"No baseline at {args.baseline}; run with --record first")
+        return 0
+    regressions = compare(results, json.loads(args.baseline.read_text()), args.tolerance)
+    for line in regressions:
+        print(f"REGRESSION {line}")
+    return 1 if regressions else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
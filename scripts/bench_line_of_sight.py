@@ -0,0 +1,90 @@
+#!/usr/bin/env python3
+"""Micro-benchmark for the battle engine line of sight helpers.
+
+Compares three ways of answering "can A see B" on seeded random maps:
+
+1. ``list``   - the original ``bresenham_line(...)[1:-1]`` scan;
+2. ``lazy``   - :func:`first_blocking_tile`, which stops at the first blocker;
+3. ``cached`` - :func:`line_of_sight_clear`, which reuses ``ray_offsets``.
+
+Each variant runs against both the tile dict and :class:`TerrainGrid`.
+"""
+from __future__ import annotations
+
+import argparse
+import random
+import sys
+import time
+from pathlib import Path
+
+sys.path.append(str(Path(__file__).resolve().parent.parent))
+
+import backend.battle_engine as be  # noqa: E402
+
+
+def build_map(size: int, seed: int, forest: float) -> dict:
+    rng = random.Random(seed)
+    tiles = {}
+    for x in range(size):
+        for y in range(size):
+            kind = "forest" if rng.random() < forest else "plain"
+            tiles[(x, y)] = be.TerrainTile(x, y, terrain_type=kind)
+    return tiles
+
+
+def list_los(start, end, tiles) -> bool:
+    for x, y in be.bresenham_line(*start, *end)[1:-1]:
+        tile = tiles.get((x, y))
+        if tile and (tile.terrain_type in {"mountain", "forest"} or tile.elevation > 0):
+            return False
+    return True
+
+
+def lazy_los(start, end, tiles) -> bool:
+    return be.first_blocking_tile(start, end, tiles) is None
+
+
+def run(size: int, rays: int, max_range: int, seed: int, forest: float) -> None:
+    rng = random.Random(seed)
+    tiles = build_map(size, seed, forest)
+    grid = be.TerrainGrid.from_tiles(tiles)
+    pairs = []
+    for _ in range(rays):
+        x0, y0 = rng.randrange(size), rng.randrange(size)
+        x1 = min(size - 1, max(0, x0 + rng.randint(-max_range, max_range)))
+        y1 = min(size - 1, max(0, y0 + rng.randint(-max_range, max_range)))
+        pairs.append(((x0, y0), (x1, y1)))
+
+    be.ray_offsets.cache_clear()
+    variants = [
+        ("list", list_los),
+        ("lazy", lazy_los),
+        ("cached", be.line_of_sight_clear),
+    ]
+    for name, fn in variants:
+        for label, tile_map in (("dict", tiles), ("grid", grid)):
+            if name == "list" and label == "grid":
+                continue
+            start = time.perf_counter()
+            for a, b in pairs:
+                fn(a, b, tile_map)
+            elapsed = time.perf_counter() - start
+            print(f"{size:>4}² {name:<7}{label:<5} {rays / elapsed:>12,.0f} rays/s")
+    info = be.ray_offsets.cache_info()
+    print(f"      ray cache: {info.hits} hits, {info.misses} misses")
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--sizes", type=int, nargs="+", default=[50, 200, 500])
+    parser.add_argument("--rays", type=int, default=50_000)
+    parser.add_argument("--range", dest="max_range", type=int, default=20)
+    parser.add_argument("--forest", type=float, default=0.1)
+    parser.add_argument("--seed", type=int, default=1)
+    args = parser.parse_args()
+    for size in args.sizes:
+        run(size, args.rays, args.max_range, args.seed, args.forest)
+
+
+if __name__ == "__main__":
+    main()
@@ -3,6 +3,7 @@ from services.maintenance_service import (
     verify_kingdom_resources,
     cleanup_zombie_training_queue,
     cleanup_zombie_spy_missions,
+    expire_village_modifiers,
 )
 
 
@@ -17,6 +18,9 @@ def main() -> None:
         expired = cleanup_zombie_spy_missions(db)
         print(f"Expired {expired} spy missions")
 
+        lapsed = expire_village_modifiers(db)
+        print(f"Processed {lapsed} lapsed village modifiers")
+
 
 if __name__ == "__main__":
     main()
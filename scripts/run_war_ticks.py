@@ -0,0 +1,23 @@
+import argparse
+import os
+
+from services.war_tick_scheduler import WarTickScheduler
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Tick all due tactical wars once")
+    parser.add_argument("--shards", type=int, default=int(os.getenv("WAR_TICK_SHARDS", "4")))
+    parser.add_argument("--processes", type=int, default=None)
+    args = parser.parse_args()
+
+    reports = WarTickScheduler(args.shards, args.processes).run_once()
+    for r in reports:
+        print(
+            f"shard {r.shard}: {r.processed}/{r.due} ticked, {r.duplicates} duplicate, "
+            f"{r.locked} locked, {r.failed} failed, max lag {r.max_lag_seconds:.1f}s, "
+            f"{r.elapsed_seconds:.2f}s"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -15,6 +15,8 @@ from fastapi import HTTPException
 from sqlalchemy import text
 from sqlalchemy.orm import Session
 
+from services.modifiers_utils import invalidate_alliance
+
 logger = logging.getLogger(__name__)
 
 
@@ -246,6 +248,7 @@ def complete_project_if_ready(db: Session, alliance_id: int, project_key: str) -
         {"pid": pid},
     )
     db.commit()
+    invalidate_alliance(alliance_id)
     return True
 
 
@@ -0,0 +1,216 @@
+# Project Name: Thronestead©
+# File Name: battle_replay_service.py
+# Version:  7/1/2025 10:38
+# Developer: Deathsgift66
+
+"""Keyframe + delta snapshots for seeking battle replays.
+
+Rebuilding a replay from ``combat_logs`` means replaying every row up to the
+requested tick. Instead, each tick of unit state is stored in
+``battle_replay_frames`` as either a full *keyframe* (every
+``keyframe_interval`` ticks) or a *delta* holding only the units that changed.
+Seeking to any tick reads one keyframe plus the deltas after it in a single
+query and pairs the result with that tick's combat events from
+:func:`services.combat_log_service.fetch_logs_by_tick`.
+
+Frames use a compact columnar binary layout (see :func:`encode_frame`) and are
+fully deterministic: units are always written in sorted ``unit_id`` order.
+"""
+
+from __future__ import annotations
+
+import struct
+import sys
+import zlib
+from array import array
+from typing import Dict, List, Mapping, Tuple
+
+from services.combat_log_service import fetch_logs_by_tick
+from services.sqlalchemy_support import Session, text
+
+FRAME_MAGIC = b"TSR1"
+FRAME_FIELDS = ("x", "y", "morale")
+DEFAULT_KEYFRAME_INTERVAL = 10
+
+UnitState = Tuple[int, int, int]
+
+_HEADER = struct.Struct("<4sBIII")  # magic, is_keyframe, tick, changed, removed
+_SWAP = sys.byteorder != "little"
+
+
+def _pack_ids(ids: List[str]) -> bytes:
+    blob = "\n".join(ids).encode("utf-8")
+    return struct.pack("<I", len(blob)) + blob
+
+
+def _unpack_ids(buf: bytes, offset: int, count: int) -> Tuple[List[str], int]:
+    (length,) = struct.unpack_from("<I", buf, offset)
+    offset += 4
+    blob = buf[offset : offset + length].decode("utf-8")
+    return (blob.split("\n") if count else []), offset + length
+
+
+def encode_frame(
+    tick: int,
+    units: Mapping[str, UnitState],
+    removed: List[str] | None = None,
+    keyframe: bool = False,
+) -> bytes:
+    """Serialise ``units`` (``unit_id -> (x, y, morale)``) for ``tick``.
+
+    Layout, zlib compressed: header, newline separated unit ids, then one
+    little-endian ``int32`` column per entry in :data:`FRAME_FIELDS`, then the
+    ids removed since the previous frame.
+    """
+    removed = sorted(removed or [])
+    ids = sorted(units)
+    columns = [array("i", (units[uid][i] for uid in ids)) for i in range(len(FRAME_FIELDS))]
+    parts = [_HEADER.pack(FRAME_MAGIC, int(keyframe), tick, len(ids), len(removed)), _pack_ids(ids)]
+    for column in columns:
+        if _SWAP:  # pragma: no cover - big-endian hosts
+            column.byteswap()
+        parts.append(column.tobytes())
+    parts.append(_pack_ids(removed))
+    return zlib.compress(b"".join(parts))
+
+
+def decode_frame(payload: bytes) -> Tuple[int, bool, Dict[str, UnitState], List[str]]:
+    """Inverse of :func:`encode_frame`: ``(tick, is_keyframe, units, removed)``."""
+    buf = zlib.decompress(payload)
+    magic, is_keyframe, tick, count, removed_count = _HEADER.unpack_from(buf, 0)
+    if magic != FRAME_MAGIC:
+        raise ValueError("Not a battle replay frame")
+    ids, offset = _unpack_ids(buf, _HEADER.size, count)
+    columns = []
+    for _ in FRAME_FIELDS:
+        column = array("i")
+        column.frombytes(buf[offset : offset + 4 * count])
+        if _SWAP:  # pragma: no cover - big-endian hosts
+            column.byteswap()
+        columns.append(column)
+        offset += 4 * count
+    removed, _ = _unpack_ids(buf, offset, removed_count)
+    units = {uid: tuple(col[i] for col in columns) for i, uid in enumerate(ids)}
+    return tick, bool(is_keyframe), units, removed  # type: ignore[return-value]
+
+
+class ReplayRecorder:
+    """Turns successive per-tick unit states into keyframes and deltas.
+
+    A delta is only written against the state this recorder itself persisted
+    for ``tick - 1``. When ticks of a war move between workers, or a frame's
+    transaction is rolled back, the recorder has not seen the previous frame
+    and writes a keyframe instead.
+    """
+
+    def __init__(self, war_id: int, keyframe_interval: int = DEFAULT_KEYFRAME_INTERVAL) -> None:
+        if keyframe_interval < 1:
+            raise ValueError("keyframe_interval must be at least 1")
+        self.war_id = war_id
+        self.keyframe_interval = keyframe_interval
+        self._last: Dict[str, UnitState] | None = None
+        self._last_tick: int | None = None
+        self._pending: Tuple[int, Dict[str, UnitState]] | None = None
+
+    def frame_for(self, tick: int, units: Mapping[str, UnitState]) -> Tuple[bool, bytes]:
+        """Return ``(is_keyframe, payload)`` for ``tick``.
+
+        The state is only staged; it becomes the base for the next delta once
+        :meth:`mark_persisted` confirms the frame was committed.
+        """
+        state = {str(uid): tuple(int(v) for v in s) for uid, s in units.items()}
+        previous = self._last if self._last_tick == tick - 1 else None
+        self._pending = (tick, state)
+        if previous is None or tick % self.keyframe_interval == 0:
+            return True, encode_frame(tick, state, keyframe=True)
+        changed = {uid: s for uid, s in state.items() if previous.get(uid) != s}
+        removed = [uid for uid in previous if uid not in state]
+        return False, encode_frame(tick, changed, removed)
+
+    def record(self, db: Session, tick: int, units: Mapping[str, UnitState]) -> bool:
+        """Insert the frame for ``tick``.
+
+        The caller owns the commit and must call :meth:`mark_persisted` once
+        it succeeds.
+        """
+        is_keyframe, payload = self.frame_for(tick, units)
+        db.execute(
+            text(
+                """
+                INSERT INTO battle_replay_frames (war_id, tick, is_keyframe, payload)
+                VALUES (:wid, :tick, :key, :payload)
+                """
+            ),
+            {"wid": self.war_id, "tick": tick, "key": is_keyframe, "payload": payload},
+        )
+        return is_keyframe
+
+    def mark_persisted(self) -> None:
+        """Adopt the last staged frame as the base for the next delta."""
+        if self._pending is not None:
+            self._last_tick, self._last = self._pending
+            self._pending = None
+
+
+_recorders: Dict[int, ReplayRecorder] = {}
+
+
+def get_recorder(war_id: int, keyframe_interval: int = DEFAULT_KEYFRAME_INTERVAL) -> ReplayRecorder:
+    """Return this process's recorder for ``war_id``.
+
+    A fresh recorder always starts with a keyframe, and a recorder that
+    missed the previous tick (e.g. it was run by another worker) writes one
+    too, so a delta is never based on state that was not persisted.
+    """
+    recorder = _recorders.get(war_id)
+    if recorder is None:
+        recorder = _recorders[war_id] = ReplayRecorder(war_id, keyframe_interval)
+    return recorder
+
+
+def forget_recorder(war_id: int) -> None:
+    """Drop the recorder for a concluded war so ``_recorders`` stays bounded."""
+    _recorders.pop(war_id, None)
+
+
+def load_state_at(db: Session, war_id: int, tick: int) -> Dict[str, UnitState] | None:
+    """Reconstruct unit state at ``tick`` from the nearest keyframe and deltas."""
+    rows = db.execute(
+        text(
+            """
+            SELECT tick, payload
+              FROM battle_replay_frames
+             WHERE war_id = :wid
+               AND tick <= :tick
+               AND tick >= (
+                   SELECT MAX(tick) FROM battle_replay_frames
+                    WHERE war_id = :wid AND is_keyframe AND tick <= :tick
+               )
+             ORDER BY tick ASC
+            """
+        ),
+        {"wid": war_id, "tick": tick},
+    ).fetchall()
+    state: Dict[str, UnitState] | None = None
+    for _, payload in rows:
+        _, is_keyframe, units, removed = decode_frame(bytes(payload))
+        if is_keyframe or state is None:
+            state = dict(units)
+            continue
+        state.update(units)
+        for uid in removed:
+            state.pop(uid, None)
+    return state
+
+
+def seek(db: Session, war_id: int, tick: int) -> dict:
+    """Return the replay view for ``tick``: unit positions plus that tick's events."""
+    state = load_state_at(db, war_id, tick) or {}
+    return {
+        "tick": tick,
+        "units": [
+            {"unit_id": uid, **dict(zip(FRAME_FIELDS, values))}
+            for uid, values in sorted(state.items())
+        ],
+        "events": fetch_logs_by_tick(db, war_id, tick),
+    }
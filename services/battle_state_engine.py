@@ -0,0 +1,341 @@
+# Project Name: Thronestead©
+# File Name: battle_state_engine.py
+# Version:  7/1/2025 10:38
+# Developer: Deathsgift66
+
+"""In-memory tactical battle simulation.
+
+:func:`services.war_battle_service.process_battle_tick` issues a separate SQL
+statement for every phase of every tick. :class:`BattleSimulation` instead
+loads ``unit_positions``, ``unit_movements`` and pending ``unit_orders`` once
+per war, advances ticks in memory with the :mod:`backend.battle_engine`
+primitives and writes each tick back as one batched :class:`TickDiff`.
+A single worker can therefore keep many wars resident and tick them cheaply.
+"""
+
+from __future__ import annotations
+
+from dataclasses import dataclass, field
+from typing import Dict, Iterable, List, Mapping, Tuple
+
+from backend.battle_engine import (
+    SpatialHash,
+    TerrainGrid,
+    WarUnit,
+    compute_visibility_matrix,
+    get_flow_field,
+)
+from services.battle_replay_service import ReplayRecorder, get_recorder
+from services.sqlalchemy_support import Session, text
+from services.war_battle_service import (
+    DEFAULT_MAX_TICKS,
+    UNIT_STATE_SQL,
+    conclude_battle,
+    pair_combatants,
+)
+
+MORALE_LOSS_PER_DEFEAT = 10
+
+
+@dataclass
+class SimUnit:
+    """Mutable in-memory copy of a ``unit_positions`` row."""
+
+    unit_id: str
+    alliance_id: int
+    x: int
+    y: int
+    power: float = 0
+    defense: float = 0
+    morale: int = 100
+    is_attacker: bool = False
+    range: int = 0
+    dx: int = 0
+    dy: int = 0
+    last_moved_tick: int | None = None
+
+
+@dataclass
+class TickDiff:
+    """Everything a single simulated tick changed, ready to be flushed."""
+
+    tick: int
+    combat: List[Tuple[str, str, str]] = field(default_factory=list)
+    moved: Dict[str, SimUnit] = field(default_factory=dict)
+    orders_applied: int = 0
+
+
+class BattleSimulation:
+    """Resident state for one tactical war."""
+
+    def __init__(
+        self,
+        war_id: int,
+        tick: int,
+        units: Iterable[SimUnit],
+        pending_orders: int = 0,
+        grid: TerrainGrid | None = None,
+        max_ticks: int = DEFAULT_MAX_TICKS,
+        visibility_range: int | None = None,
+    ) -> None:
+        self.war_id = war_id
+        self.tick = tick
+        self.units: Dict[str, SimUnit] = {u.unit_id: u for u in units}
+        self.pending_orders = pending_orders
+        self.grid = grid
+        self.max_ticks = max_ticks
+        self.visibility_range = visibility_range
+        self.objectives: Dict[str, Tuple[int, int]] = {}
+        self.danger: Tuple[Tuple[int, int], ...] = ()
+        self.visible: Dict[str, List[WarUnit]] = {}
+        # Optional replay writer; when set, each flushed tick stores a frame.
+        self.recorder: ReplayRecorder | None = None
+        self.spatial = SpatialHash()
+        for unit in self.units.values():
+            self.spatial.insert(unit.unit_id, unit.x, unit.y, unit.alliance_id)
+
+    # ------------------------------------------------------------------
+    # Loading
+    # ------------------------------------------------------------------
+
+    @classmethod
+    def load(
+        cls,
+        db: Session,
+        war_id: int,
+        grid: TerrainGrid | None = None,
+        max_ticks: int = DEFAULT_MAX_TICKS,
+        visibility_range: int | None = None,
+    ) -> "BattleSimulation":
+        """Read the full battle state for ``war_id`` with four queries.
+
+        The loaded simulation writes a replay frame with every flushed tick.
+        """
+        status = db.execute(
+            text("SELECT status FROM wars WHERE war_id = :wid"),
+            {"wid": war_id},
+        ).scalar()
+        if status != "active":
+            raise ValueError("Battle is not active")
+
+        tick = db.execute(
+            text("SELECT current_tick FROM war_tick_state WHERE war_id = :wid"),
+            {"wid": war_id},
+        ).scalar()
+        if tick is None:
+            raise ValueError("Tick state not initialized")
+
+        rows = db.execute(text(UNIT_STATE_SQL), {"wid": war_id}).fetchall()
+        units = [
+            SimUnit(
+                unit_id=r[0],
+                alliance_id=r[1],
+                x=r[2],
+                y=r[3],
+                power=r[4] or 0,
+                defense=r[5] or 0,
+                morale=r[6] or 0,
+                is_attacker=bool(r[7]),
+                last_moved_tick=r[8],
+                dx=r[9],
+                dy=r[10],
+                range=r[11] or 0,
+            )
+            for r in rows
+        ]
+
+        pending = db.execute(
+            text(
+                "SELECT COUNT(*) FROM unit_orders WHERE war_id = :wid AND applied_tick IS NULL"
+            ),
+            {"wid": war_id},
+        ).scalar()
+
+        sim = cls(
+            war_id,
+            tick,
+            units,
+            pending_orders=pending or 0,
+            grid=grid,
+            max_ticks=max_ticks,
+            visibility_range=visibility_range,
+        )
+        sim.recorder = get_recorder(war_id)
+        return sim
+
+    def set_objective(self, unit_ids: Iterable[str], goal: Tuple[int, int]) -> None:
+        """Route ``unit_ids`` towards ``goal`` along a shared flow field."""
+        for uid in unit_ids:
+            self.objectives[uid] = goal
+
+    # ------------------------------------------------------------------
+    # Simulation
+    # ------------------------------------------------------------------
+
+    @property
+    def concluded(self) -> bool:
+        return self.tick >= self.max_ticks
+
+    def step(self) -> TickDiff:
+        """Advance one tick in memory and return what changed."""
+        self.tick += 1
+        diff = TickDiff(tick=self.tick)
+
+        # 1. Orders
+        diff.orders_applied = self.pending_orders
+        self.pending_orders = 0
+
+        # 2. Combat
+        diff.combat = self._resolve_combat()
+
+        # 3. Movement
+        self._move_units(diff)
+
+        # 4. Morale: like ``apply_morale_penalties``, once per losing unit
+        # however many engagements it lost this tick.
+        losers = {attacker_id for attacker_id, _, outcome in diff.combat if outcome == "loss"}
+        for unit_id in losers:
+            unit = self.units[unit_id]
+            if unit.morale > 0:
+                unit.morale = max(unit.morale - MORALE_LOSS_PER_DEFEAT, 0)
+                diff.moved[unit.unit_id] = unit
+
+        # 5. Fog of war
+        if self.grid is not None and self.visibility_range is not None:
+            self.visible = compute_visibility_matrix(
+                [
+                    WarUnit(u.unit_id, str(u.alliance_id), u.x, u.y, u.range)
+                    for u in self.units.values()
+                ],
+                self.grid,
+                self.visibility_range,
+            )
+        return diff
+
+    def _resolve_combat(self) -> List[Tuple[str, str, str]]:
+        """Pair units with :func:`~services.war_battle_service.pair_combatants`."""
+        return pair_combatants(self.units, self.spatial, self.grid)
+
+    def _move_units(self, diff: TickDiff) -> None:
+        flow_moves: Dict[str, Tuple[int, int]] = {}
+        if self.grid is not None and self.objectives:
+            for uid, goal in self.objectives.items():
+                unit = self.units.get(uid)
+                if unit is None:
+                    continue
+                nxt = get_flow_field(self.grid, goal, self.danger).next_step(unit.x, unit.y)
+                if nxt is not None:
+                    flow_moves[uid] = nxt
+
+        for unit in self.units.values():
+            if unit.unit_id in flow_moves:
+                unit.x, unit.y = flow_moves[unit.unit_id]
+            elif unit.unit_id in self.objectives or not (unit.dx or unit.dy):
+                continue
+            else:
+                unit.x += unit.dx
+                unit.y += unit.dy
+            unit.last_moved_tick = self.tick
+            self.spatial.move(unit.unit_id, unit.x, unit.y)
+            diff.moved[unit.unit_id] = unit
+
+    # ------------------------------------------------------------------
+    # Persistence
+    # ------------------------------------------------------------------
+
+    def flush(self, db: Session, diff: TickDiff) -> None:
+        """Write ``diff`` back with one batched statement per table."""
+        wid = self.war_id
+        if diff.orders_applied:
+            db.execute(
+                text(
+                    """
+                    UPDATE unit_orders
+                    SET applied_tick = :tick
+                    WHERE war_id = :wid AND applied_tick IS NULL
+                """
+                ),
+                {"tick": diff.tick, "wid": wid},
+            )
+        if diff.combat:
+            db.execute(
+                text(
+                    """
+                    INSERT INTO combat_logs (war_id, tick, attacker_unit_id, defender_unit_id, outcome)
+                    VALUES (:wid, :tick, :att, :def, :outcome)
+                """
+                ),
+                [
+                    {"wid": wid, "tick": diff.tick, "att": a, "def": d, "outcome": o}
+                    for a, d, o in diff.combat
+                ],
+            )
+        if diff.moved:
+            db.execute(
+                text(
+                    """
+                    UPDATE unit_positions
+                    SET x = :x, y = :y, morale = :morale, last_moved_tick = :moved
+                    WHERE unit_id = :uid AND war_id = :wid
+                """
+                ),
+                [
+                    {
+                        "x": u.x,
+                        "y": u.y,
+                        "morale": u.morale,
+                        "moved": u.last_moved_tick,
+                        "uid": u.unit_id,
+                        "wid": wid,
+                    }
+                    for u in diff.moved.values()
+                ],
+            )
+        db.execute(
+            text(
+                """
+                INSERT INTO war_tick_logs (war_id, tick, created_at)
+                VALUES (:wid, :tick, now())
+            """
+            ),
+            {"wid": wid, "tick": diff.tick},
+        )
+        db.execute(
+            text("UPDATE war_tick_state SET current_tick = :t WHERE war_id = :wid"),
+            {"t": diff.tick, "wid": wid},
+        )
+        if self.recorder is not None:
+            self.recorder.record(
+                db,
+                diff.tick,
+                {u.unit_id: (u.x, u.y, u.morale) for u in self.units.values()},
+            )
+        db.commit()
+        if self.recorder is not None:
+            self.recorder.mark_persisted()
+
+    def advance(self, db: Session) -> dict:
+        """Step, persist and conclude if needed; mirrors ``process_battle_tick``."""
+        diff = self.step()
+        self.flush(db, diff)
+        if self.concluded:
+            conclude_battle(db, self.war_id, final_tick=self.tick)
+            return {"status": "concluded", "tick": self.tick}
+        return {"status": "active", "tick": self.tick}
+
+
+def run_battle(
+    db: Session,
+    war_id: int,
+    grid: TerrainGrid | None = None,
+    max_ticks: int = DEFAULT_MAX_TICKS,
+    objectives: Mapping[str, Tuple[int, int]] | None = None,
+) -> dict:
+    """Load ``war_id`` once and advance it to conclusion."""
+    sim = BattleSimulation.load(db, war_id, grid=grid, max_ticks=max_ticks)
+    for uid, goal in (objectives or {}).items():
+        sim.set_objective([uid], goal)
+    result = {"status": "concluded", "tick": sim.tick}
+    while not sim.concluded:
+        result = sim.advance(db)
+    return result
@@ -8,7 +8,11 @@ logger = logging.getLogger(__name__)
 
 
 def process_combat_tick(db: Session, war_id: int, tick_number: int, payload: dict) -> bool:
-    """Apply a single combat tick ensuring backup and idempotency."""
+    """Apply a single combat tick ensuring backup and idempotency.
+
+    When ``payload`` carries a ``units`` mapping (``unit_id -> (x, y, morale)``)
+    a replay frame is written in the same transaction.
+    """
     db.execute(
         text(
             """
@@ -44,7 +48,16 @@ def process_combat_tick(db: Session, war_id: int, tick_number: int, payload: dic
         ),
         {"tick": tick_number, "wid": war_id},
     )
+    units = payload.get("units") if isinstance(payload, dict) else None
+    recorder = None
+    if units:
+        from services.battle_replay_service import get_recorder
+
+        recorder = get_recorder(war_id)
+        recorder.record(db, tick_number, units)
     db.commit()
+    if recorder is not None:
+        recorder.mark_persisted()
     return True
 
 
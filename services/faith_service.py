@@ -7,10 +7,18 @@
 from __future__ import annotations
 
 import logging
+import time
+from math import isqrt
+from typing import Mapping
 
 from services.sqlalchemy_support import Session, SQLAlchemyError, text
 
-from services.modifiers_utils import _merge_modifiers, invalidate_cache
+from services.modifier_vector import ModifierVector
+from services.modifiers_utils import (
+    _merge_modifiers,
+    apply_modifier_deltas,
+    invalidate_cache,
+)
 
 logger = logging.getLogger(__name__)
 
@@ -34,6 +42,27 @@ BLESSINGS: dict[str, dict] = {
 }
 
 
+def level_up(points: int, level: int, amount: int) -> tuple[int, int]:
+    """Return ``(points, level)`` after adding ``amount`` faith.
+
+    Advancing from level ``n`` costs ``n * FAITH_PER_LEVEL``, so reaching
+    level ``n`` from level 1 costs ``FAITH_PER_LEVEL * n * (n - 1) / 2`` in
+    total. Solving that triangular number for ``n`` gives the new level
+    directly instead of looping once per level gained. Levels never drop.
+    """
+    spent = FAITH_PER_LEVEL * level * (level - 1) // 2
+    total = spent + points + amount
+    new_level = level
+    if total >= 0:
+        new_level = max(level, (1 + isqrt(1 + 4 * (2 * total // FAITH_PER_LEVEL))) // 2)
+    return total - FAITH_PER_LEVEL * new_level * (new_level - 1) // 2, new_level
+
+
+def _blessing_columns(blessings: dict) -> tuple:
+    ordered = [code for code in BLESSINGS if blessings.get(code)]
+    return tuple((ordered + [None, None, None])[:3])
+
+
 def gain_faith(db: Session, kingdom_id: int, amount: int) -> None:
     """Increase faith points for a kingdom and handle level ups."""
     try:
@@ -56,12 +85,9 @@ def gain_faith(db: Session, kingdom_id: int, amount: int) -> None:
             )
         else:
             points, level = row
-        total = int(points or 0) + amount
-        leveled = False
-        while total >= level * FAITH_PER_LEVEL:
-            total -= level * FAITH_PER_LEVEL
-            level += 1
-            leveled = True
+        total, new_level = level_up(int(points or 0), level, amount)
+        leveled = new_level > level
+        level = new_level
 
         db.execute(
             text(
@@ -96,8 +122,7 @@ def unlock_blessings(db: Session, kingdom_id: int, new_level: int) -> None:
             return
 
         blessings.update({code: True for code in newly_unlocked})
-        ordered = [code for code in BLESSINGS if blessings.get(code)]
-        b1, b2, b3 = (ordered + [None, None, None])[:3]
+        b1, b2, b3 = _blessing_columns(blessings)
 
         db.execute(
             text(
@@ -119,6 +144,116 @@ def unlock_blessings(db: Session, kingdom_id: int, new_level: int) -> None:
         logger.exception("Failed to unlock blessings for kingdom %s", kingdom_id)
 
 
+def gain_faith_many(db: Session, gains: Mapping[int, int]) -> dict[int, int]:
+    """Award faith to many kingdoms at once; return ``{kingdom_id: new_level}``.
+
+    Current rows are read with one locking SELECT, missing rows are created
+    with one batched INSERT, and the new points, levels and any blessings
+    unlocked by a level-up are written with one batched UPDATE per column
+    set, all in a single commit. Only kingdoms that unlocked a blessing have
+    their cached modifiers adjusted.
+    """
+    gains = {kid: int(amount) for kid, amount in gains.items() if amount}
+    if not gains:
+        return {}
+    kids = list(gains)
+    try:
+        rows = db.execute(
+            text(
+                "SELECT kingdom_id, faith_points, faith_level, blessings "
+                "FROM kingdom_religion WHERE kingdom_id = ANY(:kids) FOR UPDATE"
+            ),
+            {"kids": kids},
+        ).fetchall()
+        current = {kid: (pts, lvl, bless) for kid, pts, lvl, bless in rows}
+        missing = [kid for kid in kids if kid not in current]
+        if missing:
+            db.execute(
+                text(
+                    "INSERT INTO kingdom_religion (kingdom_id, faith_points, faith_level) "
+                    "VALUES (:kid, 0, 1) ON CONFLICT DO NOTHING"
+                ),
+                [{"kid": kid} for kid in missing],
+            )
+
+        progress: list[dict] = []
+        unlocks: list[dict] = []
+        unlocked: dict[int, list[str]] = {}
+        levels: dict[int, int] = {}
+        for kid, amount in gains.items():
+            points, level, blessings = current.get(kid, (0, 1, None))
+            level = int(level or 1)
+            total, new_level = level_up(int(points or 0), level, amount)
+            levels[kid] = new_level
+            params = {"pts": total, "lvl": new_level, "kid": kid}
+            blessings = dict(blessings) if blessings else {}
+            new_codes = [
+                code
+                for code, info in BLESSINGS.items()
+                if new_level > level
+                and new_level >= info.get("level", 0)
+                and code not in blessings
+            ]
+            if not new_codes:
+                progress.append(params)
+                continue
+            blessings.update({code: True for code in new_codes})
+            b1, b2, b3 = _blessing_columns(blessings)
+            unlocks.append({**params, "b": blessings, "b1": b1, "b2": b2, "b3": b3})
+            unlocked[kid] = new_codes
+
+        if progress:
+            db.execute(
+                text(
+                    "UPDATE kingdom_religion SET faith_points = :pts, faith_level = :lvl "
+                    "WHERE kingdom_id = :kid"
+                ),
+                progress,
+            )
+        if unlocks:
+            db.execute(
+                text(
+                    """
+                    UPDATE kingdom_religion
+                       SET faith_points = :pts,
+                           faith_level = :lvl,
+                           blessings = :b,
+                           blessing_1 = :b1,
+                           blessing_2 = :b2,
+                           blessing_3 = :b3
+                     WHERE kingdom_id = :kid
+                    """
+                ),
+                unlocks,
+            )
+        changed_at = time.time()
+        db.commit()
+    except SQLAlchemyError:
+        db.rollback()
+        logger.exception("Failed to gain faith for %d kingdoms", len(gains))
+        return {}
+
+    apply_modifier_deltas(
+        {
+            kid: ModifierVector.from_dict(blessing_modifiers(codes))
+            for kid, codes in unlocked.items()
+        },
+        "Faith",
+        changed_at=changed_at,
+    )
+    return levels
+
+
+def blessing_modifiers(active) -> dict:
+    """Return the merged modifiers of the ``active`` blessing codes."""
+    mods: dict = {}
+    for code in active or {}:
+        info = BLESSINGS.get(code)
+        if info:
+            _merge_modifiers(mods, info.get("modifiers", {}))
+    return mods
+
+
 def _get_faith_modifiers(db: Session, kingdom_id: int) -> dict:
     """Return aggregated modifiers from active blessings."""
     try:
@@ -126,13 +261,7 @@ def _get_faith_modifiers(db: Session, kingdom_id: int) -> dict:
             text("SELECT blessings FROM kingdom_religion WHERE kingdom_id = :kid"),
             {"kid": kingdom_id},
         ).fetchone()
-        active = row[0] if row and row[0] else {}
-        mods: dict = {}
-        for code in active:
-            info = BLESSINGS.get(code)
-            if info:
-                _merge_modifiers(mods, info.get("modifiers", {}))
-        return mods
+        return blessing_modifiers(row[0] if row and row[0] else {})
     except SQLAlchemyError:
         logger.exception("Failed loading faith modifiers for %s", kingdom_id)
         return {}
@@ -7,6 +7,7 @@
 from __future__ import annotations
 
 import logging
+import time
 from typing import Optional
 
 from fastapi import HTTPException
@@ -14,6 +15,8 @@ from sqlalchemy import text
 from sqlalchemy.orm import Session
 
 from services import resource_service
+from services.modifier_catalogue import catalogues
+from services.modifiers_utils import apply_modifier_deltas, invalidate_kingdoms
 
 logger = logging.getLogger(__name__)
 
@@ -215,9 +218,30 @@ def upgrade_building(
     db.commit()
 
 
+def _apply_temple_deltas(rows, sign: int, changed_at: float) -> None:
+    """Adjust cached modifiers for ``(kingdom_id, building_id)`` temple changes."""
+    if not catalogues.loaded or catalogues.stale:
+        # Without the catalogue we cannot tell temples apart.
+        invalidate_kingdoms(kid for kid, _ in rows)
+        return
+    temples: dict[int, list[int]] = {}
+    for kingdom_id, building_id in rows:
+        if kingdom_id is not None and building_id in catalogues.temples:
+            temples.setdefault(kingdom_id, []).append(building_id)
+    apply_modifier_deltas(
+        {kid: catalogues.delta("temples", ids, sign) for kid, ids in temples.items()},
+        "Temples",
+        changed_at=changed_at,
+    )
+
+
 def mark_completed_buildings(db: Session) -> int:
-    """Mark any completed building constructions as 'complete'."""
-    result = db.execute(
+    """Mark any completed building constructions as 'complete'.
+
+    Finished temples add their modifiers to the owning kingdoms' cached
+    totals as deltas; other buildings do not contribute modifiers.
+    """
+    rows = db.execute(
         text(
             """
             UPDATE village_buildings
@@ -226,16 +250,22 @@ def mark_completed_buildings(db: Session) -> int:
                    is_under_construction = false
              WHERE construction_status = 'under_construction'
                AND construction_ends_at <= now()
+            RETURNING (
+                SELECT kv.kingdom_id FROM kingdom_villages kv
+                 WHERE kv.village_id = village_buildings.village_id
+            ), building_id
             """
         )
-    )
+    ).fetchall()
+    changed_at = time.time()
     db.commit()
+    _apply_temple_deltas(rows, sign=1, changed_at=changed_at)
 
     from services.village_queue_service import mark_completed_queued_buildings
 
     processed = mark_completed_queued_buildings(db)
 
-    return getattr(result, "rowcount", 0) + processed
+    return len(rows) + processed
 
 
 def get_building_level(db: Session, village_id: int, building_id: int) -> Optional[int]:
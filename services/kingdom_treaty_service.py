@@ -10,6 +10,8 @@ from sqlalchemy import text
 from sqlalchemy.exc import SQLAlchemyError
 from sqlalchemy.orm import Session
 
+from services.modifiers_utils import invalidate_kingdoms
+
 logger = logging.getLogger(__name__)
 
 # ----------------------------
@@ -72,17 +74,19 @@ def accept_treaty(db: Session, treaty_id: int) -> None:
         treaty_id: ID of the treaty to activate.
     """
     try:
-        db.execute(
+        row = db.execute(
             text(
                 """
                 UPDATE kingdom_treaties
                    SET status = 'active', signed_at = now()
                  WHERE treaty_id = :tid
+                RETURNING kingdom_id, partner_kingdom_id
             """
             ),
             {"tid": treaty_id},
-        )
+        ).fetchone()
         db.commit()
+        invalidate_kingdoms(row or ())
 
     except SQLAlchemyError as exc:
         db.rollback()
@@ -98,17 +102,19 @@ def cancel_treaty(db: Session, treaty_id: int) -> None:
         treaty_id: ID of the treaty to cancel.
     """
     try:
-        db.execute(
+        row = db.execute(
             text(
                 """
                 UPDATE kingdom_treaties
                    SET status = 'cancelled', signed_at = now()
                  WHERE treaty_id = :tid
+                RETURNING kingdom_id, partner_kingdom_id
             """
             ),
             {"tid": treaty_id},
-        )
+        ).fetchone()
         db.commit()
+        invalidate_kingdoms(row or ())
 
     except SQLAlchemyError as exc:
         db.rollback()
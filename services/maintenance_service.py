@@ -5,6 +5,7 @@ from __future__ import annotations
 from sqlalchemy import text
 from sqlalchemy.orm import Session
 
+from services.modifiers_utils import invalidate_kingdoms
 from services.resource_service import ensure_kingdom_resource_row
 
 
@@ -42,3 +43,31 @@ def cleanup_zombie_spy_missions(db: Session) -> int:
     )
     db.commit()
     return getattr(result, "rowcount", 0)
+
+
+def expire_village_modifiers(db: Session) -> int:
+    """Mark newly lapsed village modifiers and drop the affected cached totals.
+
+    Lapsed rows are kept, since every read already filters on
+    ``expires_at``; they are only stamped with ``lapse_processed_at`` so each
+    lapse is handled once. Cached breakdowns normally expire at the lapse on
+    their own, because their TTL is capped at the next ``expires_at`` when
+    they are cached. This job is the backstop for entries cached before a
+    row's ``expires_at`` was moved earlier.
+    """
+    rows = db.execute(
+        text(
+            """
+            UPDATE village_modifiers vm
+               SET lapse_processed_at = now()
+              FROM kingdom_villages kv
+             WHERE kv.village_id = vm.village_id
+               AND vm.expires_at <= now()
+               AND vm.lapse_processed_at IS NULL
+            RETURNING kv.kingdom_id
+            """
+        )
+    ).fetchall()
+    db.commit()
+    invalidate_kingdoms(kid for (kid,) in rows)
+    return len(rows)
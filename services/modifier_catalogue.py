@@ -0,0 +1,168 @@
+# Project Name: Thronestead©
+# File Name: modifier_catalogue.py
+# Version:  7/1/2025 10:38
+# Developer: Deathsgift66
+
+"""Precompiled modifier catalogues.
+
+``tech_catalogue``, ``building_catalogue`` (temples) and
+``project_player_catalogue`` change only when content is edited, yet their JSON
+``modifiers`` blobs used to be joined and re-parsed for every kingdom lookup.
+:class:`CatalogueRegistry` loads them once per process, validates each blob
+into a compact tuple of ``(category, key, value)`` triples and lets the
+per-kingdom queries fetch ids only. The registry loads lazily on first use
+and reloads once ``max_age`` has elapsed; there is no explicit invalidation,
+so catalogue edits take effect within ``max_age`` seconds.
+"""
+
+from __future__ import annotations
+
+import logging
+import time
+from threading import Lock
+from typing import Callable, Dict, Iterable, Tuple
+
+from services.modifier_vector import ModifierVector, sum_vectors
+from services.modifiers_utils import parse_json_field
+from services.sqlalchemy_support import Session, text
+
+logger = logging.getLogger(__name__)
+
+CompiledModifiers = Tuple[Tuple[str, str, float], ...]
+
+# Seconds after which a loaded registry is reloaded, which bounds how long a
+# catalogue edit takes to reach every worker.
+DEFAULT_MAX_AGE = 300
+
+
+def compile_modifiers(raw) -> CompiledModifiers:
+    """Validate a modifier blob into sorted ``(category, key, value)`` triples.
+
+    Non-dict categories and non-numeric values are dropped, matching what
+    :func:`services.modifiers_utils._merge_modifiers` would ignore.
+    """
+    mods = parse_json_field(raw)
+    if not isinstance(mods, dict):
+        return ()
+    triples = []
+    for cat, inner in mods.items():
+        if not isinstance(inner, dict):
+            continue
+        for key, val in inner.items():
+            try:
+                triples.append((cat, key, float(val)))
+            except (TypeError, ValueError):
+                continue
+    return tuple(sorted(triples))
+
+
+def merge_compiled(target: dict, compiled: CompiledModifiers) -> None:
+    """Add ``compiled`` triples into a nested modifier dict."""
+    for cat, key, val in compiled:
+        bucket = target.setdefault(cat, {})
+        bucket[key] = bucket.get(key, 0) + val
+
+
+class CatalogueRegistry:
+    """Process-wide cache of compiled catalogue modifiers."""
+
+    def __init__(
+        self, max_age: float = DEFAULT_MAX_AGE, clock: Callable[[], float] = time.monotonic
+    ) -> None:
+        self.max_age = max_age
+        self._clock = clock
+        self._lock = Lock()
+        self.tech: Dict[str, CompiledModifiers] = {}
+        self.temples: Dict[int, CompiledModifiers] = {}
+        self.projects: Dict[str, CompiledModifiers] = {}
+        self._vectors: Dict[str, dict] = {"tech": {}, "temples": {}, "projects": {}}
+        self._loaded_at: float | None = None
+
+    @property
+    def loaded(self) -> bool:
+        return self._loaded_at is not None
+
+    @property
+    def stale(self) -> bool:
+        return self._loaded_at is None or self._clock() - self._loaded_at >= self.max_age
+
+    def install(
+        self,
+        tech: Dict[str, object] | None = None,
+        temples: Dict[int, object] | None = None,
+        projects: Dict[str, object] | None = None,
+    ) -> None:
+        """Replace the catalogues with already-fetched raw modifier blobs."""
+        with self._lock:
+            self.tech = {code: compile_modifiers(m) for code, m in (tech or {}).items()}
+            self.temples = {bid: compile_modifiers(m) for bid, m in (temples or {}).items()}
+            self.projects = {code: compile_modifiers(m) for code, m in (projects or {}).items()}
+            self._vectors = {
+                name: {
+                    ident: ModifierVector.from_triples(compiled)
+                    for ident, compiled in getattr(self, name).items()
+                    if compiled
+                }
+                for name in ("tech", "temples", "projects")
+            }
+            self._loaded_at = self._clock()
+
+    def load(self, db: Session) -> None:
+        """Read and compile all three catalogues."""
+        tech = db.execute(text("SELECT tech_code, modifiers FROM tech_catalogue")).fetchall()
+        temples = db.execute(
+            text(
+                "SELECT building_id, modifiers FROM building_catalogue "
+                "WHERE production_type = 'temple'"
+            )
+        ).fetchall()
+        projects = db.execute(
+            text("SELECT project_code, modifiers FROM project_player_catalogue")
+        ).fetchall()
+        self.install(dict(tech), dict(temples), dict(projects))
+        logger.info(
+            "Loaded modifier catalogues: %d techs, %d temples, %d projects",
+            len(self.tech),
+            len(self.temples),
+            len(self.projects),
+        )
+
+    def ensure_loaded(self, db: Session) -> bool:
+        """Load the catalogues if missing or stale; return whether a load ran."""
+        if self.loaded and not self.stale:
+            return False
+        self.load(db)
+        return True
+
+    def merged(self, catalogue: str, ids: Iterable) -> dict:
+        """Return the nested modifier dict for ``ids`` of ``catalogue``."""
+        table = getattr(self, catalogue)
+        mods: dict = {}
+        for ident in ids:
+            compiled = table.get(ident)
+            if compiled:
+                merge_compiled(mods, compiled)
+        return mods
+
+    def vector(self, catalogue: str, ids: Iterable) -> ModifierVector:
+        """Return the summed :class:`ModifierVector` for ``ids`` of ``catalogue``."""
+        table = self._vectors[catalogue]
+        return sum_vectors(table[i] for i in ids if i in table)
+
+    def delta(
+        self, catalogue: str, ids: Iterable, sign: int = 1
+    ) -> ModifierVector | None:
+        """Return the signed vector for ``ids`` as a cache delta.
+
+        ``None`` when the catalogues are not loaded or are stale, since a
+        cached total may have been computed from different content.
+        """
+        if not self.loaded or self.stale:
+            return None
+        vec = self.vector(catalogue, ids)
+        return -vec if sign < 0 else vec
+
+
+# Shared registry used by :mod:`services.progression_service`.
+catalogues = CatalogueRegistry()
+
@@ -0,0 +1,109 @@
+# Project Name: Thronestead©
+# File Name: modifier_expiry.py
+# Version:  7/1/2025 10:38
+# Developer: Deathsgift66
+
+"""Time-indexed invalidation of cached modifiers.
+
+``village_modifiers.expires_at`` and ``projects_player.ends_at`` make a
+kingdom's modifiers change at a known instant without any write happening.
+:class:`ExpiryScheduler` keeps the next such instant per kingdom in a min-heap
+so a cached breakdown is dropped exactly when one of its modifiers lapses,
+instead of relying on a short TTL. Kingdoms with nothing pending are not
+tracked at all, which lets their entries be cached longer.
+"""
+
+from __future__ import annotations
+
+import heapq
+import math
+import time
+from threading import Lock
+from typing import Callable, Dict, Iterable, List, Tuple
+
+from services.modifiers_utils import invalidate_kingdoms
+
+
+class ExpiryScheduler:
+    """Min-heap of ``(expires_at, kingdom_id)`` with one live entry per kingdom.
+
+    Rescheduling a kingdom leaves its old heap entry behind; such stale
+    entries are skipped when popped and compacted away once they outnumber
+    the live ones.
+    """
+
+    def __init__(self, clock: Callable[[], float] = time.time) -> None:
+        self._clock = clock
+        self._heap: List[Tuple[float, int]] = []
+        self._next: Dict[int, float] = {}
+        self._lock = Lock()
+        self.fired = 0
+
+    def __len__(self) -> int:
+        return len(self._next)
+
+    def schedule(self, kingdom_id: int, expires_at: float | None) -> None:
+        """Track ``expires_at`` (epoch seconds) as the kingdom's next lapse.
+
+        ``None`` or ``math.inf`` means nothing is pending and stops tracking.
+        """
+        with self._lock:
+            if expires_at is None or expires_at == math.inf:
+                self._next.pop(kingdom_id, None)
+                return
+            if self._next.get(kingdom_id) == expires_at:
+                return
+            self._next[kingdom_id] = expires_at
+            heapq.heappush(self._heap, (expires_at, kingdom_id))
+            if len(self._heap) > 2 * len(self._next) + 64:
+                self._heap = [(at, kid) for kid, at in self._next.items()]
+                heapq.heapify(self._heap)
+
+    def next_expiry(self, kingdom_id: int) -> float | None:
+        return self._next.get(kingdom_id)
+
+    def seconds_until(self, kingdom_id: int) -> float | None:
+        """Seconds until the kingdom's next lapse, or ``None`` if none is pending."""
+        at = self._next.get(kingdom_id)
+        return None if at is None else at - self._clock()
+
+    def pop_due(self, now: float | None = None) -> List[int]:
+        """Remove and return every kingdom whose next expiry is at or before ``now``."""
+        now = self._clock() if now is None else now
+        due: List[int] = []
+        with self._lock:
+            heap = self._heap
+            while heap and heap[0][0] <= now:
+                at, kid = heapq.heappop(heap)
+                if self._next.get(kid) == at:
+                    del self._next[kid]
+                    due.append(kid)
+        return due
+
+    def run_due(self, invalidate: Callable[[Iterable[int]], int] = invalidate_kingdoms) -> int:
+        """Invalidate the cache entries of every kingdom whose modifiers lapsed."""
+        if not self._heap or self._heap[0][0] > self._clock():
+            return 0
+        due = self.pop_due()
+        if due:
+            invalidate(due)
+            self.fired += len(due)
+        return len(due)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._heap.clear()
+            self._next.clear()
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "tracked": len(self._next),
+                "heap_size": len(self._heap),
+                "next_expiry": min(self._next.values(), default=None),
+                "fired": self.fired,
+            }
+
+
+# Shared scheduler used by :mod:`services.progression_service`.
+modifier_expiries = ExpiryScheduler()
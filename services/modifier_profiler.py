@@ -0,0 +1,159 @@
+# Project Name: Thronestead©
+# File Name: modifier_profiler.py
+# Version:  7/1/2025 10:38
+# Developer: Deathsgift66
+
+"""Per-source instrumentation for modifier aggregation.
+
+:mod:`services.progression_service` merges up to 13 modifier sources and
+only logs a warning when one fails. :class:`ModifierProfiler` records, per
+source function, how often it ran, a latency histogram, how many rows it
+consumed and how often it raised. Calls, rows and errors are counted on
+every call; only the timing is sampled per aggregation with ``sample_rate``,
+so the profiler can stay on in production.
+"""
+
+from __future__ import annotations
+
+import math
+import random
+import time
+from bisect import bisect_left
+from threading import Lock
+from typing import Callable, Dict, List
+
+# Upper bounds (seconds) of the latency histogram buckets.
+LATENCY_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, math.inf)
+
+# Fraction of aggregations timed by default.
+DEFAULT_SAMPLE_RATE = 0.05
+
+
+class SourceStats:
+    """Counters for one modifier source."""
+
+    __slots__ = ("calls", "timed", "errors", "rows", "total_seconds", "max_seconds", "buckets")
+
+    def __init__(self) -> None:
+        self.calls = 0
+        self.timed = 0
+        self.errors = 0
+        self.rows = 0
+        self.total_seconds = 0.0
+        self.max_seconds = 0.0
+        self.buckets: List[int] = [0] * len(LATENCY_BUCKETS)
+
+    def as_dict(self) -> dict:
+        return {
+            "calls": self.calls,
+            "timed_calls": self.timed,
+            "errors": self.errors,
+            "rows": self.rows,
+            "total_seconds": self.total_seconds,
+            "mean_seconds": self.total_seconds / self.timed if self.timed else 0.0,
+            "max_seconds": self.max_seconds,
+            "histogram": {
+                ("+Inf" if bound == math.inf else str(bound)): count
+                for bound, count in zip(LATENCY_BUCKETS, self.buckets)
+            },
+        }
+
+
+class ModifierProfiler:
+    """Thread-safe latency, row and error counters keyed by source name."""
+
+    def __init__(
+        self,
+        sample_rate: float = DEFAULT_SAMPLE_RATE,
+        enabled: bool = True,
+        rng: Callable[[], float] = random.random,
+        clock: Callable[[], float] = time.perf_counter,
+    ) -> None:
+        self.enabled = enabled
+        self.sample_rate = sample_rate
+        self.clock = clock
+        self._rng = rng
+        self._lock = Lock()
+        self._sources: Dict[str, SourceStats] = {}
+        self.sampled = 0
+        self.skipped = 0
+
+    def configure(self, enabled: bool | None = None, sample_rate: float | None = None) -> None:
+        if enabled is not None:
+            self.enabled = enabled
+        if sample_rate is not None:
+            if not 0.0 <= sample_rate <= 1.0:
+                raise ValueError("sample_rate must be between 0 and 1")
+            self.sample_rate = sample_rate
+
+    def sample(self) -> bool:
+        """Decide whether the next aggregation is timed."""
+        if not self.enabled:
+            return False
+        hit = self.sample_rate >= 1.0 or self._rng() < self.sample_rate
+        with self._lock:
+            if hit:
+                self.sampled += 1
+            else:
+                self.skipped += 1
+        return hit
+
+    def _stats(self, source: str) -> SourceStats:
+        stats = self._sources.get(source)
+        if stats is None:
+            stats = self._sources[source] = SourceStats()
+        return stats
+
+    def record(self, source: str, seconds: float | None, rows: int | None = None) -> None:
+        """Record one call of ``source``; ``seconds`` is ``None`` when it was not timed.
+
+        ``total_seconds``, ``mean_seconds`` and the histogram cover only the
+        ``timed_calls``.
+        """
+        if not self.enabled:
+            return
+        with self._lock:
+            stats = self._stats(source)
+            stats.calls += 1
+            if rows:
+                stats.rows += rows
+            if seconds is None:
+                return
+            stats.timed += 1
+            stats.total_seconds += seconds
+            if seconds > stats.max_seconds:
+                stats.max_seconds = seconds
+            stats.buckets[bisect_left(LATENCY_BUCKETS, seconds)] += 1
+
+    def record_error(self, source: str) -> None:
+        """Count a failure of ``source``; recorded even when not sampling."""
+        if not self.enabled:
+            return
+        with self._lock:
+            self._stats(source).errors += 1
+
+    def snapshot(self) -> dict:
+        """Return all counters as plain data, e.g. for a metrics endpoint."""
+        with self._lock:
+            return {
+                "enabled": self.enabled,
+                "sample_rate": self.sample_rate,
+                "sampled": self.sampled,
+                "skipped": self.skipped,
+                "sources": {name: s.as_dict() for name, s in sorted(self._sources.items())},
+            }
+
+    def reset(self) -> None:
+        with self._lock:
+            self._sources.clear()
+            self.sampled = 0
+            self.skipped = 0
+
+
+# Shared profiler used by :mod:`services.progression_service`.
+modifier_profiler = ModifierProfiler()
+
+
+def get_modifier_profile() -> dict:
+    """Return the modifier profiler snapshot."""
+    return modifier_profiler.snapshot()
@@ -0,0 +1,245 @@
+# Project Name: Thronestead©
+# File Name: modifier_vector.py
+# Version:  7/1/2025 10:38
+# Developer: Deathsgift66
+
+"""Fixed-index vector representation of modifier sets.
+
+Nested ``{category: {key: value}}`` dicts are convenient at API edges, but
+merging them costs a ``setdefault`` and ``float()`` per key per source.
+:class:`ModifierIndex` assigns every ``(category, key)`` pair a stable slot,
+and :class:`ModifierVector` stores values in an ``array('d')`` alongside a
+presence bitmask, so sum and max stacking become whole-vector operations.
+Slots are only ever appended, so vectors built earlier stay valid and are
+padded with zeros when the index grows.
+"""
+
+from __future__ import annotations
+
+import operator
+from array import array
+from itertools import repeat, starmap, zip_longest
+from threading import Lock
+from typing import Dict, Iterable, Iterator, List, Tuple
+
+# Categories every aggregated total exposes, even when empty.
+MODIFIER_CATEGORIES = (
+    "resource_bonus",
+    "troop_bonus",
+    "combat_bonus",
+    "defense_bonus",
+    "economic_bonus",
+    "production_bonus",
+)
+
+
+class ModifierIndex:
+    """Append-only mapping of ``(category, key)`` to a vector slot."""
+
+    def __init__(self) -> None:
+        self._slots: Dict[Tuple[str, str], int] = {}
+        self._keys: List[Tuple[str, str]] = []
+        self._lock = Lock()
+
+    def __len__(self) -> int:
+        return len(self._keys)
+
+    def slot(self, category: str, key: str) -> int:
+        pair = (category, key)
+        slot = self._slots.get(pair)
+        if slot is None:
+            with self._lock:
+                slot = self._slots.get(pair)
+                if slot is None:
+                    slot = self._slots[pair] = len(self._keys)
+                    self._keys.append(pair)
+        return slot
+
+    def key(self, slot: int) -> Tuple[str, str]:
+        return self._keys[slot]
+
+    def rule_mask(self, rules) -> int:
+        """Return a slot bitmask of every key whose stacking rule is ``max``.
+
+        ``rules`` is ``{category: {key: "max"}}``; a bare string for a
+        category applies to all of its keys known to the index.
+        """
+        mask = 0
+        if not isinstance(rules, dict):
+            return mask
+        for category, rule_cat in rules.items():
+            if isinstance(rule_cat, dict):
+                for key, rule in rule_cat.items():
+                    if rule == "max":
+                        mask |= 1 << self.slot(category, key)
+            elif rule_cat == "max":
+                for slot, (cat, _) in enumerate(self._keys):
+                    if cat == category:
+                        mask |= 1 << slot
+        return mask
+
+
+def _bits(mask: int) -> Iterator[int]:
+    """Yield the set bit positions of ``mask`` in ascending order."""
+    while mask:
+        low = mask & -mask
+        yield low.bit_length() - 1
+        mask ^= low
+
+
+MODIFIER_INDEX = ModifierIndex()
+
+
+class ModifierVector:
+    """Dense modifier values over a :class:`ModifierIndex`.
+
+    ``present`` is a bitmask of slots that hold a value, so an explicit zero
+    is kept apart from an absent key and sparse vectors convert back cheaply.
+    """
+
+    __slots__ = ("index", "values", "present")
+
+    def __init__(
+        self,
+        index: ModifierIndex = MODIFIER_INDEX,
+        values: array | None = None,
+        present: int = 0,
+    ) -> None:
+        self.index = index
+        self.values = values if values is not None else array("d")
+        self.present = present
+
+    # ------------------------------------------------------------------
+    # Conversion
+    # ------------------------------------------------------------------
+
+    @classmethod
+    def from_dict(cls, mods, index: ModifierIndex = MODIFIER_INDEX) -> "ModifierVector":
+        """Build a vector from a nested dict, skipping invalid entries."""
+        vec = cls(index)
+        if not isinstance(mods, dict):
+            return vec
+        for category, inner in mods.items():
+            if not isinstance(inner, dict):
+                continue
+            for key, val in inner.items():
+                try:
+                    num = float(val)
+                except (TypeError, ValueError):
+                    continue
+                vec.add(category, key, num)
+        return vec
+
+    @classmethod
+    def from_triples(
+        cls, triples: Iterable[Tuple[str, str, float]], index: ModifierIndex = MODIFIER_INDEX
+    ) -> "ModifierVector":
+        vec = cls(index)
+        for category, key, val in triples:
+            vec.add(category, key, val)
+        return vec
+
+    def to_dict(self, categories: Iterable[str] = MODIFIER_CATEGORIES) -> dict:
+        """Return the nested dict form, always including ``categories``."""
+        out: dict = {cat: {} for cat in categories}
+        key = self.index.key
+        values = self.values
+        for slot in _bits(self.present):
+            category, name = key(slot)
+            bucket = out.get(category)
+            if bucket is None:
+                bucket = out[category] = {}
+            bucket[name] = values[slot]
+        return out
+
+    # ------------------------------------------------------------------
+    # Element access
+    # ------------------------------------------------------------------
+
+    def add(self, category: str, key: str, value: float) -> None:
+        slot = self.index.slot(category, key)
+        missing = slot + 1 - len(self.values)
+        if missing > 0:
+            self.values.extend(repeat(0.0, missing))
+        self.values[slot] += value
+        self.present |= 1 << slot
+
+    def get(self, category: str, key: str, default: float = 0.0) -> float:
+        slot = self.index.slot(category, key)
+        if self.present >> slot & 1:
+            return self.values[slot]
+        return default
+
+    def copy(self) -> "ModifierVector":
+        return ModifierVector(self.index, array("d", self.values), self.present)
+
+    def __bool__(self) -> bool:
+        return bool(self.present)
+
+    def __eq__(self, other) -> bool:
+        if not isinstance(other, ModifierVector):
+            return NotImplemented
+        return self.to_dict(()) == other.to_dict(())
+
+    def __repr__(self) -> str:
+        return f"ModifierVector({self.to_dict(())!r})"
+
+    # ------------------------------------------------------------------
+    # Whole-vector operations
+    # ------------------------------------------------------------------
+
+    def _combine(self, op, other: "ModifierVector") -> None:
+        self.values = array(
+            "d", starmap(op, zip_longest(self.values, other.values, fillvalue=0.0))
+        )
+        self.present |= other.present
+
+    def __iadd__(self, other: "ModifierVector") -> "ModifierVector":
+        self._combine(operator.add, other)
+        return self
+
+    def __isub__(self, other: "ModifierVector") -> "ModifierVector":
+        self._combine(operator.sub, other)
+        return self
+
+    def __add__(self, other: "ModifierVector") -> "ModifierVector":
+        result = self.copy()
+        result += other
+        return result
+
+    def __sub__(self, other: "ModifierVector") -> "ModifierVector":
+        result = self.copy()
+        result -= other
+        return result
+
+    def __neg__(self) -> "ModifierVector":
+        return ModifierVector(self.index, array("d", map(operator.neg, self.values)), self.present)
+
+    def maximum(self, other: "ModifierVector") -> "ModifierVector":
+        """In place element-wise ``max`` (the ``"max"`` stacking rule)."""
+        self._combine(max, other)
+        return self
+
+    def merge_with_rules(self, other: "ModifierVector", mask: int) -> "ModifierVector":
+        """In place merge using ``max`` on slots in ``mask`` and sum elsewhere."""
+        before = self.values
+        self._combine(operator.add, other)
+        theirs = other.values
+        for slot in _bits(mask & other.present):
+            mine = before[slot] if slot < len(before) else 0.0
+            self.values[slot] = max(mine, theirs[slot])
+        return self
+
+
+def sum_vectors(
+    vectors: Iterable[ModifierVector], index: ModifierIndex = MODIFIER_INDEX
+) -> ModifierVector:
+    """Return the element-wise sum of ``vectors`` in one column-wise pass."""
+    vectors = [v for v in vectors if v.present]
+    if not vectors:
+        return ModifierVector(index)
+    present = 0
+    for vec in vectors:
+        present |= vec.present
+    values = array("d", map(sum, zip_longest(*(v.values for v in vectors), fillvalue=0.0)))
+    return ModifierVector(index, values, present)
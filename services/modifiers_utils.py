@@ -4,15 +4,321 @@
 # Developer: Deathsgift66
 """Shared utilities for modifier handling."""
 
-import logging
 import json
+import logging
+import math
+import time
+from collections import OrderedDict
+from threading import Lock
+from typing import Callable, Iterable, Mapping, Protocol
 
-# Cached modifier data to reduce expensive aggregation queries.
-_modifier_cache: dict[int, tuple[float, dict]] = {}
-
+from services.modifier_vector import ModifierVector
 
 logger = logging.getLogger(__name__)
 
+# Default lifetime and capacity of cached modifier totals.
+_CACHE_TTL = 60
+_CACHE_MAXSIZE = 10_000
+# Deltas applied to one cached breakdown before it must be rebuilt from the
+# database, which bounds any drift between incremental and full results.
+MAX_DELTAS_PER_ENTRY = 32
+
+
+class CacheBackend(Protocol):
+    """Shared store that lets several workers agree on cached modifiers."""
+
+    def get(self, key: str) -> dict | None: ...
+
+    def set(self, key: str, value: dict, ttl: float, tags: Iterable[str] = ()) -> None: ...
+
+    def delete(self, keys: Iterable[str]) -> int: ...
+
+    def delete_tag(self, tag: str) -> int: ...
+
+    def clear(self) -> None: ...
+
+
+class LocalCacheBackend:
+    """In-process :class:`CacheBackend` used by tests and single-worker setups."""
+
+    def __init__(self, clock: Callable[[], float] = time.monotonic) -> None:
+        self._clock = clock
+        self._values: dict[str, tuple[float, dict]] = {}
+        self._tags: dict[str, set[str]] = {}
+        self._lock = Lock()
+
+    def get(self, key: str) -> dict | None:
+        with self._lock:
+            entry = self._values.get(key)
+            if entry is None:
+                return None
+            if entry[0] <= self._clock():
+                del self._values[key]
+                return None
+            return entry[1]
+
+    def set(self, key: str, value: dict, ttl: float, tags: Iterable[str] = ()) -> None:
+        with self._lock:
+            self._values[key] = (self._clock() + ttl, value)
+            for tag in tags:
+                self._tags.setdefault(tag, set()).add(key)
+
+    def delete(self, keys: Iterable[str]) -> int:
+        with self._lock:
+            return sum(self._values.pop(k, None) is not None for k in keys)
+
+    def delete_tag(self, tag: str) -> int:
+        with self._lock:
+            keys = self._tags.pop(tag, set())
+            return sum(self._values.pop(k, None) is not None for k in keys)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._values.clear()
+            self._tags.clear()
+
+
+class RedisCacheBackend:
+    """:class:`CacheBackend` over a redis-py compatible ``client``.
+
+    Values are stored as JSON under ``prefix`` (``modifiers:kingdom:<id>``,
+    see ``docs/redis_caching_strategies.md``) and each tag is a set of keys,
+    so an invalidation issued by one worker is seen by all of them.
+    """
+
+    def __init__(
+        self, client, prefix: str = "modifiers:kingdom:", tag_prefix: str = "modifiers:tag:"
+    ) -> None:
+        self.client = client
+        self.prefix = prefix
+        self.tag_prefix = tag_prefix
+
+    def get(self, key: str) -> dict | None:
+        raw = self.client.get(self.prefix + key)
+        return json.loads(raw) if raw else None
+
+    def set(self, key: str, value: dict, ttl: float, tags: Iterable[str] = ()) -> None:
+        seconds = max(1, math.ceil(ttl))
+        full = self.prefix + key
+        self.client.set(full, json.dumps(value), ex=seconds)
+        for tag in tags:
+            tag_key = self.tag_prefix + tag
+            self.client.sadd(tag_key, full)
+            self.client.expire(tag_key, seconds)
+
+    def delete(self, keys: Iterable[str]) -> int:
+        full = [self.prefix + k for k in keys]
+        return int(self.client.delete(*full)) if full else 0
+
+    def delete_tag(self, tag: str) -> int:
+        tag_key = self.tag_prefix + tag
+        members = list(self.client.smembers(tag_key))
+        self.client.delete(tag_key)
+        return int(self.client.delete(*members)) if members else 0
+
+    def clear(self) -> None:
+        keys = list(self.client.scan_iter(match=f"{self.prefix}*"))
+        keys += list(self.client.scan_iter(match=f"{self.tag_prefix}*"))
+        if keys:
+            self.client.delete(*keys)
+
+
+class ModifierCache:
+    """Size-bounded LRU + TTL cache of aggregated modifiers per kingdom.
+
+    Entries may carry dependency tags (e.g. ``"alliance:7"``) so an event
+    can invalidate exactly the kingdoms it affects. With a shared ``backend``
+    every lookup goes through it and the local LRU is bypassed, keeping all
+    workers consistent.
+    """
+
+    def __init__(
+        self,
+        maxsize: int = _CACHE_MAXSIZE,
+        ttl: float = _CACHE_TTL,
+        backend: CacheBackend | None = None,
+        clock: Callable[[], float] = time.monotonic,
+    ) -> None:
+        if maxsize < 1:
+            raise ValueError("maxsize must be at least 1")
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.backend = backend
+        self._clock = clock
+        self._entries: OrderedDict[int, tuple[float, dict]] = OrderedDict()
+        self._tags: dict[str, set[int]] = {}
+        self._key_tags: dict[int, tuple[str, ...]] = {}
+        self._lock = Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+        self.invalidations = 0
+        self.updates = 0
+
+    def _drop(self, key: int) -> bool:
+        if self._entries.pop(key, None) is None:
+            return False
+        for tag in self._key_tags.pop(key, ()):
+            keys = self._tags.get(tag)
+            if keys is not None:
+                keys.discard(key)
+                if not keys:
+                    del self._tags[tag]
+        return True
+
+    def get(self, key: int) -> dict | None:
+        """Return the cached value for ``key`` or ``None`` on a miss."""
+        if self.backend is not None:
+            value = self.backend.get(str(key))
+            with self._lock:
+                if value is None:
+                    self.misses += 1
+                else:
+                    self.hits += 1
+            return value
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return None
+            if entry[0] <= self._clock():
+                self._drop(key)
+                self.expirations += 1
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry[1]
+
+    def set(
+        self, key: int, value: dict, tags: Iterable[str] = (), ttl: float | None = None
+    ) -> None:
+        """Store ``value`` for ``key``; ``ttl`` overrides the default lifetime."""
+        ttl = self.ttl if ttl is None else ttl
+        tags = tuple(tags)
+        if self.backend is not None:
+            self.backend.set(str(key), value, ttl, tags)
+            return
+        with self._lock:
+            self._drop(key)
+            self._entries[key] = (self._clock() + ttl, value)
+            if tags:
+                self._key_tags[key] = tags
+                for tag in tags:
+                    self._tags.setdefault(tag, set()).add(key)
+            while len(self._entries) > self.maxsize:
+                self._drop(next(iter(self._entries)))
+                self.evictions += 1
+
+    def update(self, key: int, fn: Callable[[dict], dict | None]) -> bool:
+        """Replace the entry for ``key`` with ``fn(entry)``, keeping expiry and tags.
+
+        Returns ``False`` when there is nothing to update. If ``fn`` returns
+        ``None`` the entry is dropped instead. A shared ``backend`` cannot apply
+        the change atomically across workers, so there the entry is dropped.
+        """
+        if self.backend is not None:
+            self.invalidate(key)
+            return False
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None or entry[0] <= self._clock():
+                return False
+            value = fn(entry[1])
+            if value is None:
+                self._drop(key)
+                self.invalidations += 1
+                return False
+            self._entries[key] = (entry[0], value)
+            self.updates += 1
+            return True
+
+    def invalidate(self, key: int) -> bool:
+        """Drop ``key``; return whether an entry was removed."""
+        return self.invalidate_many([key]) > 0
+
+    def invalidate_many(self, keys: Iterable[int]) -> int:
+        keys = list(keys)
+        if self.backend is not None:
+            removed = self.backend.delete([str(k) for k in keys])
+        else:
+            with self._lock:
+                removed = sum(self._drop(k) for k in keys)
+        with self._lock:
+            self.invalidations += removed
+        return removed
+
+    def invalidate_tag(self, tag: str) -> int:
+        """Drop every entry stored with ``tag``."""
+        if self.backend is not None:
+            removed = self.backend.delete_tag(tag)
+        else:
+            with self._lock:
+                removed = sum(self._drop(k) for k in list(self._tags.get(tag, ())))
+        with self._lock:
+            self.invalidations += removed
+        return removed
+
+    def clear(self) -> None:
+        if self.backend is not None:
+            self.backend.clear()
+        with self._lock:
+            self._entries.clear()
+            self._tags.clear()
+            self._key_tags.clear()
+
+    def configure(
+        self,
+        maxsize: int | None = None,
+        ttl: float | None = None,
+        backend: CacheBackend | None = None,
+    ) -> None:
+        """Adjust limits or attach a shared ``backend`` at startup."""
+        if maxsize is not None:
+            self.maxsize = maxsize
+        if ttl is not None:
+            self.ttl = ttl
+        if backend is not None:
+            self.backend = backend
+        self.clear()
+
+    def stats(self) -> dict:
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "size": len(self._entries),
+                "maxsize": self.maxsize,
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": self.hits / lookups if lookups else 0.0,
+                "evictions": self.evictions,
+                "expirations": self.expirations,
+                "invalidations": self.invalidations,
+                "updates": self.updates,
+                "shared": self.backend is not None,
+            }
+
+    def adjusted_keys(self) -> list[int]:
+        """Return local keys whose live entries have absorbed deltas, least recent first."""
+        now = self._clock()
+        with self._lock:
+            return [
+                key
+                for key, (expires, value) in self._entries.items()
+                if expires > now and value.get("deltas")
+            ]
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def __contains__(self, key: int) -> bool:
+        return key in self._entries
+
+
+# Cached modifier data to reduce expensive aggregation queries.
+_modifier_cache = ModifierCache()
+
 
 def parse_json_field(value):
     """Return ``value`` parsed as JSON when it's a string."""
@@ -43,7 +349,120 @@ def _merge_modifiers(target: dict, mods: dict) -> None:
 
 def invalidate_cache(kingdom_id: int) -> None:
     """Clear cached modifiers for the given kingdom."""
-    _modifier_cache.pop(kingdom_id, None)
+    _modifier_cache.invalidate(kingdom_id)
+
+
+def invalidate_kingdoms(kingdom_ids: Iterable[int]) -> int:
+    """Clear cached modifiers for every kingdom in ``kingdom_ids``."""
+    return _modifier_cache.invalidate_many({k for k in kingdom_ids if k is not None})
+
+
+def invalidate_alliance(alliance_id: int) -> int:
+    """Clear cached modifiers for every member kingdom of ``alliance_id``."""
+    return _modifier_cache.invalidate_tag(alliance_tag(alliance_id))
+
+
+def _without_zeros(mods: dict) -> dict:
+    return {
+        cat: kept
+        for cat, inner in mods.items()
+        if (kept := {key: val for key, val in inner.items() if val})
+    }
+
+
+def apply_delta_to_breakdown(
+    breakdown: dict,
+    delta: ModifierVector,
+    label: str,
+    changed_at: float | None = None,
+) -> dict | None:
+    """Return a copy of ``breakdown`` with signed ``delta`` added under ``label``.
+
+    Totals are adjusted directly. In ``sources`` a delta that exactly cancels
+    an entry with the same label removes it, otherwise it is folded into the
+    first entry with that label or appended. Returns ``None`` once the entry
+    has absorbed :data:`MAX_DELTAS_PER_ENTRY` deltas, or when it was computed
+    at or after ``changed_at`` and so may already include the change.
+    """
+    applied = breakdown.get("deltas", 0)
+    if applied >= MAX_DELTAS_PER_ENTRY:
+        return None
+    if changed_at is not None and breakdown.get("computed_at", 0) >= changed_at:
+        return None
+    totals = ModifierVector.from_dict(breakdown["totals"])
+    totals += delta
+    sources = list(breakdown.get("sources", ()))
+    cancelled = (-delta).to_dict(())
+    matches = [i for i, entry in enumerate(sources) if entry["source"] == label]
+    exact = next((i for i in matches if sources[i]["modifiers"] == cancelled), None)
+    if exact is not None:
+        del sources[exact]
+    elif matches:
+        first = matches[0]
+        merged = ModifierVector.from_dict(sources[first]["modifiers"]) + delta
+        mods = _without_zeros(merged.to_dict(()))
+        if mods:
+            sources[first] = {"source": label, "modifiers": mods}
+        else:
+            del sources[first]
+    else:
+        sources.append({"source": label, "modifiers": delta.to_dict(())})
+    return {
+        **breakdown,
+        "totals": totals.to_dict(),
+        "sources": sources,
+        "deltas": applied + 1,
+    }
+
+
+def apply_modifier_delta(
+    kingdom_id: int,
+    delta: ModifierVector | None,
+    label: str,
+    *,
+    changed_at: float | None = None,
+) -> bool:
+    """Adjust ``kingdom_id``'s cached modifiers by ``delta`` instead of dropping them.
+
+    ``delta`` is signed: add a source's vector when it activates and its
+    negation when it lapses. Only additive sources may use this path. A
+    ``None`` delta means the change could not be expressed as one, so the
+    entry is invalidated. ``changed_at`` is the ``time.time()`` taken just
+    before the change was committed; entries computed since then are dropped
+    rather than adjusted twice. Returns whether a cached entry was adjusted.
+    """
+    if delta is None:
+        invalidate_cache(kingdom_id)
+        return False
+    if not delta:
+        return False
+
+    return _modifier_cache.update(
+        kingdom_id,
+        lambda entry: apply_delta_to_breakdown(entry, delta, label, changed_at),
+    )
+
+
+def apply_modifier_deltas(
+    deltas: Mapping[int, ModifierVector | None],
+    label: str,
+    *,
+    changed_at: float | None = None,
+) -> int:
+    """Apply :func:`apply_modifier_delta` per kingdom; return how many were adjusted."""
+    return sum(
+        apply_modifier_delta(kid, delta, label, changed_at=changed_at)
+        for kid, delta in deltas.items()
+    )
+
+
+def alliance_tag(alliance_id: int) -> str:
+    return f"alliance:{alliance_id}"
+
+
+def get_modifier_cache_stats() -> dict:
+    """Return hit/miss/eviction counters for the modifier cache."""
+    return _modifier_cache.stats()
 
 
 def merge_modifiers_with_rules(target: dict, mods: dict, rules: dict) -> None:
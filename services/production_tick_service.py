@@ -7,16 +7,33 @@
 from __future__ import annotations
 
 import logging
+import time
 from collections import defaultdict
 
 from services.sqlalchemy_support import Session, text
 
-from . import progression_service
-from .resource_service import gain_resources
+from . import progression_service, resource_service
+from .resource_service import (
+    RESOURCE_TYPES,
+    apply_resource_deltas_bulk,
+    gain_resources,
+    set_accrual_rates,
+)
 
 logger = logging.getLogger(__name__)
 
 
+# Kingdoms written per batched UPDATE and commit in :func:`tick_all_production`.
+TICK_CHUNK_SIZE = 1000
+
+
+def _production_multiplier(mods) -> float:
+    """Return ``1 + sum(production_bonus) / 100`` for aggregated modifiers."""
+    prod_bonus = mods.get("production_bonus", {}) if isinstance(mods, dict) else {}
+    total_bonus = sum(float(v) for v in prod_bonus.values()) if isinstance(prod_bonus, dict) else 0.0
+    return 1.0 + (total_bonus / 100.0 if total_bonus else 0.0)
+
+
 def tick_kingdom_production(db: Session, kingdom_id: int) -> dict[str, int]:
     """Apply a single production tick for a kingdom.
 
@@ -34,9 +51,14 @@ def tick_kingdom_production(db: Session, kingdom_id: int) -> dict[str, int]:
     Returns
     -------
     dict[str, int]
-        Mapping of resource type to amount added.
+        Mapping of resource type to amount added. Empty in
+        :data:`resource_service.ACCRUAL_MODE`, where production accrues
+        lazily and crediting it here would count it twice.
     """
 
+    if resource_service.ACCRUAL_MODE:
+        return {}
+
     rows = db.execute(
         text(
             """
@@ -56,10 +78,7 @@ def tick_kingdom_production(db: Session, kingdom_id: int) -> dict[str, int]:
         return {}
 
     mods = progression_service.get_total_modifiers(db, kingdom_id)
-    prod_bonus = mods.get("production_bonus", {}) if isinstance(mods, dict) else {}
-    total_bonus = sum(float(v) for v in prod_bonus.values()) if isinstance(prod_bonus, dict) else 0.0
-
-    multiplier = 1.0 + (total_bonus / 100.0 if total_bonus else 0.0)
+    multiplier = _production_multiplier(mods)
     gained = {res: int(rate * multiplier) for res, rate in base_rates.items()}
 
     try:
@@ -69,3 +88,174 @@ def tick_kingdom_production(db: Session, kingdom_id: int) -> dict[str, int]:
         raise
 
     return gained
+
+
+def _load_base_rates(db: Session) -> dict[int, dict[str, float]]:
+    """Return ``{kingdom_id: {resource: base_rate}}`` for every kingdom."""
+    rows = db.execute(
+        text(
+            """
+            SELECT kv.kingdom_id,
+                   vp.resource_type,
+                   SUM(vp.production_rate * vp.seasonal_multiplier)
+              FROM village_production vp
+              JOIN kingdom_villages kv ON kv.village_id = vp.village_id
+             GROUP BY kv.kingdom_id, vp.resource_type
+            """
+        )
+    ).fetchall()
+    base_rates: dict[int, dict[str, float]] = defaultdict(dict)
+    skipped = set()
+    for kid, res, rate in rows:
+        if res not in RESOURCE_TYPES:
+            skipped.add(res)
+            continue
+        base_rates[kid][res] = float(rate or 0)
+    if skipped:
+        logger.warning("Ignoring unknown production resources: %s", sorted(skipped))
+    return base_rates
+
+
+def tick_all_production(db: Session, *, chunk_size: int = TICK_CHUNK_SIZE) -> dict:
+    """Apply one production tick to every kingdom with producing villages.
+
+    Base rates for all kingdoms come from one grouped query over
+    ``village_production`` and ``kingdom_villages``, modifiers from
+    :func:`progression_service.get_total_modifiers_bulk`, and the gains are
+    written ``chunk_size`` kingdoms at a time with
+    :func:`resource_service.apply_resource_deltas_bulk` and one commit per
+    chunk. A failing chunk is rolled back and skipped so the rest
+    of the world still ticks.
+
+    Returns a report with the number of kingdoms and chunks processed, the
+    total gained per resource and the seconds spent in each phase. In
+    :data:`resource_service.ACCRUAL_MODE` nothing is credited, since
+    production already accrues lazily; the tick runs
+    :func:`refresh_accrual_rates` instead so rates follow production changes.
+    """
+    if resource_service.ACCRUAL_MODE:
+        refreshed = refresh_accrual_rates(db, chunk_size=chunk_size)
+        logger.info("Production tick refreshed %d accrual rates", refreshed["changed"])
+        return {
+            "kingdoms": 0,
+            "chunks": 0,
+            "failed_chunks": refreshed["failed_chunks"],
+            "gained": {},
+            "timings": refreshed["timings"],
+            "accrual_mode": True,
+            "rates_changed": refreshed["changed"],
+        }
+
+    timings: dict[str, float] = {}
+    clock = time.perf_counter
+
+    start = clock()
+    base_rates = _load_base_rates(db)
+    timings["base_rates"] = clock() - start
+
+    start = clock()
+    mods = progression_service.get_total_modifiers_bulk(db, list(base_rates))
+    timings["modifiers"] = clock() - start
+
+    start = clock()
+    gains: dict[int, dict[str, int]] = {}
+    for kid, rates in base_rates.items():
+        multiplier = _production_multiplier(mods.get(kid, {}))
+        gained = {res: int(rate * multiplier) for res, rate in rates.items()}
+        gained = {res: amt for res, amt in gained.items() if amt > 0}
+        if gained:
+            gains[kid] = gained
+    timings["compute"] = clock() - start
+
+    start = clock()
+    kids = list(gains)
+    totals: dict[str, int] = defaultdict(int)
+    chunks = failed = 0
+    for offset in range(0, len(kids), chunk_size):
+        chunk = {kid: gains[kid] for kid in kids[offset : offset + chunk_size]}
+        try:
+            apply_resource_deltas_bulk(db, chunk, commit=False)
+            db.commit()
+            chunks += 1
+        except Exception:
+            db.rollback()
+            failed += 1
+            logger.exception("Failed applying production for %d kingdoms", len(chunk))
+            continue
+        for gained in chunk.values():
+            for res, amt in gained.items():
+                totals[res] += amt
+    timings["apply"] = clock() - start
+
+    logger.info(
+        "Production tick: %d kingdoms in %d chunks (%d failed); %s",
+        len(gains),
+        chunks,
+        failed,
+        ", ".join(f"{phase} {secs:.3f}s" for phase, secs in timings.items()),
+    )
+    return {
+        "kingdoms": len(gains),
+        "chunks": chunks,
+        "failed_chunks": failed,
+        "gained": dict(totals),
+        "timings": timings,
+    }
+
+
+def refresh_accrual_rates(db: Session, *, chunk_size: int = TICK_CHUNK_SIZE) -> dict:
+    """Recompute per-tick production rates for :data:`resource_service.ACCRUAL_MODE`.
+
+    Rates are derived exactly like :func:`tick_all_production` gains but kept
+    fractional. Only kingdoms whose rates changed are written; each is settled
+    at its old rate first, with one commit per chunk. In accrual mode the
+    scheduled :func:`tick_all_production` runs this; call it directly after
+    events that change production (buildings, modifiers, seasons) to apply
+    them before the next tick.
+    """
+    timings: dict[str, float] = {}
+    clock = time.perf_counter
+
+    start = clock()
+    base_rates = _load_base_rates(db)
+    stored = {
+        kid: dict(rates or {})
+        for kid, rates in db.execute(
+            text("SELECT kingdom_id, rates FROM kingdom_resource_accrual")
+        ).fetchall()
+    }
+    timings["load"] = clock() - start
+
+    start = clock()
+    mods = progression_service.get_total_modifiers_bulk(db, list(base_rates))
+    timings["modifiers"] = clock() - start
+
+    start = clock()
+    changed: dict[int, dict[str, float]] = {}
+    for kid in base_rates.keys() | stored.keys():
+        multiplier = _production_multiplier(mods.get(kid, {}))
+        rates = {
+            res: round(rate * multiplier, 6)
+            for res, rate in base_rates.get(kid, {}).items()
+            if rate > 0
+        }
+        if rates != {res: round(float(r), 6) for res, r in stored.get(kid, {}).items()}:
+            changed[kid] = rates
+    timings["compute"] = clock() - start
+
+    start = clock()
+    kids = list(changed)
+    failed = 0
+    for offset in range(0, len(kids), chunk_size):
+        chunk = kids[offset : offset + chunk_size]
+        try:
+            for kid in chunk:
+                set_accrual_rates(db, kid, changed[kid], commit=False)
+            db.commit()
+        except Exception:
+            db.rollback()
+            failed += 1
+            logger.exception("Failed updating accrual rates for %d kingdoms", len(chunk))
+    timings["apply"] = clock() - start
+
+    return {"changed": len(changed), "failed_chunks": failed, "timings": timings}
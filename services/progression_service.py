@@ -5,13 +5,11 @@
 # Description: Utility service for calculating troop slots, verifying progression gates, and merging live gameplay modifiers.
 
 import logging
+import math
 import time
 from threading import Lock
-from typing import Dict, Set
-from services.modifiers_utils import (
-    parse_json_field,
-    merge_modifiers_with_rules,
-)
+from typing import Dict, NamedTuple, Set
+from services.modifiers_utils import parse_json_field
 
 from fastapi import HTTPException
 
@@ -35,9 +33,14 @@ except ImportError:
     global_game_settings = {}
     castle_progression_state = {}
 
-from .faith_service import _get_faith_modifiers
+from .faith_service import _get_faith_modifiers, blessing_modifiers
+from .modifier_catalogue import catalogues
+from .modifier_expiry import modifier_expiries
+from .modifier_profiler import modifier_profiler
+from .modifier_vector import MODIFIER_INDEX, ModifierVector, sum_vectors
 from services.modifiers_utils import (
     _merge_modifiers,
+    alliance_tag,
     invalidate_cache,
     _modifier_cache,
 )
@@ -130,9 +133,6 @@ def reset_state() -> None:
         nobles.clear()
         knights.clear()
 
-# Number of seconds before cached modifiers expire.
-_CACHE_TTL = 60
-
 # --------------------------------------------------------
 # Troop Slot Calculation
 # --------------------------------------------------------
@@ -269,6 +269,83 @@ def check_progression_requirements(
 # --------------------------------------------------------
 
 
+# Row -> modifier converters shared by the per-source functions and the
+# consolidated loader so both paths produce identical results.
+
+
+def _region_rows_to_mods(rows) -> dict:
+    mods: dict = {}
+    for btype, val in rows:
+        bucket = mods.setdefault(btype, {})
+        try:
+            val_num = float(val)
+        except (TypeError, ValueError):
+            continue
+        bucket["value"] = bucket.get("value", 0) + val_num
+    return mods
+
+
+def _blob_rows_to_mods(blobs) -> dict:
+    mods: dict = {}
+    for m in blobs:
+        if m:
+            _merge_modifiers(mods, parse_json_field(m))
+    return mods
+
+
+def _village_count_to_mods(count) -> dict:
+    if not count:
+        return {}
+    return {"production_bonus": {"villages": count}}
+
+
+class SourceParts(NamedTuple):
+    """A source's combined vector plus its individually labelled parts."""
+
+    vector: ModifierVector
+    parts: list
+
+
+def _village_row_mod(row) -> tuple[str, dict, dict]:
+    """Return ``(label, modifiers, stacking_rules)`` for one village_modifiers row."""
+    rb, tb, csb, dbonus, tradeb, source, rules = row
+    row_mod: dict = {}
+    if rb:
+        row_mod["resource_bonus"] = parse_json_field(rb)
+    if tb:
+        row_mod["troop_bonus"] = parse_json_field(tb)
+    if csb:
+        row_mod.setdefault("production_bonus", {})[
+            "construction_speed_bonus"
+        ] = float(csb)
+    if dbonus:
+        row_mod.setdefault("defense_bonus", {})["village"] = float(dbonus)
+    if tradeb:
+        row_mod.setdefault("economic_bonus", {})["trade_bonus"] = float(tradeb)
+    return source or "Village Modifier", row_mod, parse_json_field(rules) or {}
+
+
+def _village_rows_to_parts(rows) -> SourceParts:
+    """Merge village modifier rows, applying each row's stacking rules."""
+    vec = ModifierVector()
+    parts = []
+    for row in rows:
+        label, row_mod, r_rules = _village_row_mod(row)
+        row_vec = ModifierVector.from_dict(row_mod)
+        vec.merge_with_rules(row_vec, MODIFIER_INDEX.rule_mask(r_rules))
+        parts.append((label, row_vec.to_dict(())))
+    return SourceParts(vec, parts)
+
+
+def _treaty_rows_to_mods(rows) -> dict:
+    mods: dict = {}
+    for effect, target, magnitude in rows:
+        if magnitude is None:
+            continue
+        bucket = mods.setdefault(effect, {})
+        bucket[target] = bucket.get(target, 0) + float(magnitude)
+    return mods
+
 
 def _region_modifiers(db: Session, kingdom_id: int) -> dict:
     """Return modifiers granted by the kingdom's region."""
@@ -284,18 +361,7 @@ def _region_modifiers(db: Session, kingdom_id: int) -> dict:
         ),
         {"code": region_code},
     ).fetchall()
-    if not rows:
-        return {}
-
-    mods: dict = {}
-    for btype, val in rows:
-        bucket = mods.setdefault(btype, {})
-        try:
-            val_num = float(val)
-        except (TypeError, ValueError):
-            continue
-        bucket["value"] = bucket.get("value", 0) + val_num
-    return mods
+    return _region_rows_to_mods(rows)
 
 
 def _tech_modifiers(db: Session, kingdom_id: int) -> dict:
@@ -310,10 +376,7 @@ def _tech_modifiers(db: Session, kingdom_id: int) -> dict:
         ),
         {"kid": kingdom_id},
     ).fetchall()
-    mods: dict = {}
-    for (m,) in rows:
-        _merge_modifiers(mods, m or {})
-    return mods
+    return _blob_rows_to_mods(m for (m,) in rows)
 
 
 def _temple_modifiers(db: Session, kingdom_id: int) -> dict:
@@ -331,10 +394,7 @@ def _temple_modifiers(db: Session, kingdom_id: int) -> dict:
         ),
         {"kid": kingdom_id},
     ).fetchall()
-    mods: dict = {}
-    for (m,) in rows:
-        _merge_modifiers(mods, m or {})
-    return mods
+    return _blob_rows_to_mods(m for (m,) in rows)
 
 
 def _kingdom_project_modifiers(db: Session, kingdom_id: int) -> dict:
@@ -350,10 +410,7 @@ def _kingdom_project_modifiers(db: Session, kingdom_id: int) -> dict:
         ),
         {"kid": kingdom_id},
     ).fetchall()
-    mods: dict = {}
-    for (m,) in rows:
-        _merge_modifiers(mods, m or {})
-    return mods
+    return _blob_rows_to_mods(m for (m,) in rows)
 
 
 def _alliance_project_modifiers(db: Session, kingdom_id: int) -> dict:
@@ -372,11 +429,7 @@ def _alliance_project_modifiers(db: Session, kingdom_id: int) -> dict:
         ),
         {"kid": kingdom_id},
     ).fetchall()
-    mods: dict = {}
-    for (m,) in rows:
-        if m:
-            _merge_modifiers(mods, parse_json_field(m))
-    return mods
+    return _blob_rows_to_mods(m for (m,) in rows)
 
 
 def _vip_modifiers(_: Session, kingdom_id: int) -> dict:
@@ -397,12 +450,10 @@ def _village_modifiers(db: Session, kingdom_id: int) -> dict:
         text("SELECT COUNT(*) FROM kingdom_villages WHERE kingdom_id = :kid"),
         {"kid": kingdom_id},
     ).scalar()
-    if not count:
-        return {}
-    return {"production_bonus": {"villages": count}}
+    return _village_count_to_mods(count)
 
 
-def _village_modifier_rows(db: Session, kingdom_id: int) -> dict:
+def _village_modifier_rows(db: Session, kingdom_id: int) -> SourceParts:
     """Return modifiers from active rows in village_modifiers."""
     rows = db.execute(
         text(
@@ -412,6 +463,7 @@ def _village_modifier_rows(db: Session, kingdom_id: int) -> dict:
                    vm.construction_speed_bonus,
                    vm.defense_bonus,
                    vm.trade_bonus,
+                   vm.source,
                    vm.stacking_rules
               FROM village_modifiers vm
               JOIN kingdom_villages kv ON kv.village_id = vm.village_id
@@ -421,24 +473,7 @@ def _village_modifier_rows(db: Session, kingdom_id: int) -> dict:
         ),
         {"kid": kingdom_id},
     ).fetchall()
-    mods: dict = {}
-    for rb, tb, csb, dbonus, tradeb, rules in rows:
-        row_mod: dict = {}
-        if rb:
-            row_mod["resource_bonus"] = parse_json_field(rb)
-        if tb:
-            row_mod["troop_bonus"] = parse_json_field(tb)
-        if csb:
-            row_mod.setdefault("production_bonus", {})[
-                "construction_speed_bonus"
-            ] = float(csb)
-        if dbonus:
-            row_mod.setdefault("defense_bonus", {})["village"] = float(dbonus)
-        if tradeb:
-            row_mod.setdefault("economic_bonus", {})["trade_bonus"] = float(tradeb)
-        r_rules = parse_json_field(rules) or {}
-        merge_modifiers_with_rules(mods, row_mod, r_rules)
-    return mods
+    return _village_rows_to_parts(rows)
 
 
 def _treaty_modifiers(db: Session, kingdom_id: int) -> dict:
@@ -455,13 +490,7 @@ def _treaty_modifiers(db: Session, kingdom_id: int) -> dict:
         ),
         {"kid": kingdom_id},
     ).fetchall()
-    mods: dict = {}
-    for effect, target, magnitude in rows:
-        if magnitude is None:
-            continue
-        bucket = mods.setdefault(effect, {})
-        bucket[target] = bucket.get(target, 0) + float(magnitude)
-    return mods
+    return _treaty_rows_to_mods(rows)
 
 
 def _spy_modifiers(_: Session, kingdom_id: int) -> dict:
@@ -493,34 +522,448 @@ _MODIFIER_SOURCES = [
 ]
 
 
-def get_total_modifiers(
+# --------------------------------------------------------
+# Consolidated Loader
+# --------------------------------------------------------
+
+# Every database-backed source for a set of kingdoms in one round trip. Each
+# branch is tagged with ``src`` and the owning ``kid`` and shaped into the
+# shared (k1, k2, num, payload) columns. Catalogue-backed sources return ids
+# only; their modifiers come precompiled from ``catalogues``.
+_ALL_DB_SOURCES_SQL = """
+    SELECT 'region' AS src, k.kingdom_id AS kid, rb.bonus_type AS k1,
+           CAST(rb.bonus_value AS TEXT) AS k2,
+           CAST(NULL AS DOUBLE PRECISION) AS num,
+           CAST(NULL AS JSONB) AS payload
+      FROM kingdoms k
+      JOIN region_bonuses rb ON rb.region_code = k.region
+     WHERE k.kingdom_id = ANY(:kids)
+    UNION ALL
+    SELECT 'tech', krt.kingdom_id, krt.tech_code, NULL, NULL, NULL
+      FROM kingdom_research_tracking krt
+     WHERE krt.kingdom_id = ANY(:kids) AND krt.status = 'completed'
+    UNION ALL
+    SELECT 'temple', kv.kingdom_id, CAST(vb.building_id AS TEXT), NULL, NULL, NULL
+      FROM village_buildings vb
+      JOIN kingdom_villages kv ON vb.village_id = kv.village_id
+     WHERE kv.kingdom_id = ANY(:kids)
+       AND vb.building_id = ANY(:temple_ids)
+       AND vb.construction_status = 'complete'
+    UNION ALL
+    SELECT 'kingdom_project', pp.kingdom_id, pp.project_code, NULL, NULL, NULL
+      FROM projects_player pp
+     WHERE pp.kingdom_id = ANY(:kids)
+       AND (pp.ends_at IS NULL OR pp.ends_at > now())
+    UNION ALL
+    SELECT 'alliance_project', k.kingdom_id, NULL, NULL, NULL, CAST(pa.active_bonus AS JSONB)
+      FROM kingdoms k
+      JOIN projects_alliance pa ON EXISTS (
+           SELECT 1 FROM alliance_members am
+            WHERE am.user_id = k.user_id AND am.alliance_id = pa.alliance_id
+      )
+     WHERE k.kingdom_id = ANY(:kids)
+       AND pa.is_active = true
+       AND pa.build_state = 'completed'
+    UNION ALL
+    SELECT 'faith', kr.kingdom_id, NULL, NULL, NULL, CAST(kr.blessings AS JSONB)
+      FROM kingdom_religion kr
+     WHERE kr.kingdom_id = ANY(:kids)
+    UNION ALL
+    SELECT 'villages', kingdom_id, NULL, NULL, COUNT(*), NULL
+      FROM kingdom_villages
+     WHERE kingdom_id = ANY(:kids)
+     GROUP BY kingdom_id
+    UNION ALL
+    SELECT 'village_modifier', kv.kingdom_id, NULL, NULL, NULL,
+           jsonb_build_array(vm.resource_bonus, vm.troop_bonus,
+                             vm.construction_speed_bonus, vm.defense_bonus,
+                             vm.trade_bonus, vm.source, vm.stacking_rules)
+      FROM village_modifiers vm
+      JOIN kingdom_villages kv ON kv.village_id = vm.village_id
+     WHERE kv.kingdom_id = ANY(:kids)
+       AND (vm.expires_at IS NULL OR vm.expires_at > now())
+    UNION ALL
+    SELECT 'treaty', side.kid, tm.effect_type, tm.target, tm.magnitude, NULL
+      FROM kingdom_treaties kt
+      JOIN treaty_modifiers tm ON tm.treaty_id = kt.treaty_id
+     CROSS JOIN LATERAL (
+           SELECT kt.kingdom_id UNION SELECT kt.partner_kingdom_id
+     ) AS side(kid)
+     WHERE side.kid = ANY(:kids)
+       AND kt.status = 'active'
+    UNION ALL
+    SELECT 'alliance', k.kingdom_id, CAST(am.alliance_id AS TEXT), NULL, NULL, NULL
+      FROM kingdoms k
+      JOIN alliance_members am ON am.user_id = k.user_id
+     WHERE k.kingdom_id = ANY(:kids)
+    UNION ALL
+    SELECT 'expiry', kv.kingdom_id, NULL, NULL,
+           CAST(EXTRACT(EPOCH FROM MIN(vm.expires_at)) AS DOUBLE PRECISION), NULL
+      FROM village_modifiers vm
+      JOIN kingdom_villages kv ON kv.village_id = vm.village_id
+     WHERE kv.kingdom_id = ANY(:kids)
+       AND vm.expires_at > now()
+     GROUP BY kv.kingdom_id
+    UNION ALL
+    SELECT 'expiry', pp.kingdom_id, NULL, NULL,
+           CAST(EXTRACT(EPOCH FROM MIN(pp.ends_at)) AS DOUBLE PRECISION), NULL
+      FROM projects_player pp
+     WHERE pp.kingdom_id = ANY(:kids)
+       AND pp.ends_at > now()
+     GROUP BY pp.kingdom_id
+"""
+
+# ``src`` tag -> (source function it replaces, converter for its
+# ``(k1, k2, num, payload)`` rows). Converters may return a nested dict or a
+# :class:`ModifierVector`.
+_DB_SOURCE_CONVERTERS = {
+    "region": (_region_modifiers, lambda rows: _region_rows_to_mods((r[0], r[1]) for r in rows)),
+    "tech": (_tech_modifiers, lambda rows: catalogues.vector("tech", (r[0] for r in rows))),
+    "temple": (
+        _temple_modifiers,
+        lambda rows: catalogues.vector("temples", (int(r[0]) for r in rows)),
+    ),
+    "kingdom_project": (
+        _kingdom_project_modifiers,
+        lambda rows: catalogues.vector("projects", (r[0] for r in rows)),
+    ),
+    "alliance_project": (
+        _alliance_project_modifiers,
+        lambda rows: _blob_rows_to_mods(r[3] for r in rows),
+    ),
+    "faith": (
+        _get_faith_modifiers,
+        lambda rows: blessing_modifiers(parse_json_field(rows[0][3]) if rows else {}),
+    ),
+    "villages": (
+        _village_modifiers,
+        lambda rows: _village_count_to_mods(int(rows[0][2] or 0) if rows else 0),
+    ),
+    "village_modifier": (
+        _village_modifier_rows,
+        lambda rows: _village_rows_to_parts(tuple(parse_json_field(r[3]) or [None] * 7) for r in rows),
+    ),
+    "treaty": (_treaty_modifiers, lambda rows: _treaty_rows_to_mods((r[0], r[1], r[2]) for r in rows)),
+}
+
+# Kingdoms per consolidated statement in :func:`get_total_modifiers_bulk`.
+BULK_CHUNK_SIZE = 500
+
+# Lifetime of cached breakdowns with no timed modifier pending. Entries that
+# do have one are dropped by ``modifier_expiries`` the moment it lapses.
+EXPIRY_FREE_TTL = 300
+
+
+def _load_db_modifier_sources_bulk(
+    db: Session, kingdom_ids: list[int]
+) -> tuple[dict, dict, dict]:
+    """Return ``(loaded, tags, expiries)`` keyed by kingdom id.
+
+    All sources are fetched with a single UNION ALL statement and converted
+    with the same helpers the individual source functions use, or merged from
+    the precompiled catalogues into ``{source_function: modifiers}``. The tags
+    name the alliances each kingdom belongs to, for targeted cache
+    invalidation, and ``expiries`` holds the epoch time of the next timed
+    modifier to lapse (``math.inf`` when none is pending).
+    """
+    catalogues.ensure_loaded(db)
+    timed = modifier_profiler.sample()
+    clock = modifier_profiler.clock
+    start = clock() if timed else 0.0
+    try:
+        rows = db.execute(
+            text(_ALL_DB_SOURCES_SQL),
+            {"kids": list(kingdom_ids), "temple_ids": list(catalogues.temples)},
+        ).fetchall()
+    except Exception:
+        modifier_profiler.record_error("consolidated_query")
+        raise
+    modifier_profiler.record("consolidated_query", clock() - start if timed else None, len(rows))
+    grouped: dict = {kid: {tag: [] for tag in _DB_SOURCE_CONVERTERS} for kid in kingdom_ids}
+    tags: dict = {kid: [] for kid in kingdom_ids}
+    expiries: dict = {kid: math.inf for kid in kingdom_ids}
+    for src, kid, *values in rows:
+        if src == "alliance":
+            if kid in tags:
+                tags[kid].append(alliance_tag(values[0]))
+            continue
+        if src == "expiry":
+            if kid in expiries and values[2] is not None:
+                expiries[kid] = min(expiries[kid], float(values[2]))
+            continue
+        bucket = grouped.get(kid, {}).get(src)
+        if bucket is not None:
+            bucket.append(values)
+    loaded: dict = {}
+    for kid, by_tag in grouped.items():
+        converted = loaded[kid] = {}
+        for tag, (func, convert) in _DB_SOURCE_CONVERTERS.items():
+            start = clock() if timed else 0.0
+            converted[func] = convert(by_tag[tag])
+            modifier_profiler.record(
+                func.__name__, clock() - start if timed else None, len(by_tag[tag])
+            )
+    return loaded, tags, expiries
+
+
+def _load_db_modifier_sources(
+    db: Session, kingdom_id: int
+) -> tuple[dict, list, float]:
+    """Return ``({source_function: modifiers}, tags, next_expiry)`` for one kingdom."""
+    loaded, tags, expiries = _load_db_modifier_sources_bulk(db, [kingdom_id])
+    return loaded[kingdom_id], tags[kingdom_id], expiries[kingdom_id]
+
+
+# Display label of each source in the traced (stack) view.
+_SOURCE_LABELS = {
+    _region_modifiers: "Region Bonus",
+    _tech_modifiers: "Tech",
+    _temple_modifiers: "Temples",
+    _kingdom_project_modifiers: "Kingdom Project",
+    _alliance_project_modifiers: "Alliance Project",
+    _vip_modifiers: "VIP",
+    _get_faith_modifiers: "Faith",
+    _prestige_modifiers: "Prestige",
+    _village_modifiers: "Villages",
+    _village_modifier_rows: "Village Modifier",
+    _treaty_modifiers: "Treaty",
+    _spy_modifiers: "Spies",
+    _global_event_modifiers: "Global",
+}
+
+
+def _aggregate_modifiers(db: Session, kingdom_id: int, loaded: dict) -> dict:
+    """Merge every source into a breakdown, using ``loaded`` results where available.
+
+    Returns ``{"totals": {...}, "sources": [{"source": label, "modifiers": {...}}],
+    "computed_at": epoch}``. Both parts are plain dicts so the breakdown can live in a shared cache.
+    """
+    vectors = []
+    sources = []
+    timed = modifier_profiler.sample()
+    clock = modifier_profiler.clock
+    for func in _MODIFIER_SOURCES:
+        try:
+            if func in loaded:
+                mods = loaded[func]
+            else:
+                start = clock() if timed else 0.0
+                mods = func(db, kingdom_id)
+                modifier_profiler.record(func.__name__, clock() - start if timed else None)
+            if isinstance(mods, SourceParts):
+                parts = mods.parts
+                mods = mods.vector
+            else:
+                if not isinstance(mods, ModifierVector):
+                    mods = ModifierVector.from_dict(mods)
+                parts = [(_SOURCE_LABELS[func], mods.to_dict(()))] if mods else []
+            vectors.append(mods)
+            sources.extend({"source": label, "modifiers": m} for label, m in parts)
+        except Exception as e:
+            modifier_profiler.record_error(func.__name__)
+            logger.warning("%s error: %s", func.__name__, e)
+    return {
+        "totals": sum_vectors(vectors).to_dict(),
+        "sources": sources,
+        "computed_at": time.time(),
+    }
+
+
+def get_modifier_breakdown(
     db: Session, kingdom_id: int, *, use_cache: bool = True
 ) -> dict:
-    """Return aggregated modifiers for a kingdom with optional caching."""
+    """Return the cached per-source modifier breakdown for a kingdom.
+
+    This is the single modifier engine: :func:`get_total_modifiers` returns
+    its ``totals`` and
+    :func:`services.modifier_stack_service.compute_modifier_stack` renders
+    its ``sources``.
+    """
 
     if use_cache:
+        modifier_expiries.run_due()
+        _verify_adjusted_when_due(db)
         cached = _modifier_cache.get(kingdom_id)
-        if cached and (time.time() - cached[0] < _CACHE_TTL):
-            return cached[1]
-
-    total = {
-        "resource_bonus": {},
-        "troop_bonus": {},
-        "combat_bonus": {},
-        "defense_bonus": {},
-        "economic_bonus": {},
-        "production_bonus": {},
-    }
+        if cached is not None:
+            return cached
 
-    for func in _MODIFIER_SOURCES:
-        try:
-            mods = func(db, kingdom_id)
-            _merge_modifiers(total, mods)
-        except Exception as e:
-            logger.warning("%s error: %s", func.__name__, e)
+    breakdown, tags, expires_at = _compute_breakdown(db, kingdom_id)
 
     if use_cache:
-        _modifier_cache[kingdom_id] = (time.time(), total)
+        _cache_breakdown(kingdom_id, breakdown, tags, expires_at)
+
+    return breakdown
+
+
+def _load_in_savepoint(db: Session, load, *args):
+    """Run a consolidated ``load`` inside a SAVEPOINT.
+
+    When it fails only the savepoint is rolled back: the caller's pending
+    writes survive and the per-source fallback can still query.
+    """
+    with db.begin_nested():
+        return load(db, *args)
 
-    return total
 
+def _compute_breakdown(db: Session, kingdom_id: int) -> tuple[dict, list, float | None]:
+    """Build a breakdown from the database, bypassing the cache.
+
+    The last element is the next expiry instant, or ``None`` when the
+    consolidated load failed and the per-source fallback was used; such
+    breakdowns are not cached.
+    """
+    try:
+        loaded, tags, expires_at = _load_in_savepoint(db, _load_db_modifier_sources, kingdom_id)
+    except Exception as e:
+        # Fall back to one query per source, isolating any failing source.
+        logger.warning("Consolidated modifier load failed: %s", e)
+        loaded, tags, expires_at = {}, [], None
+    return _aggregate_modifiers(db, kingdom_id, loaded), tags, expires_at
+
+
+def _cache_breakdown(
+    kingdom_id: int, breakdown: dict, tags, expires_at: float | None
+) -> None:
+    """Cache ``breakdown`` for as long as its timed modifiers allow.
+
+    ``expires_at`` of ``None`` marks a breakdown from a failed consolidated
+    load, which may be missing sources and is therefore not cached.
+    """
+    if expires_at is None:
+        return
+    ttl = None
+    if expires_at == math.inf:
+        ttl = max(EXPIRY_FREE_TTL, _modifier_cache.ttl)
+    modifier_expiries.schedule(kingdom_id, expires_at)
+    remaining = modifier_expiries.seconds_until(kingdom_id)
+    if remaining is not None:
+        if remaining <= 0:
+            return
+        # Also bound the entry itself, so workers sharing a cache backend
+        # without having scheduled this kingdom never serve it past the lapse.
+        ttl = min(_modifier_cache.ttl, remaining)
+    _modifier_cache.set(kingdom_id, breakdown, tags, ttl=ttl)
+
+
+def verify_modifier_breakdown(
+    db: Session, kingdom_id: int, *, tolerance: float = 1e-6
+) -> bool:
+    """Recompute a kingdom's modifiers in full and refresh its cache entry.
+
+    This is the consistency check for incrementally adjusted entries (see
+    :func:`services.modifiers_utils.apply_modifier_delta`). Returns ``False``
+    and logs the drift when the cached totals no longer match.
+    """
+    cached = _modifier_cache.get(kingdom_id)
+    breakdown, tags, expires_at = _compute_breakdown(db, kingdom_id)
+    _cache_breakdown(kingdom_id, breakdown, tags, expires_at)
+    if cached is None:
+        return True
+    diff = ModifierVector.from_dict(cached["totals"]) - ModifierVector.from_dict(
+        breakdown["totals"]
+    )
+    drift = {
+        cat: inner
+        for cat, inner in diff.to_dict(()).items()
+        if any(abs(v) > tolerance for v in inner.values())
+    }
+    if drift:
+        logger.warning(
+            "Modifier drift for kingdom %d after %d deltas: %s",
+            kingdom_id,
+            cached.get("deltas", 0),
+            drift,
+        )
+        return False
+    return True
+
+
+# Delta-adjusted cache entries live only in this process, so they are
+# re-verified from regular lookups: at most every VERIFY_INTERVAL_SECONDS,
+# VERIFY_BATCH entries at a time.
+VERIFY_INTERVAL_SECONDS = 300.0
+VERIFY_BATCH = 10
+_next_verify_at = 0.0
+
+
+def verify_adjusted_modifiers(db: Session, *, limit: int = VERIFY_BATCH) -> dict:
+    """Run :func:`verify_modifier_breakdown` on up to ``limit`` adjusted entries.
+
+    Returns ``{"checked": n, "drifted": m}``.
+    """
+    checked = drifted = 0
+    for kid in _modifier_cache.adjusted_keys()[:limit]:
+        checked += 1
+        if not verify_modifier_breakdown(db, kid):
+            drifted += 1
+    return {"checked": checked, "drifted": drifted}
+
+
+def _verify_adjusted_when_due(db: Session) -> None:
+    global _next_verify_at
+    now = time.monotonic()
+    with _state_lock:
+        if now < _next_verify_at:
+            return
+        _next_verify_at = now + VERIFY_INTERVAL_SECONDS
+    try:
+        verify_adjusted_modifiers(db)
+    except Exception as e:
+        logger.warning("Modifier verification failed: %s", e)
+
+
+def get_total_modifiers(
+    db: Session, kingdom_id: int, *, use_cache: bool = True
+) -> dict:
+    """Return aggregated modifiers for a kingdom with optional caching."""
+    return get_modifier_breakdown(db, kingdom_id, use_cache=use_cache)["totals"]
+
+
+def get_modifier_breakdowns_bulk(
+    db: Session, kingdom_ids, *, use_cache: bool = True
+) -> dict[int, dict]:
+    """Return ``{kingdom_id: get_modifier_breakdown(...)}`` for many kingdoms.
+
+    Cache misses are loaded with one consolidated statement per
+    ``BULK_CHUNK_SIZE`` kingdoms, so the query count is independent of how
+    many kingdoms are requested. Every computed entry is written to the cache.
+    """
+    result: dict[int, dict] = {}
+    missing: list[int] = []
+    if use_cache:
+        modifier_expiries.run_due()
+    for kid in dict.fromkeys(kingdom_ids):
+        cached = _modifier_cache.get(kid) if use_cache else None
+        if cached is not None:
+            result[kid] = cached
+        else:
+            missing.append(kid)
+
+    for start in range(0, len(missing), BULK_CHUNK_SIZE):
+        chunk = missing[start : start + BULK_CHUNK_SIZE]
+        try:
+            loaded, tags, expiries = _load_in_savepoint(
+                db, _load_db_modifier_sources_bulk, chunk
+            )
+        except Exception as e:
+            logger.warning("Consolidated modifier load failed: %s", e)
+            loaded, tags, expiries = {}, {}, {}
+        for kid in chunk:
+            breakdown = _aggregate_modifiers(db, kid, loaded.get(kid, {}))
+            if use_cache:
+                _cache_breakdown(kid, breakdown, tags.get(kid, ()), expiries.get(kid))
+            result[kid] = breakdown
+
+    return result
+
+
+def get_total_modifiers_bulk(
+    db: Session, kingdom_ids, *, use_cache: bool = True
+) -> dict[int, dict]:
+    """Return ``{kingdom_id: get_total_modifiers(...)}`` for many kingdoms."""
+    return {
+        kid: breakdown["totals"]
+        for kid, breakdown in get_modifier_breakdowns_bulk(
+            db, kingdom_ids, use_cache=use_cache
+        ).items()
+    }
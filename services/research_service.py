@@ -7,8 +7,11 @@
 from __future__ import annotations
 
 import logging
+import time
 from datetime import datetime, timedelta
 
+from services.modifier_catalogue import catalogues
+from services.modifiers_utils import apply_modifier_delta
 from services.sqlalchemy_support import Session, SQLAlchemyError, text
 
 logger = logging.getLogger(__name__)
@@ -126,9 +129,12 @@ def start_research(db: Session, kingdom_id: int, tech_code: str) -> datetime:
 def complete_finished_research(db: Session, kingdom_id: int) -> None:
     """
     Automatically marks expired research rows (based on ends_at) as completed.
+
+    The finished techs' modifiers are added to the cached totals as a delta
+    rather than invalidating the kingdom's whole modifier breakdown.
     """
     try:
-        db.execute(
+        rows = db.execute(
             text(
                 """
                 UPDATE kingdom_research_tracking
@@ -136,11 +142,20 @@ def complete_finished_research(db: Session, kingdom_id: int) -> None:
                  WHERE kingdom_id = :kid
                    AND status = 'active'
                    AND ends_at <= now()
+             RETURNING tech_code
             """
             ),
             {"kid": kingdom_id},
-        )
+        ).fetchall()
+        changed_at = time.time()
         db.commit()
+        if rows:
+            apply_modifier_delta(
+                kingdom_id,
+                catalogues.delta("tech", [r[0] for r in rows]),
+                "Tech",
+                changed_at=changed_at,
+            )
     except SQLAlchemyError as exc:
         db.rollback()
         logger.exception(
@@ -6,7 +6,10 @@
 
 from __future__ import annotations
 
+import json
 import logging
+import os
+from functools import lru_cache
 from typing import Literal, Optional
 
 from fastapi import HTTPException
@@ -57,6 +60,28 @@ RESOURCE_TYPES = {
 # Fields that should never be exposed to clients or modified directly
 METADATA_FIELDS = {"kingdom_id", "created_at", "last_updated"}
 
+# When enabled, production accrues lazily from ``kingdom_resource_accrual``
+# (a per-tick rate vector and ``last_settled_at`` per kingdom) instead of being
+# written by every production tick. Reads add the accrued amount on the fly
+# and spends settle it into ``kingdom_resources`` first. Enable it with
+# ``RESOURCE_ACCRUAL_MODE=true``.
+ACCRUAL_MODE = os.getenv("RESOURCE_ACCRUAL_MODE", "false").lower() in {"1", "true", "yes"}
+
+# Seconds between production ticks. ``village_production`` rates, and so the
+# accrual rates derived from them, are amounts per tick; set
+# ``PRODUCTION_TICK_SECONDS`` to the interval the production scheduler runs at.
+ACCRUAL_PERIOD_SECONDS = int(os.getenv("PRODUCTION_TICK_SECONDS", "3600"))
+if ACCRUAL_PERIOD_SECONDS <= 0:
+    raise ValueError("PRODUCTION_TICK_SECONDS must be a positive number of seconds")
+
+# Upper bound on memoised UPDATE/INSERT statements. Real cost and gain dicts
+# repeat a small number of column sets, so this is rarely reached.
+STATEMENT_CACHE_SIZE = 512
+
+# Bind parameters per bulk ``UPDATE ... FROM (VALUES ...)`` statement; kept
+# below PostgreSQL's 32767-parameter limit for a single statement.
+BULK_MAX_PARAMS = 30000
+
 
 def fetch_supabase_resources(user_id: str) -> Optional[dict[str, int]]:
     """Fetch a kingdom's resources directly from Supabase."""
@@ -120,6 +145,49 @@ def validate_resource(resource: str) -> None:
         raise ValueError(f"Invalid resource type: {resource}")
 
 
+@lru_cache(maxsize=STATEMENT_CACHE_SIZE)
+def _resource_statement(operation: str, columns: tuple[str, ...]):
+    """Return the memoised ``text()`` statement for ``operation`` on ``columns``.
+
+    ``columns`` must be validated and sorted by the caller so that equal
+    column sets share one entry. Reusing the same statement object also lets
+    SQLAlchemy reuse its compiled form.
+    """
+    if operation == "gain":
+        set_expr = ", ".join(f"{res} = COALESCE({res}, 0) + :{res}" for res in columns)
+        sql = f"UPDATE kingdom_resources SET {set_expr} WHERE kingdom_id = :kid"
+    elif operation == "spend":
+        set_expr = ", ".join(f"{res} = {res} - :{res}" for res in columns)
+        sql = f"UPDATE kingdom_resources SET {set_expr} WHERE kingdom_id = :kid"
+    elif operation == "spend_checked":
+        set_expr = ", ".join(f"{res} = {res} - :{res}" for res in columns)
+        guard = " AND ".join(f"COALESCE({res}, 0) >= :{res}" for res in columns)
+        sql = (
+            f"UPDATE kingdom_resources SET {set_expr} "
+            f"WHERE kingdom_id = :kid AND {guard} RETURNING kingdom_id"
+        )
+    elif operation == "insert":
+        names = ", ".join(["kingdom_id", *columns])
+        values = ", ".join([":kid", *(f":{res}" for res in columns)])
+        sql = f"INSERT INTO kingdom_resources ({names}) VALUES ({values}) ON CONFLICT DO NOTHING"
+    else:
+        raise ValueError(f"Unknown resource statement: {operation}")
+    return text(sql)
+
+
+def get_statement_cache_stats() -> dict:
+    """Return hit/miss counters of the resource statement cache."""
+    info = _resource_statement.cache_info()
+    lookups = info.hits + info.misses
+    return {
+        "hits": info.hits,
+        "misses": info.misses,
+        "size": info.currsize,
+        "max_size": info.maxsize,
+        "hit_rate": info.hits / lookups if lookups else 0.0,
+    }
+
+
 def _apply_resource_changes(
     db: Session,
     kingdom_id: int,
@@ -145,7 +213,8 @@ def _apply_resource_changes(
     -----
     Uses a single ``UPDATE`` statement to modify only the specified
     resource columns, ensuring minimal lock contention even with many
-    concurrent updates.
+    concurrent updates. The statement is memoised per column set by
+    :func:`_resource_statement`.
     """
 
     if not changes:
@@ -156,15 +225,8 @@ def _apply_resource_changes(
         if amt < 0:
             raise ValueError("Resource amounts must be positive")
 
-    expr_template = "COALESCE({0}, 0) + :{0}" if op == "+" else "{0} - :{0}"
-    set_expr = [f"{res} = {expr_template.format(res)}" for res in changes]
-
-    sql = (
-        "UPDATE kingdom_resources SET "
-        + ", ".join(set_expr)
-        + " WHERE kingdom_id = :kid"
-    )
-    db.execute(text(sql), {**changes, "kid": kingdom_id})
+    stmt = _resource_statement("gain" if op == "+" else "spend", tuple(sorted(changes)))
+    db.execute(stmt, {**changes, "kid": kingdom_id})
     if commit:
         db.commit()
 
@@ -189,26 +251,109 @@ def initialize_kingdom_resources(
         Starting resource amounts to insert. Unspecified columns default to ``0``.
     """
 
-    columns = ["kingdom_id"]
-    values = [":kid"]
     params: dict[str, int] = {"kid": kingdom_id}
 
     for res, amt in (initial or {}).items():
         validate_resource(res)
         if amt < 0:
             raise ValueError("Initial resources must be non-negative")
-        columns.append(res)
-        values.append(f":{res}")
         params[res] = amt
 
-    sql = (
-        f"INSERT INTO kingdom_resources ({', '.join(columns)}) "
-        f"VALUES ({', '.join(values)}) ON CONFLICT DO NOTHING"
-    )
-    db.execute(text(sql), params)
+    columns = tuple(sorted(initial or ()))
+    db.execute(_resource_statement("insert", columns), params)
     db.commit()
 
 
+def _accrued(rates, carry, elapsed) -> tuple[dict[str, int], dict[str, float]]:
+    """Split ``rates * elapsed + carry`` into whole amounts and fractional carry.
+
+    ``rates`` are per :data:`ACCRUAL_PERIOD_SECONDS`. Keeping the fraction
+    means frequent settlements never lose production to rounding.
+    """
+    rates = rates or {}
+    carry = carry or {}
+    periods = max(float(elapsed or 0), 0.0) / ACCRUAL_PERIOD_SECONDS
+    whole: dict[str, int] = {}
+    remainder: dict[str, float] = {}
+    for res in set(rates) | set(carry):
+        total = float(rates.get(res, 0)) * periods + float(carry.get(res, 0))
+        amount = int(total)
+        if amount > 0:
+            whole[res] = amount
+        if total - amount:
+            remainder[res] = total - amount
+    return whole, remainder
+
+
+def settle_accrual(db: Session, kingdom_id: int, *, commit: bool = False) -> dict[str, int]:
+    """Credit production accrued since ``last_settled_at`` and restart the clock.
+
+    Returns the whole amounts credited; kingdoms without an accrual row are
+    left untouched. The clock only moves once the credit has been applied, so
+    a kingdom missing its ``kingdom_resources`` row raises 404 and keeps its
+    accrued production.
+    """
+    row = db.execute(
+        text(
+            """
+            SELECT rates, carry, EXTRACT(EPOCH FROM now() - last_settled_at)
+              FROM kingdom_resource_accrual
+             WHERE kingdom_id = :kid
+             FOR UPDATE
+            """
+        ),
+        {"kid": kingdom_id},
+    ).fetchone()
+    if not row:
+        return {}
+    gained, carry = _accrued(*row)
+    if gained:
+        credited = db.execute(
+            _resource_statement("gain", tuple(sorted(gained))),
+            {**gained, "kid": kingdom_id},
+        )
+        if credited.rowcount != 1:
+            raise HTTPException(status_code=404, detail="Kingdom resource row missing.")
+    db.execute(
+        text(
+            """
+            UPDATE kingdom_resource_accrual
+               SET last_settled_at = now(), carry = CAST(:carry AS JSONB)
+             WHERE kingdom_id = :kid
+            """
+        ),
+        {"carry": json.dumps(carry), "kid": kingdom_id},
+    )
+    if commit:
+        db.commit()
+    return gained
+
+
+def set_accrual_rates(
+    db: Session, kingdom_id: int, rates: dict[str, float], *, commit: bool = True
+) -> None:
+    """Switch ``kingdom_id`` to new per-tick production ``rates``.
+
+    Production up to now is settled at the old rates first.
+    """
+    for res in rates:
+        validate_resource(res)
+    settle_accrual(db, kingdom_id)
+    db.execute(
+        text(
+            """
+            INSERT INTO kingdom_resource_accrual (kingdom_id, rates, carry, last_settled_at)
+            VALUES (:kid, CAST(:rates AS JSONB), '{}', now())
+            ON CONFLICT (kingdom_id) DO UPDATE
+               SET rates = EXCLUDED.rates, last_settled_at = now()
+            """
+        ),
+        {"kid": kingdom_id, "rates": json.dumps(rates)},
+    )
+    if commit:
+        db.commit()
+
+
 def ensure_kingdom_resource_row(db: Session, kingdom_id: int) -> None:
     """Create an empty ``kingdom_resources`` row if none exists."""
     exists = db.execute(
@@ -234,8 +379,16 @@ def get_kingdom_resources(db: Session, kingdom_id: int, *, lock: bool = False) -
     lock : bool, optional
         If ``True`` acquire a ``FOR UPDATE`` lock on the row so that
         subsequent updates are safe from race conditions.
+
+    In :data:`ACCRUAL_MODE` an unlocked read adds the accrued production
+    without writing it, while a locked read settles it first.
     """
 
+    if ACCRUAL_MODE and not lock:
+        return _get_accrued_resources(db, kingdom_id)
+    if ACCRUAL_MODE:
+        settle_accrual(db, kingdom_id)
+
     sql = "SELECT * FROM kingdom_resources WHERE kingdom_id = :kid"
     if lock:
         sql += " FOR UPDATE"
@@ -248,6 +401,35 @@ def get_kingdom_resources(db: Session, kingdom_id: int, *, lock: bool = False) -
     return dict(row)
 
 
+def _get_accrued_resources(db: Session, kingdom_id: int) -> dict:
+    """Return stored balances plus unsettled accrual, with a single read."""
+    row = db.execute(
+        text(
+            """
+            SELECT kr.*,
+                   a.rates AS accrual_rates,
+                   a.carry AS accrual_carry,
+                   EXTRACT(EPOCH FROM now() - a.last_settled_at) AS accrual_elapsed
+              FROM kingdom_resources kr
+              LEFT JOIN kingdom_resource_accrual a ON a.kingdom_id = kr.kingdom_id
+             WHERE kr.kingdom_id = :kid
+            """
+        ),
+        {"kid": kingdom_id},
+    ).mappings().fetchone()
+
+    if not row:
+        raise HTTPException(status_code=404, detail="Kingdom resource row missing.")
+
+    data = dict(row)
+    gained, _ = _accrued(
+        data.pop("accrual_rates"), data.pop("accrual_carry"), data.pop("accrual_elapsed")
+    )
+    for res, amount in gained.items():
+        data[res] = (data.get(res) or 0) + amount
+    return data
+
+
 def spend_resources(
     db: Session, kingdom_id: int, cost: dict[str, int], *, commit: bool = True
 ) -> None:
@@ -264,19 +446,34 @@ def spend_resources(
 
     Notes
     -----
-    The resource row is locked using ``FOR UPDATE`` to ensure the
-    balance check and deduction occur atomically.
+    The balance check and deduction happen in one conditional ``UPDATE``
+    that only matches when every balance covers its cost, so no row lock
+    is held between a read and the write. Only when it matches nothing is
+    the row read (under ``FOR UPDATE``) to report which resource was short;
+    if none is short by then, the spend is applied under that lock. In
+    :data:`ACCRUAL_MODE` accrued production is settled before the check.
     """
-    current = get_kingdom_resources(db, kingdom_id, lock=True)
-
     for res, amt in cost.items():
         validate_resource(res)
         if amt < 0:
             raise ValueError("Negative spending not allowed")
-        if current.get(res, 0) < amt:
-            raise HTTPException(status_code=400, detail=f"Not enough {res}")
+    if not cost:
+        return
 
-    _apply_resource_changes(db, kingdom_id, cost, "-", commit=commit)
+    if ACCRUAL_MODE:
+        settle_accrual(db, kingdom_id)
+
+    stmt = _resource_statement("spend_checked", tuple(sorted(cost)))
+    if db.execute(stmt, {**cost, "kid": kingdom_id}).fetchone() is None:
+        current = get_kingdom_resources(db, kingdom_id, lock=True)
+        for res, amt in cost.items():
+            if (current.get(res) or 0) < amt:
+                raise HTTPException(status_code=400, detail=f"Not enough {res}")
+        # The balances changed between the two statements; the row is now
+        # locked, so the plain deduction is safe.
+        _apply_resource_changes(db, kingdom_id, cost, "-", commit=False)
+    if commit:
+        db.commit()
 
 
 def gain_resources(
@@ -293,6 +490,85 @@ def gain_resources(
     _apply_resource_changes(db, kingdom_id, gain, "+", commit=commit)
 
 
+def _bulk_update_sql(columns: tuple[str, ...], rows: int) -> str:
+    values = ", ".join(
+        "(" + ", ".join([f":kid_{i}", *(f":{res}_{i}" for res in columns)]) + ")"
+        for i in range(rows)
+    )
+    set_expr = ", ".join(
+        f"{res} = COALESCE(kr.{res}, 0) + CAST(v.{res} AS BIGINT)" for res in columns
+    )
+    return (
+        f"UPDATE kingdom_resources AS kr SET {set_expr} "
+        f"FROM (VALUES {values}) AS v(kingdom_id, {', '.join(columns)}) "
+        "WHERE kr.kingdom_id = CAST(v.kingdom_id AS BIGINT)"
+    )
+
+
+def apply_resource_deltas_bulk(
+    db: Session, deltas: dict[int, dict[str, int]], *, commit: bool = True
+) -> int:
+    """Apply signed resource ``deltas`` to many kingdoms at once.
+
+    Kingdoms sharing the same set of changed columns are updated together by
+    one ``UPDATE ... FROM (VALUES ...)`` statement, split so none binds more than
+    :data:`BULK_MAX_PARAMS` parameters. Negative deltas are spends: the
+    affected rows are locked in ``kingdom_id`` order and checked with a single
+    read, and nothing is written if any kingdom would go below zero, raising
+    the same ``HTTPException`` as :func:`spend_resources`.
+
+    Returns the number of statements issued for the updates.
+    """
+    groups: dict[tuple[str, ...], list[tuple[int, dict[str, int]]]] = {}
+    spends: dict[int, dict[str, int]] = {}
+    for kid, changes in deltas.items():
+        for res in changes:
+            validate_resource(res)
+        changes = {res: amt for res, amt in changes.items() if amt}
+        for res, amt in changes.items():
+            if amt < 0:
+                spends.setdefault(kid, {})[res] = -amt
+        if changes:
+            groups.setdefault(tuple(sorted(changes)), []).append((kid, changes))
+
+    if spends:
+        if ACCRUAL_MODE:
+            for kid in sorted(spends):
+                settle_accrual(db, kid)
+        columns = sorted({res for cost in spends.values() for res in cost})
+        rows = db.execute(
+            text(
+                f"SELECT kingdom_id, {', '.join(columns)} FROM kingdom_resources "
+                "WHERE kingdom_id = ANY(:kids) ORDER BY kingdom_id FOR UPDATE"
+            ),
+            {"kids": list(spends)},
+        ).fetchall()
+        balances = {row[0]: dict(zip(columns, row[1:])) for row in rows}
+        for kid, cost in spends.items():
+            current = balances.get(kid)
+            if current is None:
+                raise HTTPException(status_code=404, detail="Kingdom resource row missing.")
+            for res, amt in cost.items():
+                if (current.get(res) or 0) < amt:
+                    raise HTTPException(status_code=400, detail=f"Not enough {res}")
+
+    statements = 0
+    for columns, members in groups.items():
+        per_statement = max(1, BULK_MAX_PARAMS // (len(columns) + 1))
+        for start in range(0, len(members), per_statement):
+            chunk = members[start : start + per_statement]
+            params: dict[str, int] = {}
+            for i, (kid, changes) in enumerate(chunk):
+                params[f"kid_{i}"] = kid
+                for res in columns:
+                    params[f"{res}_{i}"] = changes[res]
+            db.execute(text(_bulk_update_sql(columns, len(chunk))), params)
+            statements += 1
+    if commit:
+        db.commit()
+    return statements
+
+
 def has_enough_resources(db: Session, kingdom_id: int, cost: dict[str, int]) -> bool:
     """
     Return True if kingdom has all required resources.
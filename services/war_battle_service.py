@@ -8,19 +8,56 @@
 from __future__ import annotations
 
 import logging
+from typing import Iterable, List, Mapping, NamedTuple, Tuple
 
+from backend.battle_engine import SpatialHash, TerrainGrid, get_flow_field, line_of_sight_clear
+from services.battle_replay_service import forget_recorder
 from services.sqlalchemy_support import Session, text
 
 logger = logging.getLogger(__name__)
 
+# Ticks after which a tactical battle is concluded unless overridden.
+DEFAULT_MAX_TICKS = 12
+
+
+class CombatUnit(NamedTuple):
+    """The ``unit_positions`` fields combat resolution needs."""
+
+    unit_id: str
+    alliance_id: int
+    x: int
+    y: int
+    power: float = 0
+    defense: float = 0
+    range: int = 0
+
+
+# Shared by :func:`resolve_combat` and :class:`services.battle_state_engine.BattleSimulation`.
+UNIT_STATE_SQL = """
+    SELECT p.unit_id, p.alliance_id, p.x, p.y, p.power, p.defense,
+           p.morale, p.is_attacker, p.last_moved_tick,
+           COALESCE(m.dx, 0), COALESCE(m.dy, 0), COALESCE(s.range, 0)
+    FROM unit_positions p
+    LEFT JOIN unit_movements m
+      ON m.unit_id = p.unit_id AND m.war_id = p.war_id
+    LEFT JOIN unit_stats s
+      ON s.unit_type = m.unit_type
+    WHERE p.war_id = :wid
+"""
+
 
 # ------------------------------------------------------------------------------
 # Main Tick Processor
 # ------------------------------------------------------------------------------
 
 
-def process_battle_tick(db: Session, war_id: int) -> dict:
-    """Advance battle state by one tick and return outcome summary."""
+def process_battle_tick(db: Session, war_id: int, max_ticks: int = DEFAULT_MAX_TICKS) -> dict:
+    """Advance battle state by one tick and return outcome summary.
+
+    Each phase is a separate SQL round-trip; for long-running workers prefer
+    :class:`services.battle_state_engine.BattleSimulation`, which keeps the
+    war in memory and flushes one batched diff per tick.
+    """
     # Ensure war is active
     status = db.execute(
         text("SELECT status FROM wars WHERE war_id = :wid"),
@@ -64,8 +101,8 @@ def process_battle_tick(db: Session, war_id: int) -> dict:
     db.commit()
 
     # 7. If max tick, conclude battle
-    if new_tick >= 12:
-        conclude_battle(db, war_id)
+    if new_tick >= max_ticks:
+        conclude_battle(db, war_id, final_tick=new_tick)
         return {"status": "concluded", "tick": new_tick}
 
     return {"status": "active", "tick": new_tick}
@@ -90,27 +127,93 @@ def process_orders(db: Session, war_id: int, tick: int) -> None:
     )
 
 
-def resolve_combat(db: Session, war_id: int, tick: int) -> None:
-    """Simulate combat between opposing units in same tile."""
+def pair_combatants(
+    units: Mapping[str, CombatUnit],
+    spatial: SpatialHash,
+    grid: TerrainGrid | None = None,
+) -> List[Tuple[str, str, str]]:
+    """Pair each unit with same-tile enemies, or its closest enemy in range.
+
+    ``units`` may hold :class:`CombatUnit` rows or any objects with the same
+    attributes. Melee always takes precedence; units with a ``range`` only
+    fire when nothing shares their tile, and need line of sight if a grid is
+    set. Returns ``(attacker, defender, outcome)`` rows for ``combat_logs``.
+    """
+    results: List[Tuple[str, str, str]] = []
+    for a in units.values():
+        targets = spatial.enemies_on_tile(a.x, a.y, a.alliance_id)
+        if not targets and a.range > 0:
+            for bid in spatial.enemies_within(a.x, a.y, a.range, a.alliance_id):
+                b = units[bid]
+                if grid is None or line_of_sight_clear((a.x, a.y), (b.x, b.y), grid):
+                    targets = [bid]
+                    break
+        for bid in targets:
+            b = units[bid]
+            outcome = "win" if a.power > b.defense else "loss"
+            results.append((a.unit_id, b.unit_id, outcome))
+    return results
+
+
+def resolve_combat(db: Session, war_id: int, tick: int, grid: TerrainGrid | None = None) -> None:
+    """Simulate combat between opposing units on the same tile or in range.
+
+    Positions are read once and indexed in a :class:`SpatialHash`, so pairing
+    only looks at nearby units instead of joining every pair in SQL.
+    """
+    rows = db.execute(text(UNIT_STATE_SQL), {"wid": war_id}).fetchall()
+    units = {
+        r[0]: CombatUnit(r[0], r[1], r[2], r[3], r[4] or 0, r[5] or 0, r[11] or 0) for r in rows
+    }
+    spatial = SpatialHash()
+    for unit in units.values():
+        spatial.insert(unit.unit_id, unit.x, unit.y, unit.alliance_id)
+
+    combat = pair_combatants(units, spatial, grid)
+    if not combat:
+        return
     db.execute(
         text(
             """
             INSERT INTO combat_logs (war_id, tick, attacker_unit_id, defender_unit_id, outcome)
-            SELECT :wid, :tick, a.unit_id, b.unit_id,
-                   CASE WHEN a.power > b.defense THEN 'win' ELSE 'loss' END
-            FROM unit_positions a
-            JOIN unit_positions b
-              ON a.x = b.x AND a.y = b.y
-             AND a.alliance_id != b.alliance_id
-            WHERE a.war_id = :wid AND b.war_id = :wid
+            VALUES (:wid, :tick, :att, :def, :outcome)
         """
         ),
-        {"wid": war_id, "tick": tick},
+        [{"wid": war_id, "tick": tick, "att": a, "def": d, "outcome": o} for a, d, o in combat],
     )
 
 
-def update_positions(db: Session, war_id: int, tick: int) -> None:
-    """Move units based on movement orders."""
+def update_positions(
+    db: Session,
+    war_id: int,
+    tick: int,
+    objectives: Mapping[str, Tuple[int, int]] | None = None,
+    grid: TerrainGrid | None = None,
+    danger: Iterable[Tuple[int, int]] = (),
+) -> None:
+    """Move units based on movement orders.
+
+    Units listed in ``objectives`` (``unit_id -> goal``) instead take one step
+    along a shared flow field on ``grid``, so an army ordered to the same goal
+    costs a single distance map rather than a path search per unit. Their
+    positions are read before the raw ``dx``/``dy`` movement is applied and
+    written back afterwards in one batched statement.
+    """
+    steps: list[dict] = []
+    if objectives and grid is not None:
+        danger = tuple(danger)
+        rows = db.execute(
+            text("SELECT unit_id, x, y FROM unit_positions WHERE war_id = :wid"),
+            {"wid": war_id},
+        ).fetchall()
+        for unit_id, x, y in rows:
+            goal = objectives.get(unit_id)
+            if goal is None:
+                continue
+            nxt = get_flow_field(grid, tuple(goal), danger).next_step(x, y)
+            nx, ny = nxt if nxt else (x, y)
+            steps.append({"x": nx, "y": ny, "uid": unit_id, "wid": war_id, "tick": tick})
+
     db.execute(
         text(
             """
@@ -125,6 +228,18 @@ def update_positions(db: Session, war_id: int, tick: int) -> None:
         {"tick": tick, "wid": war_id},
     )
 
+    if steps:
+        db.execute(
+            text(
+                """
+                UPDATE unit_positions
+                SET x = :x, y = :y, last_moved_tick = :tick
+                WHERE unit_id = :uid AND war_id = :wid
+            """
+            ),
+            steps,
+        )
+
 
 def apply_morale_penalties(db: Session, war_id: int, tick: int) -> None:
     """Reduce morale for routed, isolated, or under-fire units."""
@@ -163,19 +278,19 @@ def log_battle_tick(db: Session, war_id: int, tick: int) -> None:
 # ------------------------------------------------------------------------------
 
 
-def conclude_battle(db: Session, war_id: int) -> None:
+def conclude_battle(db: Session, war_id: int, final_tick: int = DEFAULT_MAX_TICKS) -> None:
     """Finalize battle, calculate final score, set war to concluded."""
     # Calculate score
     db.execute(
         text(
             """
             INSERT INTO war_results (war_id, final_tick, attacker_score, defender_score)
-            SELECT :wid, 12,
+            SELECT :wid, :final_tick,
                 (SELECT COUNT(*) FROM unit_positions WHERE war_id = :wid AND is_attacker = TRUE),
                 (SELECT COUNT(*) FROM unit_positions WHERE war_id = :wid AND is_attacker = FALSE)
         """
         ),
-        {"wid": war_id},
+        {"wid": war_id, "final_tick": final_tick},
     )
 
     ids_row = db.execute(
@@ -219,7 +334,8 @@ def conclude_battle(db: Session, war_id: int) -> None:
         logger.debug("Morale update failed: %s", e)
 
     db.commit()
-    logger.info(f"War {war_id} concluded at tick 12.")
+    forget_recorder(war_id)
+    logger.info(f"War {war_id} concluded at tick {final_tick}.")
 
 
 # ------------------------------------------------------------------------------
@@ -0,0 +1,174 @@
+"""Parallel scheduler for tactical war ticks.
+
+:func:`services.combat_tick_engine.process_combat_tick` handles one war on
+one session. During large alliance wars a single loop falls behind wall
+clock, so this module shards the active rows of ``wars_tactical`` by
+``war_id`` across a process pool. Every worker opens its own session and
+claims each war with a Postgres advisory lock before ticking it, so a war is
+never advanced by two workers at once even if shards overlap between
+scheduler instances. The lock is transaction scoped: it lives exactly as long
+as the tick's own transaction and is released by its commit or rollback,
+whichever pooled connection the session used. Duplicate ticks are still
+rejected by ``tick_execution_log`` inside ``process_combat_tick``.
+"""
+
+from __future__ import annotations
+
+import logging
+import time
+from concurrent.futures import ProcessPoolExecutor
+from contextlib import contextmanager
+from dataclasses import dataclass, field
+from typing import Callable, ContextManager, Iterator, List
+
+from services import combat_tick_engine
+from services.sqlalchemy_support import Session, text
+
+logger = logging.getLogger(__name__)
+
+# First key of the two-key advisory lock form, reserved for war ticks.
+WAR_TICK_LOCK_NAMESPACE = 7301
+
+SessionFactory = Callable[[], ContextManager[Session]]
+
+
+@dataclass
+class ShardReport:
+    """Outcome of one shard pass."""
+
+    shard: int
+    due: int = 0
+    processed: int = 0
+    duplicates: int = 0
+    locked: int = 0
+    failed: int = 0
+    max_lag_seconds: float = 0.0
+    elapsed_seconds: float = 0.0
+    war_ids: List[int] = field(default_factory=list)
+
+
+@contextmanager
+def default_session() -> Iterator[Session]:
+    """Open a fresh session from the application engine for a worker."""
+    from backend.database import init_engine
+    import backend.database as database
+
+    init_engine()
+    if database.SessionLocal is None:
+        raise RuntimeError("DATABASE_URL not configured")
+    db = database.SessionLocal()
+    try:
+        yield db
+    finally:
+        db.close()
+
+
+def fetch_due_wars(db: Session, shard: int, shards: int) -> list[tuple[int, int, float]]:
+    """Return ``(war_id, battle_tick, lag_seconds)`` for due wars in ``shard``.
+
+    ``lag_seconds`` is how far past its scheduled tick the war already is.
+    """
+    rows = db.execute(
+        text(
+            """
+            SELECT war_id, battle_tick,
+                   COALESCE(EXTRACT(EPOCH FROM now() - last_tick_processed_at)
+                            - COALESCE(tick_interval_seconds, 300), 0) AS lag
+              FROM wars_tactical
+             WHERE war_status = 'active'
+               AND MOD(war_id, :shards) = :shard
+               AND (last_tick_processed_at IS NULL
+                    OR now() - last_tick_processed_at
+                       >= COALESCE(tick_interval_seconds, 300) * interval '1 second')
+             ORDER BY last_tick_processed_at NULLS FIRST
+            """
+        ),
+        {"shards": shards, "shard": shard},
+    ).fetchall()
+    return [(r[0], r[1] or 0, float(r[2] or 0)) for r in rows]
+
+
+def try_claim_war(db: Session, war_id: int) -> bool:
+    """Take the transaction-level advisory lock for ``war_id`` without blocking."""
+    return bool(
+        db.execute(
+            text("SELECT pg_try_advisory_xact_lock(:ns, :wid)"),
+            {"ns": WAR_TICK_LOCK_NAMESPACE, "wid": war_id},
+        ).scalar()
+    )
+
+
+def run_shard_with_session(db: Session, shard: int, shards: int) -> ShardReport:
+    """Tick every due war in ``shard`` using ``db``."""
+    started = time.monotonic()
+    report = ShardReport(shard=shard)
+    wars = fetch_due_wars(db, shard, shards)
+    report.due = len(wars)
+    for war_id, tick, lag in wars:
+        report.max_lag_seconds = max(report.max_lag_seconds, lag)
+        if not try_claim_war(db, war_id):
+            report.locked += 1
+            db.rollback()
+            continue
+        try:
+            ok = combat_tick_engine.process_combat_tick(
+                db, war_id, tick + 1, {"scheduled": True, "shard": shard}
+            )
+            if ok:
+                report.processed += 1
+                report.war_ids.append(war_id)
+            else:
+                report.duplicates += 1
+        except Exception as exc:  # pragma: no cover - keep the shard moving
+            logger.warning("Tick for war %s failed: %s", war_id, exc)
+            db.rollback()
+            report.failed += 1
+    report.elapsed_seconds = time.monotonic() - started
+    return report
+
+
+def run_shard(shard: int, shards: int, session_factory: SessionFactory = default_session) -> ShardReport:
+    """Worker entry point: open a dedicated session and tick one shard."""
+    with session_factory() as db:
+        return run_shard_with_session(db, shard, shards)
+
+
+class WarTickScheduler:
+    """Distribute war ticks across ``shards`` executed by ``processes`` workers."""
+
+    def __init__(
+        self,
+        shards: int = 4,
+        processes: int | None = None,
+        session_factory: SessionFactory = default_session,
+    ) -> None:
+        if shards < 1:
+            raise ValueError("shards must be at least 1")
+        self.shards = shards
+        self.processes = shards if processes is None else processes
+        self.session_factory = session_factory
+
+    def run_once(self) -> List[ShardReport]:
+        """Tick all due wars once and return one report per shard."""
+        if self.processes <= 1:
+            reports = [
+                run_shard(shard, self.shards, self.session_factory)
+                for shard in range(self.shards)
+            ]
+        else:
+            with ProcessPoolExecutor(max_workers=self.processes) as pool:
+                futures = [
+                    pool.submit(run_shard, shard, self.shards, self.session_factory)
+                    for shard in range(self.shards)
+                ]
+                reports = [f.result() for f in futures]
+        for report in reports:
+            if report.max_lag_seconds > 0:
+                logger.info(
+                    "War tick shard %s: %s/%s processed, max lag %.1fs",
+                    report.shard,
+                    report.processed,
+                    report.due,
+                    report.max_lag_seconds,
+                )
+        return reports
@@ -0,0 +1,40 @@
+import os
+
+import pytest
+
+from scripts import bench_battle_engine as bench
+
+
+def test_map_generators_are_seeded_and_sized():
+    for kind, generate in bench.GENERATORS.items():
+        first = generate(21, 3)
+        assert len(first) == 21 * 21
+        assert first == generate(21, 3), kind
+    maze = bench.maze(21, 3)
+    assert any(not t.passable for t in maze.values())
+
+
+def test_compare_flags_throughput_and_memory_regressions():
+    baseline = {
+        "a": {"ops_per_sec": 100.0, "peak_bytes": 1000},
+        "b": {"ops_per_sec": 100.0, "peak_bytes": 1000},
+    }
+    results = {
+        "a": {"ops_per_sec": 80.0, "peak_bytes": 1000},
+        "b": {"ops_per_sec": 60.0, "peak_bytes": 10_000_000},
+        "new": {"ops_per_sec": 1.0, "peak_bytes": 1},
+    }
+    regressions = bench.compare(results, baseline, tolerance=0.25)
+    assert len(regressions) == 2
+    assert all(line.startswith("b:") for line in regressions)
+
+
+def test_small_suite_runs():
+    results = bench.run_suite(sizes=(20,), kinds=("mixed",), densities=(10,), budget=0.01)
+    assert results["mixed/20/compute_path/grid"]["ops_per_sec"] > 0
+    assert "mixed/20/compute_visibility_matrix/10" in results
+
+
+@pytest.mark.skipif(not os.getenv("RUN_BENCHMARKS"), reason="set RUN_BENCHMARKS=1 to run")
+def test_no_regression_against_baseline():
+    assert bench.main(["--tolerance", os.getenv("BENCHMARK_TOLERANCE", "0.25")]) == 0
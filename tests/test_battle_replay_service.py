@@ -0,0 +1,80 @@
+import services.battle_replay_service as replay
+
+
+class DummyResult:
+    def __init__(self, rows=None):
+        self._rows = rows or []
+
+    def fetchall(self):
+        return self._rows
+
+
+class FrameDB:
+    """Stores inserted frames and answers the seek query from them."""
+
+    def __init__(self):
+        self.frames = []
+        self.queries = []
+
+    def execute(self, query, params=None):
+        q = str(query).strip()
+        self.queries.append(q)
+        if q.startswith("INSERT INTO battle_replay_frames"):
+            self.frames.append((params["tick"], params["key"], params["payload"]))
+        elif "FROM battle_replay_frames" in q:
+            tick = params["tick"]
+            key = max(t for t, k, _ in self.frames if k and t <= tick)
+            return DummyResult([(t, p) for t, _, p in sorted(self.frames) if key <= t <= tick])
+        return DummyResult()
+
+
+def test_frame_round_trip():
+    units = {"b": (1, 2, 90), "a": (-3, 4, 100)}
+    payload = replay.encode_frame(7, units, removed=["z"], keyframe=True)
+    assert replay.encode_frame(7, dict(reversed(units.items())), ["z"], True) == payload
+    assert replay.decode_frame(payload) == (7, True, units, ["z"])
+
+
+def test_seek_uses_nearest_keyframe_and_deltas(monkeypatch):
+    monkeypatch.setattr(replay, "fetch_logs_by_tick", lambda db, w, t: [{"tick": t}])
+    db = FrameDB()
+    recorder = replay.ReplayRecorder(1, keyframe_interval=4)
+    history = {}
+    state = {"a": (0, 0, 100), "b": (5, 5, 100)}
+    for tick in range(1, 11):
+        state = dict(state)
+        state["a"] = (tick, 0, 100 - tick)
+        if tick == 6:
+            del state["b"]
+        recorder.record(db, tick, state)
+        recorder.mark_persisted()
+        history[tick] = state
+
+    assert [k for _, k, _ in db.frames] == [True, False, False, True, False, False, False, True, False, False]
+    for tick in (1, 3, 4, 6, 7, 10):
+        assert replay.load_state_at(db, 1, tick) == history[tick]
+    view = replay.seek(db, 1, 5)
+    assert view["units"][0] == {"unit_id": "a", "x": 5, "y": 0, "morale": 95}
+    assert view["events"] == [{"tick": 5}]
+
+
+def test_recorder_keyframes_after_missed_or_unpersisted_ticks():
+    db = FrameDB()
+    a = replay.ReplayRecorder(1)
+    b = replay.ReplayRecorder(1)
+    states = {tick: {"u": (tick, 0, 100)} for tick in range(1, 6)}
+
+    # Ticks of one war alternate between two workers' recorders.
+    for tick, recorder in ((1, a), (2, b), (3, a)):
+        recorder.record(db, tick, states[tick])
+        recorder.mark_persisted()
+    assert [k for _, k, _ in db.frames] == [True, True, True]
+    assert replay.load_state_at(db, 1, 3) == states[3]
+
+    # Tick 4 is rolled back, so tick 5 must not be a delta against it.
+    a.record(db, 4, states[4])
+    db.frames.pop()
+    a.record(db, 5, states[5])
+    a.mark_persisted()
+    assert db.frames[-1][1] is True
+    assert replay.load_state_at(db, 1, 5) == states[5]
@@ -0,0 +1,193 @@
+import backend.battle_engine as be
+from services.battle_state_engine import BattleSimulation, SimUnit
+
+
+class DummyResult:
+    def __init__(self, rows=None, scalar=None):
+        self._rows = rows or []
+        self._scalar = scalar
+
+    def fetchall(self):
+        return self._rows
+
+    def fetchone(self):
+        return self._rows[0] if self._rows else None
+
+    def scalar(self):
+        return self._scalar
+
+
+class DummyDB:
+    def __init__(self, units=None, tick=0, pending=0):
+        self.units = units or []
+        self.tick = tick
+        self.pending = pending
+        self.calls = []
+        self.commits = 0
+
+    def execute(self, query, params=None):
+        q = str(query).strip()
+        self.calls.append((q, params))
+        if q.startswith("SELECT status FROM wars"):
+            return DummyResult(scalar="active")
+        if "FROM war_tick_state" in q:
+            return DummyResult(scalar=self.tick)
+        if "FROM unit_positions p" in q:
+            return DummyResult(rows=self.units)
+        if "FROM unit_orders" in q:
+            return DummyResult(scalar=self.pending)
+        return DummyResult()
+
+    def commit(self):
+        self.commits += 1
+
+
+def test_load_reads_state_once_and_steps_in_memory():
+    db = DummyDB(
+        units=[
+            ("a", 1, 0, 0, 10, 5, 50, True, None, 1, 0, 0),
+            ("b", 2, 1, 0, 3, 20, 40, False, None, 0, 0, 0),
+        ],
+        tick=4,
+        pending=2,
+    )
+    sim = BattleSimulation.load(db, 9)
+    loads = len(db.calls)
+    assert loads == 4
+
+    diff = sim.step()
+    assert len(db.calls) == loads
+    assert diff.tick == 5 and diff.orders_applied == 2
+    assert diff.combat == []
+    assert (sim.units["a"].x, sim.units["a"].y) == (1, 0)
+
+    diff = sim.step()
+    assert ("a", "b", "loss") in diff.combat and ("b", "a", "loss") in diff.combat
+    assert sim.units["a"].morale == 40 and sim.units["b"].morale == 30
+
+
+def test_flush_writes_one_batched_statement_per_table():
+    sim = BattleSimulation(
+        3,
+        0,
+        [
+            SimUnit("a", 1, 0, 0, power=10, defense=1, dx=1),
+            SimUnit("b", 2, 1, 0, power=0, defense=1),
+            SimUnit("c", 2, 1, 0, power=0, defense=1),
+        ],
+        pending_orders=1,
+    )
+    sim.step()
+    diff = sim.step()
+    db = DummyDB()
+    sim.flush(db, diff)
+    queries = [q for q, _ in db.calls]
+    assert sum("INSERT INTO combat_logs" in q for q in queries) == 1
+    assert sum(q.startswith("UPDATE unit_positions") for q in queries) == 1
+    combat_params = next(p for q, p in db.calls if "INSERT INTO combat_logs" in q)
+    assert len(combat_params) == 4
+    assert db.commits == 1
+
+
+def test_advance_concludes_at_configured_tick(monkeypatch):
+    import services.battle_state_engine as engine
+
+    concluded = []
+    monkeypatch.setattr(engine, "conclude_battle", lambda d, w, final_tick: concluded.append(final_tick))
+    sim = BattleSimulation(1, 0, [], max_ticks=2)
+    db = DummyDB()
+    assert sim.advance(db) == {"status": "active", "tick": 1}
+    assert sim.advance(db) == {"status": "concluded", "tick": 2}
+    assert concluded == [2]
+
+
+def test_objectives_use_flow_field():
+    grid = be.TerrainGrid.from_tiles([be.TerrainTile(x, 0) for x in range(5)])
+    sim = BattleSimulation(1, 0, [SimUnit("a", 1, 0, 0, dx=0, dy=0)], grid=grid)
+    sim.set_objective(["a"], (4, 0))
+    sim.step()
+    sim.step()
+    assert (sim.units["a"].x, sim.units["a"].y) == (2, 0)
+
+
+def test_ranged_units_engage_closest_enemy_in_range():
+    sim = BattleSimulation(
+        1,
+        0,
+        [
+            SimUnit("archer", 1, 0, 0, power=5, defense=1, range=3),
+            SimUnit("near", 2, 2, 0, power=1, defense=2),
+            SimUnit("far", 2, 0, 3, power=1, defense=2),
+            SimUnit("out", 2, 9, 9, power=1, defense=2),
+        ],
+    )
+    diff = sim.step()
+    assert diff.combat == [("archer", "near", "win")]
+
+
+def test_morale_penalty_applies_once_per_unit_per_tick():
+    sim = BattleSimulation(
+        1,
+        0,
+        [
+            SimUnit("a1", 1, 0, 0, power=5, defense=5),
+            SimUnit("a2", 1, 0, 0, power=5, defense=5),
+            SimUnit("b", 2, 0, 0, power=1, defense=1, morale=50),
+        ],
+    )
+    diff = sim.step()
+    assert [c for c in diff.combat if c[0] == "b"] == [("b", "a1", "loss"), ("b", "a2", "loss")]
+    assert sim.units["b"].morale == 40
+
+
+def test_load_reads_unit_range_and_fires_at_range():
+    db = DummyDB(
+        units=[
+            ("archer", 1, 0, 0, 5, 1, 100, True, None, 0, 0, 3),
+            ("target", 2, 2, 0, 1, 2, 100, False, None, 0, 0, None),
+        ]
+    )
+    sim = BattleSimulation.load(db, 9)
+    query = next(q for q, _ in db.calls if "FROM unit_positions p" in q)
+    assert "unit_stats" in query
+    assert sim.units["archer"].range == 3 and sim.units["target"].range == 0
+    assert sim.step().combat == [("archer", "target", "win")]
+
+
+def test_run_battle_records_replay_and_forgets_recorder(monkeypatch):
+    import services.battle_replay_service as replay
+    from services.battle_state_engine import run_battle
+
+    class ReplayDB(DummyDB):
+        def __init__(self, **kwargs):
+            super().__init__(**kwargs)
+            self.frames = []
+
+        def execute(self, query, params=None):
+            q = str(query).strip()
+            if q.startswith("INSERT INTO battle_replay_frames"):
+                self.frames.append((params["tick"], params["key"], params["payload"]))
+            elif "FROM battle_replay_frames" in q:
+                tick = params["tick"]
+                key = max(t for t, k, _ in self.frames if k and t <= tick)
+                return DummyResult(
+                    rows=[(t, p) for t, _, p in sorted(self.frames) if key <= t <= tick]
+                )
+            return super().execute(query, params)
+
+    monkeypatch.setattr(replay, "fetch_logs_by_tick", lambda db, w, t: [])
+    db = ReplayDB(
+        units=[
+            ("a", 1, 0, 0, 10, 5, 50, True, None, 1, 0, 0),
+            ("b", 2, 9, 9, 3, 20, 40, False, None, 0, 0, 0),
+        ]
+    )
+    assert run_battle(db, 41, max_ticks=3) == {"status": "concluded", "tick": 3}
+
+    assert [(t, k) for t, k, _ in db.frames] == [(1, True), (2, False), (3, False)]
+    view = replay.seek(db, 41, 2)
+    assert view["units"] == [
+        {"unit_id": "a", "x": 2, "y": 0, "morale": 50},
+        {"unit_id": "b", "x": 9, "y": 9, "morale": 40},
+    ]
+    assert 41 not in replay._recorders
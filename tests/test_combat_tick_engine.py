@@ -65,3 +65,14 @@ def test_watchdog_restart_calls_process(monkeypatch):
     count = combat_tick_engine.watchdog_restart(db, 300)
     assert count == 2
     assert called == [(1, 3), (2, 4)]
+
+
+def test_process_combat_tick_records_replay_frame():
+    import services.battle_replay_service as replay
+
+    replay.forget_recorder(42)
+    db = DummyDB()
+    assert combat_tick_engine.process_combat_tick(db, 42, 1, {"units": {"a": (1, 2, 100)}})
+    assert any("battle_replay_frames" in q for q in db.queries)
+    assert db.commit_count == 1
+    replay.forget_recorder(42)
@@ -48,3 +48,65 @@ def test_gain_faith_levels_up():
     assert db.committed
     assert db.saved["lvl"] == 2
     assert db.saved["pts"] == 10
+
+
+def test_level_up_matches_incremental_loop():
+    per = faith_service.FAITH_PER_LEVEL
+    assert faith_service.level_up(0, 1, per + 10) == (10, 2)
+    # 1 -> 2 costs 100, 2 -> 3 costs 200, 3 -> 4 costs 300.
+    assert faith_service.level_up(50, 1, 50 + 2 * per + 3 * per + 7) == (7, 4)
+    assert faith_service.level_up(20, 3, -30) == (-10, 3)
+
+
+class BulkDB:
+    def __init__(self, rows):
+        self.rows = rows
+        self.calls = []
+        self.commits = 0
+
+    def execute(self, query, params=None):
+        self.calls.append((" ".join(str(query).split()), params))
+        if "FOR UPDATE" in str(query):
+            return BulkResult(self.rows)
+        return BulkResult([])
+
+    def commit(self):
+        self.commits += 1
+
+    def rollback(self):
+        pass
+
+
+class BulkResult:
+    def __init__(self, rows):
+        self._rows = rows
+
+    def fetchall(self):
+        return self._rows
+
+
+def test_gain_faith_many_batches_updates(monkeypatch):
+    applied = {}
+    monkeypatch.setattr(
+        faith_service,
+        "apply_modifier_deltas",
+        lambda deltas, label, changed_at: applied.update(deltas),
+    )
+    db = BulkDB([(1, 90, 1, {}), (2, 0, 1, None), (3, 0, 4, {"blessing_1": True, "blessing_2": True})])
+
+    levels = faith_service.gain_faith_many(db, {1: 20, 2: 50, 3: 400, 4: 300, 5: 0})
+
+    assert levels == {1: 2, 2: 1, 3: 5, 4: 3}
+    assert db.commits == 1
+    statements = [q for q, _ in db.calls]
+    assert len(statements) == 4  # select, insert, progress update, unlock update
+    insert_params = db.calls[1][1]
+    assert insert_params == [{"kid": 4}]
+    progress = {p["kid"]: p for p in db.calls[2][1]}
+    assert set(progress) == {2}
+    unlocks = {p["kid"]: p for p in db.calls[3][1]}
+    assert unlocks[1]["b1"] == "blessing_1"
+    assert unlocks[3]["b"] == {"blessing_1": True, "blessing_2": True, "blessing_3": True}
+    assert unlocks[4]["b2"] == "blessing_2"
+    assert set(applied) == {1, 3, 4}
+    assert applied[3].to_dict(()) == {"defense_bonus": {"castle_defense": 1.0}}
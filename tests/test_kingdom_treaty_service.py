@@ -81,3 +81,20 @@ def test_list_functions():
     assert active[0]["treaty_id"] == 1
     assert incoming[0]["treaty_id"] == 1
     assert outgoing[0]["treaty_id"] == 1
+
+
+def test_accept_invalidates_both_kingdoms_only():
+    from services.modifiers_utils import _modifier_cache
+
+    class TreatyDB(DummyDB):
+        def execute(self, query, params=None):
+            super().execute(query, params)
+            return DummyResult(row=(1, 2))
+
+    _modifier_cache.clear()
+    for kid in (1, 2, 3):
+        _modifier_cache.set(kid, {})
+    accept_treaty(TreatyDB(), 5)
+    assert 1 not in _modifier_cache and 2 not in _modifier_cache
+    assert 3 in _modifier_cache
+    _modifier_cache.clear()
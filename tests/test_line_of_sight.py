@@ -12,3 +12,96 @@ def test_line_of_sight_blocked_by_mountain():
     b = be.WarUnit(unit_id="B", side="blue", x=0, y=3, range=5)
     visible = be.compute_visibility(a, [a, b], tiles, max_range=5)
     assert b not in visible
+
+
+def test_line_of_sight_grid_matches_dict():
+    tiles = {(0, y): be.TerrainTile(0, y) for y in range(4)}
+    tiles[(0, 2)] = be.TerrainTile(0, 2, terrain_type="forest")
+    grid = be.TerrainGrid.from_tiles(tiles)
+    a = be.WarUnit(unit_id="A", side="red", x=0, y=0, range=5)
+    b = be.WarUnit(unit_id="B", side="blue", x=0, y=3, range=5)
+    c = be.WarUnit(unit_id="C", side="blue", x=0, y=1, range=5)
+    assert be.compute_visibility(a, [a, b, c], grid, 5) == [c]
+    assert be.compute_visibility(a, [a, b, c], tiles, 5) == [c]
+
+
+def test_visibility_matrix_matches_per_observer():
+    import random
+
+    rng = random.Random(7)
+    tiles = {}
+    for x in range(30):
+        for y in range(30):
+            kind = "forest" if rng.random() < 0.15 else "plain"
+            tiles[(x, y)] = be.TerrainTile(x, y, terrain_type=kind)
+    grid = be.TerrainGrid.from_tiles(tiles)
+    units = [
+        be.WarUnit(unit_id=str(i), side="red" if i % 2 else "blue", x=rng.randrange(30), y=rng.randrange(30))
+        for i in range(60)
+    ]
+    matrix = be.compute_visibility_matrix(units, grid, 8)
+    assert set(matrix) == {u.unit_id for u in units}
+    for unit in units:
+        assert matrix[unit.unit_id] == be.compute_visibility(unit, units, tiles, 8)
+
+
+def test_iter_bresenham_and_ray_offsets_match_list():
+    for end in [(5, 2), (-3, 7), (0, -4), (6, 6)]:
+        line = be.bresenham_line(1, 1, *end)
+        assert list(be.iter_bresenham(1, 1, *end)) == line
+        offsets = be.ray_offsets(end[0] - 1, end[1] - 1)
+        assert [(1 + ox, 1 + oy) for ox, oy in offsets] == line[1:-1]
+
+
+def test_first_blocking_tile_stops_at_obstruction():
+    tiles = {(x, 0): be.TerrainTile(x, 0) for x in range(8)}
+    tiles[(3, 0)] = be.TerrainTile(3, 0, elevation=1)
+    tiles[(5, 0)] = be.TerrainTile(5, 0, terrain_type="mountain")
+    grid = be.TerrainGrid.from_tiles(tiles)
+    assert be.first_blocking_tile((0, 0), (7, 0), tiles) == (3, 0)
+    assert be.first_blocking_tile((0, 0), (7, 0), grid) == (3, 0)
+    assert be.first_blocking_tile((0, 0), (3, 0), grid) is None
+    assert be.first_blocking_tile((7, 0), (4, 0), tiles) == (5, 0)
+
+
+def test_spatial_hash_queries_track_moves():
+    import math
+    import random
+
+    rng = random.Random(5)
+    units = [
+        be.WarUnit(unit_id=str(i), side="red" if i % 3 else "blue", x=rng.randrange(50), y=rng.randrange(50))
+        for i in range(80)
+    ]
+    index = be.SpatialHash.from_units(units, cell_size=4)
+    for unit in units[:20]:
+        unit.x, unit.y = rng.randrange(50), rng.randrange(50)
+        index.move(unit.unit_id, unit.x, unit.y)
+
+    for probe in units[:10]:
+        enemies = [u for u in units if u.side != probe.side]
+        dist = {u.unit_id: math.hypot(u.x - probe.x, u.y - probe.y) for u in enemies}
+        within = index.enemies_within(probe.x, probe.y, 7, probe.side)
+        assert set(within) == {uid for uid, d in dist.items() if d <= 7}
+        nearest = index.nearest_enemy(probe.x, probe.y, probe.side)
+        assert dist[nearest] == min(dist.values())
+        on_tile = index.enemies_on_tile(probe.x, probe.y, probe.side)
+        assert set(on_tile) == {uid for uid, d in dist.items() if d == 0}
+    assert index.nearest_enemy(-100, -100, "red", max_radius=5) is None
+
+
+def test_spatial_hash_tracks_occupied_extent():
+    index = be.SpatialHash(cell_size=4)
+    index.insert("a", 0, 0, "red")
+    index.insert("b", 41, 2, "blue")
+    index.insert("c", 5, 30, "blue")
+    assert (min(index._columns), max(index._columns)) == (0, 10)
+    assert (min(index._rows), max(index._rows)) == (0, 7)
+    assert index.nearest_enemy(0, 0, "red") == "c"
+
+    index.move("c", 6, 2)
+    index.remove("b")
+    assert index._columns == {0: 1, 1: 1} and index._rows == {0: 2}
+    assert index.nearest_enemy(0, 0, "red") == "c"
+    index.remove("c")
+    assert index.nearest_enemy(0, 0, "red") is None
@@ -58,3 +58,25 @@ def test_cleanup_zombie_spy_missions():
     assert count == 5
     assert db.commits == 1
     assert any("UPDATE spy_missions" in q for q in db.queries)
+
+
+def test_expire_village_modifiers_marks_rows_and_invalidates(monkeypatch):
+    from services import modifiers_utils
+    from services.modifiers_utils import ModifierCache
+
+    class ExpiryDB(DummyDB):
+        def execute(self, query, params=None):
+            self.queries.append(str(query).strip())
+            return DummyResult(rows=[(1,), (1,), (2,)])
+
+    cache = ModifierCache()
+    for kid in (1, 2, 3):
+        cache.set(kid, {"totals": {}, "sources": []})
+    monkeypatch.setattr(modifiers_utils, "_modifier_cache", cache)
+    db = ExpiryDB()
+
+    assert maintenance_service.expire_village_modifiers(db) == 3
+    assert "SET lapse_processed_at = now()" in db.queries[0]
+    assert "lapse_processed_at IS NULL" in db.queries[0]
+    assert not any("DELETE" in q for q in db.queries)
+    assert 1 not in cache and 2 not in cache and 3 in cache
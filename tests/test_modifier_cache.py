@@ -0,0 +1,193 @@
+# Project Name: Thronestead©
+# File Name: test_modifier_cache.py
+# Version:  7/1/2025 10:38
+# Developer: Deathsgift66
+import pytest
+
+from services import modifiers_utils
+from services.modifier_vector import ModifierVector
+from services.modifiers_utils import (
+    MAX_DELTAS_PER_ENTRY,
+    LocalCacheBackend,
+    ModifierCache,
+    RedisCacheBackend,
+    alliance_tag,
+    apply_delta_to_breakdown,
+    apply_modifier_delta,
+)
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+def test_lru_eviction_and_counters():
+    cache = ModifierCache(maxsize=2, ttl=60)
+    cache.set(1, {"a": {}})
+    cache.set(2, {"b": {}})
+    assert cache.get(1) == {"a": {}}  # 1 becomes most recent
+    cache.set(3, {"c": {}})
+    assert 2 not in cache
+    assert cache.get(2) is None
+    stats = cache.stats()
+    assert stats["size"] == 2
+    assert stats["hits"] == 1
+    assert stats["misses"] == 1
+    assert stats["evictions"] == 1
+
+
+def test_ttl_expiry_and_override():
+    clock = FakeClock()
+    cache = ModifierCache(ttl=10, clock=clock)
+    cache.set(1, {"x": {}})
+    cache.set(2, {"y": {}}, ttl=100)
+    clock.now = 11
+    assert cache.get(1) is None
+    assert cache.get(2) == {"y": {}}
+    assert cache.stats()["expirations"] == 1
+
+
+def test_tag_invalidation_only_hits_tagged_kingdoms():
+    cache = ModifierCache()
+    cache.set(1, {}, tags=[alliance_tag(7)])
+    cache.set(2, {}, tags=[alliance_tag(7), alliance_tag(8)])
+    cache.set(3, {}, tags=[alliance_tag(8)])
+    assert cache.invalidate_tag(alliance_tag(7)) == 2
+    assert 1 not in cache and 2 not in cache
+    assert 3 in cache
+    assert cache.invalidate(3) is True
+    assert cache.invalidate(3) is False
+    assert cache.stats()["invalidations"] == 3
+
+
+def test_shared_backend_keeps_workers_consistent():
+    shared = LocalCacheBackend()
+    worker_a = ModifierCache(backend=shared)
+    worker_b = ModifierCache(backend=shared)
+    worker_a.set(1, {"resource_bonus": {"wood": 1.0}}, tags=[alliance_tag(3)])
+    assert worker_b.get(1) == {"resource_bonus": {"wood": 1.0}}
+    worker_b.invalidate_tag(alliance_tag(3))
+    assert worker_a.get(1) is None
+
+
+def test_redis_backend_round_trip():
+    class FakeRedis:
+        def __init__(self):
+            self.data = {}
+            self.sets = {}
+
+        def get(self, key):
+            return self.data.get(key)
+
+        def set(self, key, value, ex=None):
+            self.data[key] = value
+
+        def sadd(self, key, member):
+            self.sets.setdefault(key, set()).add(member)
+
+        def expire(self, key, seconds):
+            pass
+
+        def smembers(self, key):
+            return set(self.sets.get(key, ()))
+
+        def delete(self, *keys):
+            removed = 0
+            for k in keys:
+                removed += self.data.pop(k, None) is not None
+                self.sets.pop(k, None)
+            return removed
+
+        def scan_iter(self, match):
+            return [k for k in self.data if k.startswith(match.rstrip("*"))]
+
+    cache = ModifierCache(backend=RedisCacheBackend(FakeRedis()))
+    cache.set(5, {"combat_bonus": {"attack": 2.0}}, tags=["alliance:1"])
+    assert cache.get(5) == {"combat_bonus": {"attack": 2.0}}
+    assert cache.invalidate_tag("alliance:1") == 1
+    assert cache.get(5) is None
+
+
+def test_invalid_maxsize():
+    with pytest.raises(ValueError):
+        ModifierCache(maxsize=0)
+
+
+def test_update_keeps_expiry_and_tags():
+    clock = FakeClock()
+    cache = ModifierCache(ttl=10, clock=clock)
+    cache.set(1, {"v": 1}, tags=[alliance_tag(3)])
+    clock.now = 5
+    assert cache.update(1, lambda entry: {"v": entry["v"] + 1})
+    assert cache.get(1) == {"v": 2}
+    assert cache.invalidate_tag(alliance_tag(3)) == 1
+    cache.set(1, {"v": 1})
+    clock.now = 20
+    assert not cache.update(1, lambda entry: entry)
+    assert cache.stats()["updates"] == 1
+
+
+def test_update_through_backend_invalidates():
+    cache = ModifierCache(backend=LocalCacheBackend())
+    cache.set(1, {"v": 1})
+    assert not cache.update(1, lambda entry: entry)
+    assert cache.get(1) is None
+
+
+def test_delta_adds_and_removes_source_entries():
+    breakdown = {
+        "totals": {"resource_bonus": {"wood": 5.0}, "combat_bonus": {}},
+        "sources": [{"source": "Tech", "modifiers": {"resource_bonus": {"wood": 5.0}}}],
+    }
+    tech = ModifierVector.from_dict({"resource_bonus": {"wood": 2}})
+    grown = apply_delta_to_breakdown(breakdown, tech, "Tech")
+    assert grown["totals"]["resource_bonus"] == {"wood": 7.0}
+    assert grown["sources"] == [
+        {"source": "Tech", "modifiers": {"resource_bonus": {"wood": 7.0}}}
+    ]
+    assert grown["deltas"] == 1
+    assert breakdown["totals"]["resource_bonus"] == {"wood": 5.0}
+
+    festival = ModifierVector.from_dict({"defense_bonus": {"village": 3}})
+    added = apply_delta_to_breakdown(grown, festival, "festival")
+    removed = apply_delta_to_breakdown(added, -festival, "festival")
+    assert [s["source"] for s in added["sources"]] == ["Tech", "festival"]
+    assert removed["sources"] == grown["sources"]
+    assert removed["totals"]["defense_bonus"] == {"village": 0.0}
+
+
+def test_apply_modifier_delta_is_bounded(monkeypatch):
+    cache = ModifierCache()
+    monkeypatch.setattr(modifiers_utils, "_modifier_cache", cache)
+    delta = ModifierVector.from_dict({"troop_bonus": {"attack": 1}})
+    assert not apply_modifier_delta(1, delta, "Tech")  # nothing cached
+
+    cache.set(1, {"totals": {}, "sources": []})
+    for _ in range(MAX_DELTAS_PER_ENTRY):
+        assert apply_modifier_delta(1, delta, "Tech")
+    assert cache.get(1)["totals"]["troop_bonus"] == {"attack": float(MAX_DELTAS_PER_ENTRY)}
+    assert not apply_modifier_delta(1, delta, "Tech")
+    assert 1 not in cache
+
+    cache.set(2, {"totals": {}, "sources": []})
+    assert not apply_modifier_delta(2, None, "Tech")
+    assert 2 not in cache
+
+
+def test_apply_modifier_delta_drops_entries_computed_after_change(monkeypatch):
+    cache = ModifierCache()
+    monkeypatch.setattr(modifiers_utils, "_modifier_cache", cache)
+    delta = ModifierVector.from_dict({"troop_bonus": {"attack": 1}})
+
+    cache.set(1, {"totals": {}, "sources": [], "computed_at": 100.0})
+    assert apply_modifier_delta(1, delta, "Tech", changed_at=150.0)
+    assert cache.get(1)["totals"]["troop_bonus"] == {"attack": 1.0}
+
+    # Computed after the change was stamped: it may already include it.
+    cache.set(2, {"totals": {}, "sources": [], "computed_at": 200.0})
+    assert not apply_modifier_delta(2, delta, "Tech", changed_at=150.0)
+    assert 2 not in cache
@@ -0,0 +1,74 @@
+# Project Name: Thronestead©
+# File Name: test_modifier_catalogue.py
+# Version:  7/1/2025 10:38
+# Developer: Deathsgift66
+from services.modifier_catalogue import (
+    CatalogueRegistry,
+    compile_modifiers,
+    merge_compiled,
+)
+
+
+class DummyResult:
+    def __init__(self, rows):
+        self._rows = rows
+
+    def fetchall(self):
+        return self._rows
+
+
+class DummyDB:
+    def __init__(self):
+        self.queries = []
+
+    def execute(self, query, params=None):
+        q = str(query)
+        self.queries.append(q)
+        if "FROM tech_catalogue" in q:
+            return DummyResult([("t1", '{"combat_bonus": {"attack": "2"}}')])
+        if "FROM building_catalogue" in q:
+            return DummyResult([(4, {"defense_bonus": {"wall": 1}})])
+        if "FROM project_player_catalogue" in q:
+            return DummyResult([("p1", None)])
+        return DummyResult([])
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+def test_compile_modifiers_validates_and_sorts():
+    compiled = compile_modifiers(
+        '{"b": {"y": 1, "bad": "x"}, "a": {"x": "2.5"}, "skip": 3}'
+    )
+    assert compiled == (("a", "x", 2.5), ("b", "y", 1.0))
+    assert compile_modifiers(None) == ()
+    target: dict = {"a": {"x": 1}}
+    merge_compiled(target, compiled)
+    assert target == {"a": {"x": 3.5}, "b": {"y": 1.0}}
+
+
+def test_registry_loads_once_until_max_age():
+    clock = FakeClock()
+    registry = CatalogueRegistry(max_age=100, clock=clock)
+    db = DummyDB()
+    assert registry.ensure_loaded(db) is True
+    assert len(db.queries) == 3
+    assert registry.ensure_loaded(db) is False
+    assert len(db.queries) == 3
+
+    assert registry.merged("tech", ["t1", "t1", "missing"]) == {
+        "combat_bonus": {"attack": 4.0}
+    }
+    assert registry.merged("temples", [4]) == {"defense_bonus": {"wall": 1.0}}
+    assert registry.merged("projects", ["p1"]) == {}
+
+    clock.now = 99
+    assert registry.ensure_loaded(db) is False
+    clock.now = 100
+    assert registry.ensure_loaded(db) is True
+    assert len(db.queries) == 6
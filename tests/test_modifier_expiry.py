@@ -0,0 +1,99 @@
+# Project Name: Thronestead©
+# File Name: test_modifier_expiry.py
+# Version:  7/1/2025 10:38
+# Developer: Deathsgift66
+import contextlib
+import math
+
+from services import modifiers_utils, progression_service
+from services.modifier_catalogue import catalogues
+from services.modifier_expiry import ExpiryScheduler
+from services.modifiers_utils import ModifierCache
+
+
+class FakeClock:
+    def __init__(self, now=0.0):
+        self.now = now
+
+    def __call__(self):
+        return self.now
+
+
+def test_pop_due_in_order_and_reschedule():
+    clock = FakeClock()
+    sched = ExpiryScheduler(clock=clock)
+    sched.schedule(1, 30.0)
+    sched.schedule(2, 10.0)
+    sched.schedule(3, 20.0)
+    sched.schedule(3, 40.0)  # rescheduled; the old entry is stale
+    sched.schedule(4, math.inf)  # nothing pending
+    assert len(sched) == 3
+    assert sched.next_expiry(3) == 40.0
+    assert sched.pop_due(25.0) == [2]
+    assert sched.pop_due(35.0) == [1]
+    clock.now = 38.0
+    assert sched.seconds_until(3) == 2.0
+    sched.schedule(3, None)
+    assert sched.pop_due(100.0) == []
+    assert sched.stats()["tracked"] == 0
+
+
+def test_run_due_invalidates_lapsed_kingdoms():
+    clock = FakeClock()
+    sched = ExpiryScheduler(clock=clock)
+    dropped = []
+    sched.schedule(1, 5.0)
+    assert sched.run_due(dropped.extend) == 0
+    clock.now = 5.0
+    assert sched.run_due(dropped.extend) == 1
+    assert dropped == [1]
+    assert sched.stats()["fired"] == 1
+
+
+def test_breakdown_dropped_exactly_at_lapse(monkeypatch):
+    rows = [
+        ("villages", 1, None, None, 2, None),
+        ("expiry", 1, None, None, 1030.0, None),
+        ("expiry", 1, None, None, 1020.0, None),
+        ("villages", 2, None, None, 1, None),
+    ]
+
+    class DummyResult:
+        def fetchall(self):
+            return rows
+
+    class DummyDB:
+        def __init__(self):
+            self.calls = 0
+
+        def execute(self, query, params=None):
+            self.calls += 1
+            return DummyResult()
+
+        def begin_nested(self):
+            return contextlib.nullcontext()
+
+    wall = FakeClock(1000.0)
+    cache = ModifierCache(ttl=60, clock=wall)
+    sched = ExpiryScheduler(clock=wall)
+    monkeypatch.setattr(modifiers_utils, "_modifier_cache", cache)
+    monkeypatch.setattr(progression_service, "_modifier_cache", cache)
+    monkeypatch.setattr(progression_service, "modifier_expiries", sched)
+    catalogues.install()
+
+    db = DummyDB()
+    progression_service.get_total_modifiers_bulk(db, [1, 2])
+    assert sched.next_expiry(1) == 1020.0
+    assert sched.next_expiry(2) is None
+
+    wall.now = 1019.0
+    progression_service.get_total_modifiers(db, 1)
+    assert db.calls == 1
+    wall.now = 1020.0
+    progression_service.get_total_modifiers(db, 1)
+    assert db.calls == 2
+
+    # Kingdom 2 has nothing pending, so it outlives the default TTL.
+    wall.now = 1000.0 + progression_service.EXPIRY_FREE_TTL - 1
+    progression_service.get_total_modifiers(db, 2)
+    assert db.calls == 2
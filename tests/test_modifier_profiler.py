@@ -0,0 +1,87 @@
+# Project Name: Thronestead©
+# File Name: test_modifier_profiler.py
+# Version:  7/1/2025 10:38
+# Developer: Deathsgift66
+import contextlib
+
+import pytest
+
+from services import progression_service
+from services.modifier_catalogue import catalogues
+from services.modifier_profiler import ModifierProfiler
+
+
+def test_record_histogram_and_snapshot():
+    prof = ModifierProfiler(sample_rate=1.0)
+    prof.record("_tech_modifiers", 0.0004, rows=3)
+    prof.record("_tech_modifiers", 0.02, rows=2)
+    prof.record_error("_tech_modifiers")
+    stats = prof.snapshot()["sources"]["_tech_modifiers"]
+    assert stats["calls"] == 2
+    assert stats["rows"] == 5
+    assert stats["errors"] == 1
+    assert stats["max_seconds"] == 0.02
+    assert stats["histogram"]["0.0005"] == 1
+    assert stats["histogram"]["0.025"] == 1
+    assert sum(stats["histogram"].values()) == 2
+
+
+def test_sampling_and_disabled():
+    draws = iter([0.5, 0.01])
+    prof = ModifierProfiler(sample_rate=0.1, rng=lambda: next(draws))
+    assert not prof.sample()
+    assert prof.sample()
+    assert (prof.snapshot()["sampled"], prof.snapshot()["skipped"]) == (1, 1)
+    prof.configure(enabled=False)
+    assert not prof.sample()
+    prof.record_error("x")
+    assert prof.snapshot()["sources"] == {}
+    with pytest.raises(ValueError):
+        prof.configure(sample_rate=2)
+
+
+def test_aggregation_records_sources(monkeypatch):
+    rows = [("villages", 1, None, None, 2, None), ("tech", 1, "t1", None, None, None)]
+
+    class DummyResult:
+        def fetchall(self):
+            return rows
+
+    class DummyDB:
+        def execute(self, query, params=None):
+            return DummyResult()
+
+        def begin_nested(self):
+            return contextlib.nullcontext()
+
+    def broken(_db, _kid):
+        raise RuntimeError("boom")
+
+    prof = ModifierProfiler(sample_rate=1.0)
+    monkeypatch.setattr(progression_service, "modifier_profiler", prof)
+    monkeypatch.setattr(progression_service, "_MODIFIER_SOURCES", [*progression_service._MODIFIER_SOURCES, broken])
+    catalogues.install(tech={"t1": {"combat_bonus": {"attack": 1}}})
+
+    progression_service.get_total_modifiers(DummyDB(), 1, use_cache=False)
+
+    sources = prof.snapshot()["sources"]
+    assert sources["consolidated_query"]["rows"] == 2
+    assert sources["_tech_modifiers"]["calls"] == 1
+    assert sources["_tech_modifiers"]["rows"] == 1
+    assert sources["_vip_modifiers"]["calls"] == 1
+    assert sources["broken"]["errors"] == 1
+
+
+def test_untimed_calls_are_counted():
+    prof = ModifierProfiler(sample_rate=0.0)
+    prof.record("_vip_modifiers", None, rows=1)
+    prof.record("_vip_modifiers", None)
+    prof.record("_vip_modifiers", 0.002)
+    stats = prof.snapshot()["sources"]["_vip_modifiers"]
+    assert (stats["calls"], stats["timed_calls"], stats["rows"]) == (3, 1, 1)
+    assert stats["mean_seconds"] == 0.002
+    assert sum(stats["histogram"].values()) == 1
+
+    prof.configure(enabled=False)
+    prof.record("_vip_modifiers", None)
+    assert prof.snapshot()["sources"]["_vip_modifiers"]["calls"] == 3
@@ -1,11 +1,20 @@
+import contextlib
 from datetime import datetime, timedelta
 
 import pytest
 
 from services.modifier_stack_service import compute_modifier_stack
+from services.modifiers_utils import _modifier_cache
 from services.progression_service import get_total_modifiers
 
 
+@pytest.fixture(autouse=True)
+def clear_modifier_cache():
+    _modifier_cache.clear()
+    yield
+    _modifier_cache.clear()
+
+
 class DummyResult:
     def __init__(self, row=None, rows=None):
         self._row = row
@@ -25,35 +34,47 @@ class DummyDB:
     def execute(self, query, params=None):
         q = str(query).lower()
         params = params or {}
+        if "union all" in q:
+            # Consolidated loader: tagged (src, kid, k1, k2, num, payload) rows.
+            rows = []
+            for kid in params.get("kids", []):
+                for values in self._village_rows(kid):
+                    rows.append(("village_modifier", kid, None, None, None, list(values)))
+            return DummyResult(rows=rows)
         if "from village_modifiers" in q:
-            kid = params.get("kid")
-            active = []
-            now = datetime.utcnow()
-            for row in self.village_rows:
-                if row["kingdom_id"] != kid:
-                    continue
-                exp = row.get("expires_at")
-                if exp is not None and exp <= now:
-                    continue
-                active.append(
-                    (
-                        row.get("resource_bonus"),
-                        row.get("troop_bonus"),
-                        row.get("construction_speed_bonus", 0),
-                        row.get("defense_bonus", 0),
-                        row.get("trade_bonus", 0),
-                        row.get("source"),
-                        row.get("stacking_rules", {}),
-                    )
-                )
-            return DummyResult(rows=active)
+            return DummyResult(rows=self._village_rows(params.get("kid")))
         if "kingdom_villages" in q and "count" in q:
             return DummyResult((0,))
         return DummyResult()
 
+    def _village_rows(self, kid):
+        active = []
+        now = datetime.utcnow()
+        for row in self.village_rows:
+            if row["kingdom_id"] != kid:
+                continue
+            exp = row.get("expires_at")
+            if exp is not None and exp <= now:
+                continue
+            active.append(
+                (
+                    row.get("resource_bonus"),
+                    row.get("troop_bonus"),
+                    row.get("construction_speed_bonus", 0),
+                    row.get("defense_bonus", 0),
+                    row.get("trade_bonus", 0),
+                    row.get("source"),
+                    row.get("stacking_rules", {}),
+                )
+            )
+        return active
+
     def commit(self):
         pass
 
+    def begin_nested(self):
+        return contextlib.nullcontext()
+
 
 def test_village_modifier_additive_and_expiration():
     rows = [
@@ -110,3 +131,41 @@ def test_get_total_modifiers_includes_village_rows():
     db = DummyDB(rows)
     mods = get_total_modifiers(db, 1, use_cache=False)
     assert mods["resource_bonus"]["wood"] == 6
+
+
+def test_stack_and_totals_share_one_cached_breakdown():
+    from services.modifier_stack_service import summarize_modifiers
+
+    rows = [
+        {
+            "kingdom_id": 1,
+            "resource_bonus": {"wood": 5},
+            "troop_bonus": {},
+            "source": "harvest",
+            "stacking_rules": {"resource_bonus": {"wood": "max"}},
+            "expires_at": None,
+        },
+        {
+            "kingdom_id": 1,
+            "resource_bonus": {"wood": 3},
+            "troop_bonus": {},
+            "source": "festival",
+            "stacking_rules": {"resource_bonus": {"wood": "max"}},
+            "expires_at": None,
+        },
+    ]
+    db = DummyDB(rows)
+    calls = []
+    original = db.execute
+    db.execute = lambda q, p=None: calls.append(q) or original(q, p)
+
+    stack = compute_modifier_stack(db, 1)
+    queries = len(calls)
+    totals = get_total_modifiers(db, 1)
+    assert len(calls) == queries  # served from the cached breakdown
+    assert summarize_modifiers(stack) == totals
+    assert stack["resource_bonus"]["wood"]["total"] == 5
+    assert [s["source"] for s in stack["resource_bonus"]["wood"]["sources"]] == [
+        "harvest",
+        "festival",
+    ]
@@ -0,0 +1,70 @@
+# Project Name: Thronestead©
+# File Name: test_modifier_vector.py
+# Version:  7/1/2025 10:38
+# Developer: Deathsgift66
+from services.modifier_vector import (
+    MODIFIER_CATEGORIES,
+    ModifierIndex,
+    ModifierVector,
+    sum_vectors,
+)
+from services.modifiers_utils import _merge_modifiers, merge_modifiers_with_rules
+
+
+def test_round_trip_skips_invalid_values():
+    index = ModifierIndex()
+    vec = ModifierVector.from_dict(
+        {"resource_bonus": {"wood": "2", "bad": "x"}, "junk": 5}, index
+    )
+    out = vec.to_dict()
+    assert set(MODIFIER_CATEGORIES) <= set(out)
+    assert out["resource_bonus"] == {"wood": 2.0}
+    assert "junk" not in out
+
+
+def test_sum_matches_dict_merge():
+    index = ModifierIndex()
+    sources = [
+        {"resource_bonus": {"wood": 1}},
+        {"resource_bonus": {"wood": 2, "stone": 1}, "combat_bonus": {"attack": 3}},
+        {},
+        {"combat_bonus": {"attack": -1}},
+    ]
+    expected: dict = {}
+    for mods in sources:
+        _merge_modifiers(expected, mods)
+    total = sum_vectors((ModifierVector.from_dict(m, index) for m in sources), index)
+    assert total.to_dict(()) == expected
+
+
+def test_vectors_built_before_index_growth_are_padded():
+    index = ModifierIndex()
+    early = ModifierVector.from_dict({"a": {"x": 1}}, index)
+    late = ModifierVector.from_dict({"b": {"y": 2}}, index)
+    assert (early + late).to_dict(()) == {"a": {"x": 1.0}, "b": {"y": 2.0}}
+    assert (late - early).to_dict(()) == {"a": {"x": -1.0}, "b": {"y": 2.0}}
+    assert (-early).get("a", "x") == -1.0
+
+
+def test_merge_with_rules_matches_dict_rules():
+    index = ModifierIndex()
+    rows = [
+        ({"resource_bonus": {"wood": 5, "stone": 1}}, {"resource_bonus": {"wood": "max"}}),
+        ({"resource_bonus": {"wood": 3, "stone": 2}}, {"resource_bonus": {"wood": "max"}}),
+        ({"resource_bonus": {"wood": 7}}, {}),
+    ]
+    expected: dict = {}
+    vec = ModifierVector(index)
+    for mods, rules in rows:
+        merge_modifiers_with_rules(expected, mods, rules)
+        vec.merge_with_rules(ModifierVector.from_dict(mods, index), index.rule_mask(rules))
+    assert vec.to_dict(()) == expected
+    assert vec.get("resource_bonus", "wood") == 12.0
+
+
+def test_category_wide_max_rule():
+    index = ModifierIndex()
+    vec = ModifierVector.from_dict({"troop_bonus": {"a": 4, "b": 1}}, index)
+    other = ModifierVector.from_dict({"troop_bonus": {"a": 2, "b": 3}}, index)
+    vec.merge_with_rules(other, index.rule_mask({"troop_bonus": "max"}))
+    assert vec.to_dict(()) == {"troop_bonus": {"a": 4.0, "b": 3.0}}
@@ -12,3 +12,147 @@ def test_pathfinding_avoids_water():
     coords = [(t.x, t.y) for t in path]
     assert (2, 2) not in coords
     assert coords[0] == (0, 0) and coords[-1] == (4, 4)
+
+
+def test_pathfinding_grid_matches_dict():
+    tiles = {}
+    for x in range(6):
+        for y in range(6):
+            tiles[(x, y)] = be.TerrainTile(x, y)
+    for y in range(5):
+        tiles[(3, y)] = be.TerrainTile(3, y, terrain_type="water", passable=False)
+    grid = be.TerrainGrid.from_tiles(tiles.values())
+    dict_path = be.compute_path((0, 0), (5, 0), tiles, danger=[(1, 5)])
+    grid_path = be.compute_path((0, 0), (5, 0), grid, danger=[(1, 5)])
+    assert grid_path is not None
+    assert len(grid_path) == len(dict_path)
+    assert sum(t.move_cost for t in grid_path) == sum(t.move_cost for t in dict_path)
+    assert all(t.passable for t in grid_path)
+    assert (grid_path[0].x, grid_path[0].y) == (0, 0)
+    assert (grid_path[-1].x, grid_path[-1].y) == (5, 0)
+
+
+def test_terrain_grid_packs_tile_attributes():
+    tiles = [
+        be.TerrainTile(2, 3, terrain_type="forest", move_cost=2, cover=0.5),
+        be.TerrainTile(4, 3, terrain_type="lava", passable=False, elevation=1),
+    ]
+    grid = be.TerrainGrid.from_tiles(tiles)
+    assert (grid.width, grid.height) == (3, 1)
+    idx = grid.index(2, 3)
+    assert grid.move_cost[idx] == 2 and grid.cover[idx] == 0.5
+    assert grid.terrain_classes[grid.terrain_code[idx]] == "forest"
+    assert grid.terrain_classes[grid.terrain_code[grid.index(4, 3)]] == "lava"
+    assert grid.get((3, 3)) is None and grid.terrain_code[grid.index(3, 3)] == 0
+    assert grid.index(5, 3) == -1
+
+
+def _walled_map(size=40):
+    tiles = {}
+    for x in range(size):
+        for y in range(size):
+            wall = x == 20 and y < size - 3
+            tiles[(x, y)] = be.TerrainTile(x, y, passable=not wall)
+    return tiles
+
+
+def test_hpa_engine_finds_valid_near_optimal_path():
+    tiles = _walled_map()
+    grid = be.TerrainGrid.from_tiles(tiles)
+    exact = be.compute_path((2, 2), (35, 5), grid)
+    path = be.compute_path((2, 2), (35, 5), grid, danger=[(10, 38)], engine="hpa")
+    assert path is not None
+    assert (path[0].x, path[0].y) == (2, 2) and (path[-1].x, path[-1].y) == (35, 5)
+    for a, b in zip(path, path[1:]):
+        assert abs(a.x - b.x) + abs(a.y - b.y) == 1
+        assert b.passable and (b.x, b.y) != (10, 38)
+    assert len(path) <= len(exact) * 1.2
+
+
+def test_hpa_hierarchy_rebuilds_after_grid_change():
+    grid = be.TerrainGrid.from_tiles(_walled_map())
+    first = be.get_path_hierarchy(grid)
+    assert be.get_path_hierarchy(grid) is first
+    for y in range(37, 40):
+        grid.set_tile(be.TerrainTile(20, y, passable=False))
+    assert be.get_path_hierarchy(grid) is not first
+    assert be.compute_path((2, 2), (35, 5), grid, engine="hpa") is None
+
+
+def test_compute_path_rejects_unknown_engine():
+    import pytest
+
+    with pytest.raises(ValueError):
+        be.compute_path((0, 0), (1, 0), {}, engine="jps")
+
+
+def test_flow_field_matches_compute_path_costs():
+    import random
+
+    rng = random.Random(3)
+    tiles = {
+        (x, y): be.TerrainTile(x, y, passable=rng.random() > 0.2, move_cost=rng.choice([1, 1, 2, 3]))
+        for x in range(20)
+        for y in range(20)
+    }
+    tiles[(10, 10)] = be.TerrainTile(10, 10)
+    grid = be.TerrainGrid.from_tiles(tiles)
+    field = be.get_flow_field(grid, (10, 10), [(9, 10)])
+    assert be.get_flow_field(grid, (10, 10), [(9, 10)]) is field
+    for x in range(20):
+        for y in range(20):
+            path = be.compute_path((x, y), (10, 10), tiles, danger=[(9, 10)])
+            if path is None:
+                assert field.next_step(x, y) is None
+                continue
+            assert field.cost_from(x, y) == sum(t.move_cost for t in path[1:])
+            if len(path) > 1:
+                step = field.next_step(x, y)
+                assert step != (9, 10) and tiles[step].passable
+
+
+def test_hpa_engine_handles_danger_in_goal_cluster():
+    tiles = {(x, y): be.TerrainTile(x, y) for x in range(64) for y in range(64)}
+    grid = be.TerrainGrid.from_tiles(tiles.values())
+    exact = be.compute_path((0, 0), (60, 60), grid, danger=[(50, 50)])
+    path = be.compute_path((0, 0), (60, 60), grid, danger=[(50, 50)], engine="hpa")
+    assert path is not None and len(path) <= len(exact) * 1.2
+    assert (50, 50) not in [(t.x, t.y) for t in path]
+    assert (path[-1].x, path[-1].y) == (60, 60)
+
+
+def test_hpa_engine_falls_back_when_danger_closes_a_transition():
+    # A short gap in the wall between two clusters gets one transition, on
+    # its middle tile; danger there must not hide the rest of the gap.
+    tiles = {
+        (x, y): be.TerrainTile(x, y, passable=x != 16 or 4 <= y <= 6)
+        for x in range(32)
+        for y in range(16)
+    }
+    grid = be.TerrainGrid.from_tiles(tiles.values())
+    exact = be.compute_path((2, 5), (28, 5), grid, danger=[(16, 5)])
+    path = be.compute_path((2, 5), (28, 5), grid, danger=[(16, 5)], engine="hpa")
+    assert exact is not None and path is not None
+    assert len(path) == len(exact)
+    assert (16, 5) not in [(t.x, t.y) for t in path]
+
+
+def test_grid_search_breaks_f_ties_towards_deeper_nodes(monkeypatch):
+    import heapq
+    import types
+
+    pops = []
+
+    def counting_pop(heap):
+        pops.append(1)
+        return heapq.heappop(heap)
+
+    monkeypatch.setattr(
+        be, "heapq", types.SimpleNamespace(heappop=counting_pop, heappush=heapq.heappush)
+    )
+    grid = be.TerrainGrid.from_tiles(be.TerrainTile(x, y) for x in range(30) for y in range(30))
+    path = be.compute_path((0, 0), (29, 29), grid)
+    # Every tile on an open map ties on f; expanding the deepest first walks
+    # straight to the goal instead of flooding all 900 tiles.
+    assert len(path) == 59 and len(pops) == 59
+    assert [(t.x, t.y) for t in path[:3]] == [(0, 0), (1, 0), (2, 0)]
@@ -51,3 +51,127 @@ def test_tick_returns_empty_without_villages(monkeypatch):
     assert gained == {}
     row = db.query(KingdomResources).filter_by(kingdom_id=1).one()
     assert row.wood == 0
+
+
+class TickResult:
+    def __init__(self, rows=None):
+        self._rows = rows or []
+
+    def fetchall(self):
+        return self._rows
+
+
+class TickDB:
+    def __init__(self, rows, fail_on=None):
+        self.rows = rows
+        self.fail_on = fail_on
+        self.updates = []
+        self.commits = 0
+        self.rollbacks = 0
+
+    def execute(self, query, params=None):
+        q = str(query)
+        if q.strip().startswith("SELECT"):
+            return TickResult(self.rows)
+        if self.fail_on is not None and params.get("kid_0") == self.fail_on:
+            raise RuntimeError("deadlock")
+        self.updates.append((q, params))
+        return TickResult()
+
+    def commit(self):
+        self.commits += 1
+
+    def rollback(self):
+        self.rollbacks += 1
+
+
+def test_tick_all_production_chunks_and_reports(monkeypatch):
+    rows = [
+        (1, "wood", 10),
+        (1, "stone", 4),
+        (2, "wood", 5),
+        (3, "food", 8),
+        (3, "mana", 99),  # not a resource column
+    ]
+    seen = []
+
+    def fake_bulk(db_arg, kids, use_cache=True):
+        seen.append(list(kids))
+        return {1: {"production_bonus": {"tech": 50}}, 2: {}, 3: {}}
+
+    monkeypatch.setattr(production_tick_service.progression_service, "get_total_modifiers_bulk", fake_bulk)
+    db = TickDB(rows)
+
+    report = production_tick_service.tick_all_production(db, chunk_size=2)
+
+    assert seen == [[1, 2, 3]]
+    assert report["kingdoms"] == 3
+    assert report["chunks"] == 2 and db.commits == 2
+    assert report["gained"] == {"wood": 20, "stone": 6, "food": 8}
+    assert set(report["timings"]) == {"base_rates", "modifiers", "compute", "apply"}
+    # kingdoms 1 and 2 change different columns, so the first chunk takes two statements
+    assert len(db.updates) == 3
+    sql, params = db.updates[0]
+    assert "FROM (VALUES" in sql and "mana" not in sql
+    assert params == {"kid_0": 1, "stone_0": 6, "wood_0": 15}
+    assert db.updates[1][1] == {"kid_0": 2, "wood_0": 5}
+
+
+def test_tick_all_production_skips_failed_chunk(monkeypatch):
+    monkeypatch.setattr(
+        production_tick_service.progression_service,
+        "get_total_modifiers_bulk",
+        lambda *a, **k: {},
+    )
+    db = TickDB([(1, "wood", 10), (2, "wood", 5)], fail_on=1)
+
+    report = production_tick_service.tick_all_production(db, chunk_size=1)
+
+    assert report["failed_chunks"] == 1 and db.rollbacks == 1
+    assert report["gained"] == {"wood": 5}
+
+
+def test_refresh_accrual_rates_only_writes_changes(monkeypatch):
+    class RatesDB(TickDB):
+        def execute(self, query, params=None):
+            if "FROM kingdom_resource_accrual" in str(query):
+                return TickResult([(1, {"wood": 15.0}), (3, {"food": 2.0})])
+            return super().execute(query, params)
+
+    written = {}
+    monkeypatch.setattr(
+        production_tick_service,
+        "set_accrual_rates",
+        lambda db_arg, kid, rates, commit=True: written.update({kid: rates}),
+    )
+    monkeypatch.setattr(
+        production_tick_service.progression_service,
+        "get_total_modifiers_bulk",
+        lambda *a, **k: {1: {"production_bonus": {"tech": 50}}},
+    )
+    db = RatesDB([(1, "wood", 10), (2, "stone", 4)])
+
+    report = production_tick_service.refresh_accrual_rates(db)
+
+    assert written == {2: {"stone": 4.0}, 3: {}}
+    assert report["changed"] == 2 and db.commits == 1
+
+
+def test_ticks_credit_nothing_in_accrual_mode(monkeypatch):
+    monkeypatch.setattr(production_tick_service.resource_service, "ACCRUAL_MODE", True)
+    refreshed = []
+    monkeypatch.setattr(
+        production_tick_service,
+        "refresh_accrual_rates",
+        lambda db_arg, chunk_size: refreshed.append(chunk_size)
+        or {"changed": 3, "failed_chunks": 0, "timings": {}},
+    )
+    db = TickDB([(1, "wood", 10)])
+
+    assert production_tick_service.tick_kingdom_production(db, 1) == {}
+    report = production_tick_service.tick_all_production(db, chunk_size=7)
+
+    # The scheduled tick keeps accrual rates current instead of crediting.
+    assert report["accrual_mode"] is True and report["gained"] == {}
+    assert report["rates_changed"] == 3 and refreshed == [7]
+    assert db.updates == [] and db.commits == 0
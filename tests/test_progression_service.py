@@ -2,6 +2,7 @@
 # File Name: test_progression_service.py
 # Version:  7/1/2025 10:38
 # Developer: Deathsgift66
+import contextlib
 import sys
 from pathlib import Path
 
@@ -22,6 +23,7 @@ from services.progression_service import (
     remove_noble,
 )
 from services import progression_service
+from services.modifier_catalogue import catalogues
 from services.progression_service import (
     _kingdom_project_modifiers,
     calculate_troop_slots,
@@ -195,3 +197,247 @@ def test_check_progression_requirements_uses_cache(monkeypatch):
         required_knights=1,
     )
 
+
+
+def test_get_total_modifiers_single_query():
+    rows = [
+        ("region", 1, "resource_bonus", "5", None, None),
+        ("tech", 1, "t1", None, None, None),
+        ("temple", 1, "9", None, None, None),
+        ("faith", 1, None, None, None, {"blessing_2": True}),
+        ("villages", 1, None, None, 3, None),
+        (
+            "village_modifier",
+            1,
+            None,
+            None,
+            None,
+            [{"wood": 4}, None, 0, 0, 0, "Harvest", {}],
+        ),
+        ("treaty", 1, "economic_bonus", "trade", 1.5, None),
+    ]
+
+    class DummyResult:
+        def fetchall(self):
+            return rows
+
+    class DummyDB:
+        def __init__(self):
+            self.queries = []
+
+        def execute(self, query, params=None):
+            self.queries.append(str(query))
+            return DummyResult()
+
+        def begin_nested(self):
+            return contextlib.nullcontext()
+
+    catalogues.install(
+        tech={"t1": {"combat_bonus": {"attack": 2}}},
+        temples={9: '{"combat_bonus": {"attack": 1}}'},
+    )
+    db = DummyDB()
+    mods = get_total_modifiers(db, 1, use_cache=False)
+    assert len(db.queries) == 1
+    assert "UNION ALL" in db.queries[0]
+    assert mods["resource_bonus"] == {"value": 5.0, "wood": 4.0}
+    assert mods["combat_bonus"] == {"attack": 3.0, "attack_bonus": 1.0}
+    assert mods["production_bonus"] == {"villages": 3.0}
+    assert mods["economic_bonus"] == {"trade": 1.5}
+
+
+def test_get_total_modifiers_falls_back_per_source():
+    class DummyResult:
+        def __init__(self, rows=None, value=None):
+            self._rows = rows or []
+            self._value = value
+
+        def fetchall(self):
+            return self._rows
+
+        def fetchone(self):
+            return self._rows[0] if self._rows else None
+
+        def scalar(self):
+            return self._value
+
+    class DummySavepoint:
+        def __init__(self, db):
+            self.db = db
+
+        def __enter__(self):
+            return self
+
+        def __exit__(self, exc_type, exc, tb):
+            if exc_type is not None:
+                self.db.savepoint_rollbacks += 1
+            return False
+
+    class DummyDB:
+        savepoint_rollbacks = 0
+
+        def execute(self, query, params=None):
+            q = str(query)
+            if "UNION ALL" in q:
+                raise RuntimeError("old schema")
+            if "COUNT(*) FROM kingdom_villages" in q:
+                return DummyResult(value=2)
+            return DummyResult()
+
+        def begin_nested(self):
+            return DummySavepoint(self)
+
+        def rollback(self):
+            raise AssertionError("outer transaction rolled back")
+
+    mods = get_total_modifiers(DummyDB(), 1, use_cache=False)
+    assert mods["production_bonus"] == {"villages": 2.0}
+
+    # Only the savepoint is rolled back and the partial result is not cached.
+    progression_service._modifier_cache.clear()
+    db = DummyDB()
+    get_total_modifiers(db, 1)
+    assert db.savepoint_rollbacks == 1
+    assert progression_service._modifier_cache.get(1) is None
+
+
+def test_failed_consolidated_load_keeps_earlier_writes(monkeypatch):
+    monkeypatch.setattr(progression_service, "_MODIFIER_SOURCES", [])
+    engine = create_engine("sqlite:///:memory:")
+    Session = sessionmaker(bind=engine)
+    db = Session()
+    db.execute(text("CREATE TABLE audit_log (kingdom_id INTEGER, action TEXT)"))
+    db.execute(text("INSERT INTO audit_log VALUES (1, 'before load')"))
+
+    # The consolidated load fails on sqlite (no modifier tables).
+    get_total_modifiers(db, 1, use_cache=False)
+
+    db.commit()
+    rows = db.execute(text("SELECT action FROM audit_log")).fetchall()
+    assert rows == [("before load",)]
+
+
+def test_failed_bulk_load_keeps_earlier_writes(monkeypatch):
+    monkeypatch.setattr(progression_service, "_MODIFIER_SOURCES", [])
+    monkeypatch.setattr(progression_service, "BULK_CHUNK_SIZE", 1)
+    engine = create_engine("sqlite:///:memory:")
+    Session = sessionmaker(bind=engine)
+    db = Session()
+    db.execute(text("CREATE TABLE audit_log (kingdom_id INTEGER, action TEXT)"))
+    db.execute(text("INSERT INTO audit_log VALUES (1, 'before load')"))
+
+    # Every chunk's load fails; each is rolled back on its own savepoint.
+    result = progression_service.get_modifier_breakdowns_bulk(db, [1, 2], use_cache=False)
+    assert set(result) == {1, 2}
+
+    db.commit()
+    rows = db.execute(text("SELECT action FROM audit_log")).fetchall()
+    assert rows == [("before load",)]
+
+
+def test_get_total_modifiers_bulk_one_query_and_caches():
+    rows = [
+        ("villages", 1, None, None, 2, None),
+        ("villages", 2, None, None, 5, None),
+        ("treaty", 2, "combat_bonus", "attack", 1.0, None),
+    ]
+
+    class DummyResult:
+        def fetchall(self):
+            return rows
+
+    class DummyDB:
+        def __init__(self):
+            self.params = []
+
+        def execute(self, query, params=None):
+            self.params.append(params)
+            return DummyResult()
+
+        def begin_nested(self):
+            return contextlib.nullcontext()
+
+    progression_service._modifier_cache.clear()
+    catalogues.install()
+    db = DummyDB()
+    result = progression_service.get_total_modifiers_bulk(db, [1, 2, 3, 2])
+    assert len(db.params) == 1
+    assert db.params[0] == {"kids": [1, 2, 3], "temple_ids": []}
+    assert result[1]["production_bonus"] == {"villages": 2.0}
+    assert result[2]["production_bonus"] == {"villages": 5.0}
+    assert result[2]["combat_bonus"] == {"attack": 1.0}
+    assert result[3]["production_bonus"] == {}
+
+    # Entries are cached, so a single-kingdom lookup issues no query.
+    assert get_total_modifiers(db, 2) is result[2]
+    assert len(db.params) == 1
+    progression_service._modifier_cache.clear()
+
+
+def test_verify_modifier_breakdown_detects_delta_drift():
+    from services.modifier_vector import ModifierVector
+    from services.modifiers_utils import apply_modifier_delta
+
+    rows = [("villages", 1, None, None, 2, None)]
+
+    class DummyResult:
+        def fetchall(self):
+            return rows
+
+    class DummyDB:
+        def execute(self, query, params=None):
+            return DummyResult()
+
+        def begin_nested(self):
+            return contextlib.nullcontext()
+
+    progression_service._modifier_cache.clear()
+    catalogues.install()
+    db = DummyDB()
+    get_total_modifiers(db, 1)
+    assert progression_service.verify_modifier_breakdown(db, 1)
+
+    # A delta the database never saw shows up as drift and is repaired.
+    bogus = ModifierVector.from_dict({"production_bonus": {"villages": 1}})
+    assert apply_modifier_delta(1, bogus, "Villages")
+    assert get_total_modifiers(db, 1)["production_bonus"] == {"villages": 3.0}
+    assert not progression_service.verify_modifier_breakdown(db, 1)
+    assert get_total_modifiers(db, 1)["production_bonus"] == {"villages": 2.0}
+    progression_service._modifier_cache.clear()
+
+
+def test_adjusted_entries_are_verified_when_due(monkeypatch):
+    from services.modifier_vector import ModifierVector
+    from services.modifiers_utils import apply_modifier_delta
+
+    rows = [("villages", 1, None, None, 2, None)]
+
+    class DummyResult:
+        def fetchall(self):
+            return rows
+
+    class DummyDB:
+        def execute(self, query, params=None):
+            return DummyResult()
+
+        def begin_nested(self):
+            return contextlib.nullcontext()
+
+    progression_service._modifier_cache.clear()
+    catalogues.install()
+    db = DummyDB()
+    get_total_modifiers(db, 1)
+    get_total_modifiers(db, 2)
+    bogus = ModifierVector.from_dict({"production_bonus": {"villages": 1}})
+    assert apply_modifier_delta(1, bogus, "Villages")
+    assert progression_service._modifier_cache.adjusted_keys() == [1]
+
+    # Not due yet: the drifted entry is served as is.
+    monkeypatch.setattr(progression_service, "_next_verify_at", float("inf"))
+    assert get_total_modifiers(db, 1)["production_bonus"] == {"villages": 3.0}
+
+    monkeypatch.setattr(progression_service, "_next_verify_at", 0.0)
+    assert get_total_modifiers(db, 1)["production_bonus"] == {"villages": 2.0}
+    assert progression_service._modifier_cache.adjusted_keys() == []
+    assert progression_service._next_verify_at > 0.0
+    progression_service._modifier_cache.clear()
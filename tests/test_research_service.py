@@ -48,7 +48,7 @@ class DummyDB:
         if "from tech_catalogue" in lower:
             return DummyResult(rows=self.catalog_rows)
 
-        if "from kingdom_research_tracking" in lower:
+        if "from kingdom_research_tracking" in lower or "returning" in lower:
 
             return DummyResult(rows=self.rows)
         return DummyResult()
@@ -96,6 +96,26 @@ def test_complete_finished_updates():
     assert db.commits == 1
 
 
+def test_complete_finished_applies_tech_delta(monkeypatch):
+    from services import modifiers_utils
+    from services.modifier_catalogue import CatalogueRegistry
+    from services.modifiers_utils import ModifierCache
+
+    cache = ModifierCache()
+    cache.set(1, {"totals": {}, "sources": []})
+    registry = CatalogueRegistry()
+    registry.install(tech={"tech_a": {"resource_bonus": {"wood": 4}}})
+    monkeypatch.setattr(modifiers_utils, "_modifier_cache", cache)
+    monkeypatch.setattr("services.research_service.catalogues", registry)
+
+    db = DummyDB()
+    db.rows = [("tech_a",)]
+    complete_finished_research(db, 1)
+
+    assert "RETURNING tech_code" in db.queries[0][0]
+    assert cache.get(1)["totals"]["resource_bonus"] == {"wood": 4.0}
+
+
 def test_list_and_check():
     db = DummyDB()
     db.rows = [("tech_a", "completed", 100, "2025-01-01")]
@@ -1,3 +1,5 @@
+import json
+
 import pytest
 from fastapi import HTTPException
 from sqlalchemy import create_engine
@@ -78,3 +80,179 @@ def test_transfer_resource_rolls_back_on_log_error(monkeypatch):
     assert r_res.wood == 10
     assert db.query(KingdomResourceTransfer).count() == 0
 
+
+
+class AccrualResult:
+    def __init__(self, row=None):
+        self._row = row
+        self.rowcount = 0 if row is None else 1
+
+    def fetchone(self):
+        return self._row
+
+    def mappings(self):
+        return self
+
+
+class AccrualDB:
+    """Minimal stand-in that answers the accrual queries."""
+
+    def __init__(self, balances, rates, carry, elapsed, missing_row=False):
+        self.balances = dict(balances)
+        self.missing_row = missing_row
+        self.accrual = (rates, carry, elapsed)
+        self.statements = []
+
+    def execute(self, query, params=None):
+        q = " ".join(str(query).split())
+        self.statements.append((q, params))
+        if "LEFT JOIN kingdom_resource_accrual" in q:
+            rates, carry, elapsed = self.accrual
+            return AccrualResult(
+                {**self.balances, "accrual_rates": rates, "accrual_carry": carry, "accrual_elapsed": elapsed}
+            )
+        if q.startswith("SELECT rates, carry"):
+            return AccrualResult(self.accrual)
+        if q.startswith("UPDATE kingdom_resources SET"):
+            if self.missing_row:
+                return AccrualResult()
+            sign = -1 if " - :" in q else 1
+            if "RETURNING" in q and any(self.balances[r] < params[r] for r in self.balances if r in params):
+                return AccrualResult()
+            for res in self.balances:
+                if res in params:
+                    self.balances[res] += sign * params[res]
+            return AccrualResult((params["kid"],))
+        if q.startswith("UPDATE kingdom_resource_accrual"):
+            self.accrual = (self.accrual[0], json.loads(params["carry"]), 0)
+            return AccrualResult()
+        if q.startswith("SELECT * FROM kingdom_resources"):
+            return AccrualResult(dict(self.balances))
+        return AccrualResult()
+
+    def commit(self):
+        pass
+
+
+def test_accrued_keeps_fractional_carry():
+    whole, carry = resource_service._accrued({"wood": 10, "stone": 1}, {"stone": 0.75}, 1800)
+    assert whole == {"wood": 5, "stone": 1}
+    assert carry == {"stone": pytest.approx(0.25)}
+
+
+def test_accrual_mode_read_and_spend(monkeypatch):
+    monkeypatch.setattr(resource_service, "ACCRUAL_MODE", True)
+    db = AccrualDB({"kingdom_id": 1, "wood": 5}, {"wood": 100}, {}, 36)
+
+    # Reads add the accrued 1 wood without writing anything.
+    assert resource_service.get_kingdom_resources(db, 1)["wood"] == 6
+    assert not any(q.startswith("UPDATE") for q, _ in db.statements)
+
+    resource_service.spend_resources(db, 1, {"wood": 6})
+    assert db.balances["wood"] == 0
+    assert any(q.startswith("UPDATE kingdom_resource_accrual") for q, _ in db.statements)
+    with pytest.raises(HTTPException):
+        resource_service.spend_resources(db, 1, {"wood": 1})
+
+
+def test_settle_accrual_keeps_clock_when_credit_fails():
+    db = AccrualDB({"kingdom_id": 1, "wood": 5}, {"wood": 100}, {}, 3600, missing_row=True)
+
+    with pytest.raises(HTTPException) as exc:
+        resource_service.settle_accrual(db, 1)
+    assert exc.value.status_code == 404
+    assert db.accrual == ({"wood": 100}, {}, 3600)
+    assert not any(q.startswith("UPDATE kingdom_resource_accrual") for q, _ in db.statements)
+
+
+class BulkDB:
+    def __init__(self, rows):
+        self.rows = rows
+        self.statements = []
+        self.commits = 0
+
+    def execute(self, query, params=None):
+        q = " ".join(str(query).split())
+        self.statements.append((q, params))
+        rows = self.rows if q.startswith("SELECT") else []
+
+        class _Result:
+            def fetchall(self):
+                return rows
+
+        return _Result()
+
+    def commit(self):
+        self.commits += 1
+
+
+def test_apply_resource_deltas_bulk_groups_by_columns():
+    db = BulkDB([(2, 10)])
+    deltas = {1: {"wood": 5, "stone": 2}, 2: {"wood": -3}, 3: {"stone": 1, "wood": 4}}
+
+    assert resource_service.apply_resource_deltas_bulk(db, deltas) == 2
+
+    select, updates = db.statements[0], db.statements[1:]
+    assert "FOR UPDATE" in select[0] and select[1] == {"kids": [2]}
+    assert len(updates) == 2 and db.commits == 1
+    assert updates[0][1] == {"kid_0": 1, "stone_0": 2, "wood_0": 5, "kid_1": 3, "stone_1": 1, "wood_1": 4}
+    assert updates[1][1] == {"kid_0": 2, "wood_0": -3}
+
+
+def test_apply_resource_deltas_bulk_rejects_shortfall():
+    db = BulkDB([(2, 1)])
+    with pytest.raises(HTTPException) as exc:
+        resource_service.apply_resource_deltas_bulk(db, {1: {"wood": 5}, 2: {"wood": -3}})
+    assert exc.value.detail == "Not enough wood"
+    assert len(db.statements) == 1 and db.commits == 0
+
+    with pytest.raises(ValueError):
+        resource_service.apply_resource_deltas_bulk(db, {1: {"mana": 1}})
+    with pytest.raises(ValueError):
+        resource_service.apply_resource_deltas_bulk(db, {1: {"mana": 0}})
+
+
+def test_apply_resource_deltas_bulk_bounds_parameters(monkeypatch):
+    monkeypatch.setattr(resource_service, "BULK_MAX_PARAMS", 6)
+    db = BulkDB([(1, 10, 10), (3, 10, 10)])
+    deltas = {kid: {"wood": 1, "stone": 1} for kid in range(5)}
+    deltas[3] = {"wood": -1, "stone": -1}
+    deltas[1] = {"wood": -1, "stone": -1}
+
+    # Two (kid, stone, wood) rows fit in six parameters.
+    assert resource_service.apply_resource_deltas_bulk(db, deltas) == 3
+    select, updates = db.statements[0], db.statements[1:]
+    assert "ORDER BY kingdom_id FOR UPDATE" in select[0]
+    assert [len(params) for _, params in updates] == [6, 6, 3]
+
+
+def test_resource_statements_are_memoised():
+    resource_service._resource_statement.cache_clear()
+    db = BulkDB([])
+
+    resource_service.gain_resources(db, 1, {"wood": 1, "stone": 2})
+    resource_service.gain_resources(db, 2, {"stone": 5, "wood": 3})
+    resource_service.initialize_kingdom_resources(db, 3)
+
+    first, second, insert = (q for q, _ in db.statements)
+    assert first == second and "COALESCE(stone, 0) + :stone" in first
+    assert insert.startswith("INSERT INTO kingdom_resources (kingdom_id) VALUES (:kid)")
+    stats = resource_service.get_statement_cache_stats()
+    assert stats["hits"] == 1 and stats["misses"] == 2
+    assert stats["hit_rate"] == pytest.approx(1 / 3)
+
+
+def test_spend_resources_conditional_update():
+    db = AccrualDB({"kingdom_id": 1, "wood": 5, "stone": 1}, {}, {}, 0)
+
+    resource_service.spend_resources(db, 1, {"wood": 3})
+    assert db.balances["wood"] == 2
+    assert [q.split(" SET")[0] for q, _ in db.statements] == ["UPDATE kingdom_resources"]
+    assert "COALESCE(wood, 0) >= :wood RETURNING" in db.statements[0][0]
+
+    db.statements.clear()
+    with pytest.raises(HTTPException) as exc:
+        resource_service.spend_resources(db, 1, {"wood": 1, "stone": 2})
+    assert exc.value.detail == "Not enough stone"
+    assert db.statements[-1][0].endswith("FOR UPDATE")
+    assert db.balances == {"kingdom_id": 1, "wood": 2, "stone": 1}
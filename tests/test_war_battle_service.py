@@ -0,0 +1,64 @@
+import backend.battle_engine as be
+from services.war_battle_service import resolve_combat, update_positions
+
+
+class DummyResult:
+    def __init__(self, rows=None):
+        self._rows = rows or []
+
+    def fetchall(self):
+        return self._rows
+
+
+class DummyDB:
+    def __init__(self, rows=None):
+        self.rows = rows or []
+        self.calls = []
+
+    def execute(self, query, params=None):
+        q = str(query).strip()
+        self.calls.append((q, params))
+        if q.startswith("SELECT unit_id, x, y") or "FROM unit_positions p" in q:
+            return DummyResult(self.rows)
+        return DummyResult()
+
+
+def test_update_positions_applies_raw_movement_only():
+    db = DummyDB()
+    update_positions(db, 1, 3)
+    assert len(db.calls) == 1
+    assert "x = x + dx" in db.calls[0][0]
+
+
+def test_update_positions_steps_units_along_flow_field():
+    tiles = [be.TerrainTile(x, y) for x in range(5) for y in range(3)]
+    tiles.append(be.TerrainTile(2, 0, passable=False))
+    grid = be.TerrainGrid.from_tiles(tiles)
+    db = DummyDB(rows=[("a", 0, 0), ("b", 4, 2), ("c", 1, 1)])
+    update_positions(db, 7, 2, objectives={"a": (4, 0), "b": (4, 0)}, grid=grid)
+
+    query, params = db.calls[-1]
+    assert query.startswith("UPDATE unit_positions") and "SET x = :x" in query
+    moves = {p["uid"]: (p["x"], p["y"]) for p in params}
+    assert set(moves) == {"a", "b"}
+    assert moves["a"] in {(1, 0), (0, 1)}
+    assert moves["b"] == (4, 1)
+    assert all(p["wid"] == 7 and p["tick"] == 2 for p in params)
+
+
+def test_resolve_combat_pairs_melee_and_ranged_units():
+    db = DummyDB(
+        rows=[
+            ("a", 1, 0, 0, 5, 1, 100, True, None, 0, 0, 0),
+            ("b", 2, 0, 0, 1, 2, 100, False, None, 0, 0, 0),
+            ("archer", 2, 3, 0, 4, 1, 100, False, None, 0, 0, 4),
+            ("far", 1, 30, 30, 1, 1, 100, True, None, 0, 0, 0),
+        ]
+    )
+    resolve_combat(db, 7, 2)
+
+    query, params = db.calls[-1]
+    assert query.startswith("INSERT INTO combat_logs")
+    pairs = {(p["att"], p["def"], p["outcome"]) for p in params}
+    assert pairs == {("a", "b", "win"), ("b", "a", "loss"), ("archer", "a", "win")}
+    assert all(p["wid"] == 7 and p["tick"] == 2 for p in params)
@@ -0,0 +1,67 @@
+from contextlib import contextmanager
+
+import services.war_tick_scheduler as scheduler
+
+
+class DummyResult:
+    def __init__(self, rows=None, scalar=None):
+        self._rows = rows or []
+        self._scalar = scalar
+
+    def fetchall(self):
+        return self._rows
+
+    def scalar(self):
+        return self._scalar
+
+
+class DummyDB:
+    def __init__(self, rows=None, locked=()):
+        self.rows = rows or []
+        self.locked = set(locked)
+        self.queries = []
+        self.rollbacks = 0
+
+    def execute(self, query, params=None):
+        q = str(query).strip()
+        self.queries.append((q, params))
+        if "FROM wars_tactical" in q:
+            return DummyResult(rows=[r for r in self.rows if r[0] % params["shards"] == params["shard"]])
+        if "pg_try_advisory_xact_lock" in q:
+            return DummyResult(scalar=params["wid"] not in self.locked)
+        return DummyResult()
+
+    def rollback(self):
+        self.rollbacks += 1
+
+
+def test_run_shard_claims_and_ticks_due_wars(monkeypatch):
+    db = DummyDB(rows=[(2, 4, 12.5), (4, 1, 0.0), (6, 9, 3.0)], locked={4})
+    ticked = []
+
+    def fake_tick(d, wid, tick, payload):
+        ticked.append((wid, tick, payload["shard"]))
+        return wid != 6
+
+    monkeypatch.setattr(scheduler.combat_tick_engine, "process_combat_tick", fake_tick)
+    report = scheduler.run_shard_with_session(db, 0, 2)
+    assert ticked == [(2, 5, 0), (6, 10, 0)]
+    assert (report.due, report.processed, report.duplicates, report.locked) == (3, 1, 1, 1)
+    assert report.max_lag_seconds == 12.5
+    assert report.war_ids == [2]
+
+
+def test_scheduler_runs_every_shard_with_own_session(monkeypatch):
+    sessions = []
+
+    @contextmanager
+    def factory():
+        db = DummyDB(rows=[(1, 0, 0.0), (2, 0, 0.0), (3, 0, 0.0)])
+        sessions.append(db)
+        yield db
+
+    monkeypatch.setattr(scheduler.combat_tick_engine, "process_combat_tick", lambda *a: True)
+    reports = scheduler.WarTickScheduler(shards=3, processes=1, session_factory=factory).run_once()
+    assert [r.shard for r in reports] == [0, 1, 2]
+    assert sorted(w for r in reports for w in r.war_ids) == [1, 2, 3]
+    assert len(sessions) == 3